@@ -1,4 +1,13 @@
-from ._bs4 import WebPage
+from typing import Any
 from .wappalyzer import Wappalyzer
+from ._common import set_backend
 __all__ = ["Wappalyzer",
-           "WebPage"]
+           "WebPage",
+           "set_backend"]
+
+def __getattr__(name: str) -> Any:
+    # The WebPage parser backend is imported on first use, see set_backend()
+    if name == "WebPage":
+        from ._common import webpage_class
+        return webpage_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
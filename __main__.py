@@ -0,0 +1,8 @@
+"""
+Command line entry point, see `Wappalyzer.ingest`::
+
+    python -m Wappalyzer crawl.warc.gz --output results.jsonl --workers 8
+"""
+from .ingest import main
+
+main()
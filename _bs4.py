@@ -1,20 +1,100 @@
 """
 Implementation of WebPage based on bs4, depends on lxml.
 """
-from typing import Iterable, Mapping
-#Just to check if it's available
-import lxml # type: ignore 
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from lxml import etree # type: ignore
 import logging
-from bs4 import BeautifulSoup, Tag as bs4_Tag # type: ignore
-from cached_property import cached_property # type: ignore
+try:
+    from functools import cached_property
+except ImportError:
+    # Python < 3.8, the cached_property package imports asyncio, which is slow to import
+    from cached_property import cached_property # type: ignore
+
+# BeautifulSoup and soupsieve are only imported when the DOM is first queried, see WebPage._parsed_html
+if TYPE_CHECKING:
+    import soupsieve # type: ignore
+    from bs4 import BeautifulSoup, Tag as bs4_Tag # type: ignore
 
 from ._common import BaseWebPage, BaseTag
 
 logger = logging.getLogger(name="python-Wappalyzer")
 
+# Compiled CSS selectors, None when the selector is not supported.
+_compiled_selectors: Dict[str, Optional['soupsieve.SoupSieve']] = {}
+
+# Major versions of soupsieve whose compiled selectors _selector_keys() knows how to read.
+# With other versions, select_all() evaluates the selectors one by one.
+_SOUPSIEVE_MAJOR_VERSIONS = (2, 3)
+
+def _compile_selector(selector: str) -> Optional['soupsieve.SoupSieve']:
+    try:
+        return _compiled_selectors[selector]
+    except KeyError:
+        pass
+    import soupsieve
+    try:
+        compiled = soupsieve.compile(selector)
+    except Exception as e:
+        logger.error(f"Error while trying to compile the CSS selector {selector!r}: {e}")
+        compiled = None
+    _compiled_selectors[selector] = compiled
+    return compiled
+
+def _selector_keys(compiled: 'soupsieve.SoupSieve') -> List[Tuple[str, str]]:
+    """
+    Returns one ('id', value), ('class', value) or ('tag', name) key per alternative 
+    of the selector, that any element matching this alternative has. 
+    Returns an empty list if the selector can match any element, or its alternatives can't be read.
+
+    The alternatives are read from the private attributes of the compiled selector, 
+    see _SOUPSIEVE_MAJOR_VERSIONS.
+    """
+    keys = []
+    for selector in getattr(compiled, 'selectors', None) or ():
+        ids = getattr(selector, 'ids', None)
+        classes = getattr(selector, 'classes', None)
+        tag_name = getattr(getattr(selector, 'tag', None), 'name', None)
+        if ids:
+            keys.append(('id', ids[0].lower()))
+        elif classes:
+            keys.append(('class', classes[0].lower()))
+        elif isinstance(tag_name, str) and tag_name != '*':
+            keys.append(('tag', tag_name.lower()))
+        else:
+            return []
+    return keys
+
+class _ScriptsAndMetaTarget:
+    """
+    lxml parser target collecting the <script src> and <meta name content> tags
+    from the parser events, without building any tree.
+    """
+    def __init__(self) -> None:
+        self.scripts: List[str] = []
+        self.meta: Dict[str, str] = {}
+
+    def start(self, tag: str, attrib: Mapping[str, str]) -> None:
+        if tag == 'script':
+            src = attrib.get('src')
+            if src is not None:
+                self.scripts.append(src)
+        elif tag == 'meta':
+            name, content = attrib.get('name'), attrib.get('content')
+            if name is not None and content is not None:
+                self.meta[name.lower()] = content
+
+    def end(self, tag: str) -> None:
+        pass
+
+    def data(self, data: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
 class Tag(BaseTag):
 
-    def __init__(self, name: str, attributes: Mapping[str, str], soup: bs4_Tag) -> None:
+    def __init__(self, name: str, attributes: Mapping[str, Any], soup: 'bs4_Tag') -> None:
         super().__init__(name, attributes)
         self._soup = soup
     
@@ -32,7 +112,8 @@ class WebPage(BaseWebPage):
 
     This object is designed to be created for each website scanned
     by python-Wappalyzer. 
-    It will parse the HTML with BeautifulSoup to find <script> and <meta> tags.
+    It will parse the HTML with lxml to find <script> and <meta> tags, 
+    and only build the BeautifulSoup tree if the DOM is queried.
 
     You can create it from manually from HTML with the `WebPage()` method
     or from the class methods. 
@@ -40,16 +121,37 @@ class WebPage(BaseWebPage):
 
     def _parse_html(self):
         """
-        Parse the HTML with BeautifulSoup to find <script> and <meta> tags.
+        Find <script> and <meta> tags with a single streaming pass of the lxml parser.
+
+        The BeautifulSoup tree is only built when the DOM is first queried with select().
+        """
+        target = _ScriptsAndMetaTarget()
+        # Same parser as BeautifulSoup's 'lxml' tree builder, so the same tags are found
+        parser = etree.HTMLParser(target=target, recover=True)
+        try:
+            parser.feed(self.html)
+            parser.close()
+        except (UnicodeDecodeError, LookupError, etree.LxmlError) as e:
+            logger.debug(f"Falling back to BeautifulSoup to find <script> and <meta> tags of the webpage {self.url}: {e}")
+            soup = self._parsed_html
+            self.scripts.extend(script['src'] for script in
+                            soup.findAll('script', src=True))
+            self.meta = {
+                meta['name'].lower():
+                    meta['content'] for meta in soup.findAll(
+                        'meta', attrs=dict(name=True, content=True))
+            }
+        else:
+            self.scripts.extend(target.scripts)
+            self.meta = target.meta
+
+    @cached_property
+    def _parsed_html(self) -> 'BeautifulSoup':
+        """
+        Parse the HTML with BeautifulSoup, on first use.
         """
-        self._parsed_html = soup = BeautifulSoup(self.html, 'lxml')
-        self.scripts.extend(script['src'] for script in
-                        soup.findAll('script', src=True))
-        self.meta = {
-            meta['name'].lower():
-                meta['content'] for meta in soup.findAll(
-                    'meta', attrs=dict(name=True, content=True))
-        }
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(self.html, 'lxml')
     
     def select(self, selector: str) -> Iterable[Tag]:
         """Execute a CSS select and returns results as Tag objects."""
@@ -60,4 +162,53 @@ class WebPage(BaseWebPage):
             logger.error(f"Error while trying to query the CSS selector {selector!r} on the webpge {self.url} DOM: {e}")
             return ()
 
+    def select_all(self, selectors: Iterable[str]) -> Mapping[str, List[Tag]]:
+        """
+        Execute many CSS selects in a single walk of the DOM and returns the Tag objects matching each selector.
+
+        Each element is only tested against the selectors that could match its tag name, id or classes, 
+        and is wrapped in at most one Tag object, so its inner HTML is serialized at most once.
+        """
+        import soupsieve
+        if soupsieve.__version_info__[0] not in _SOUPSIEVE_MAJOR_VERSIONS:
+            return {selector: list(self.select(selector)) for selector in selectors}
+        results: Dict[str, List[Tag]] = {selector: [] for selector in selectors}
+        anywhere: List[Tuple[str, 'soupsieve.SoupSieve']] = []
+        by_key: Dict[Tuple[str, str], List[Tuple[str, 'soupsieve.SoupSieve']]] = {}
+        for selector in results:
+            compiled = _compile_selector(selector)
+            if compiled is None:
+                continue
+            keys = _selector_keys(compiled)
+            if not keys:
+                anywhere.append((selector, compiled))
+            for key in keys:
+                by_key.setdefault(key, []).append((selector, compiled))
+        if not anywhere and not by_key:
+            return results
+
+        from bs4 import Tag as bs4_Tag
+
+        for element in self._parsed_html.descendants:
+            if not isinstance(element, bs4_Tag):
+                continue
+            candidates = anywhere + by_key.get(('tag', element.name.lower()), [])
+            _id = element.get('id')
+            if isinstance(_id, str):
+                candidates.extend(by_key.get(('id', _id.lower()), ()))
+            for _class in element.get('class') or ():
+                candidates.extend(by_key.get(('class', _class.lower()), ()))
+            tag = None
+            tested = set()
+            for selector, compiled in candidates:
+                # selectors with alternatives can be candidates more than once
+                if selector in tested:
+                    continue
+                tested.add(selector)
+                if compiled.match(element):
+                    if tag is None:
+                        tag = Tag(element.name, element.attrs, element)
+                    results[selector].append(tag)
+        return results
+
 
@@ -4,15 +4,22 @@ Wraps only the information strictly necessary to run the Wappalyzer engine.
 """
 
 import abc
-from typing import Iterable, List, Mapping, Any
+import os
+import sys
+from typing import TYPE_CHECKING, AbstractSet, Dict, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Sequence, Tuple, Type, Any
 try:
     from typing import Protocol
 except ImportError:
     Protocol = object # type: ignore
 
-import aiohttp
-import requests
-from requests.structures import CaseInsensitiveDict
+from ._fetch import CHUNK_SIZE, MAX_BYTES, check_content_type, decode, read_capped
+
+# The HTTP clients are only imported by the methods using them, see new_from_url() and new_from_url_async()
+if TYPE_CHECKING:
+    import aiohttp
+    import requests
+    from concurrent.futures import Executor
+    from .features import PageFeatures
 
 def _raise_not_dict(obj:Any, name:str) -> None:
     try:
@@ -20,13 +27,47 @@ def _raise_not_dict(obj:Any, name:str) -> None:
     except AttributeError: 
         raise ValueError(f"{name} must be a dictionary-like object")
 
+class CaseInsensitiveDict(MutableMapping[str, str]):
+    """
+    A dictionary with case-insensitive string keys, that remembers the case of the last key set.
+
+    Same as `requests.structures.CaseInsensitiveDict`, without importing `requests`.
+    """
+    def __init__(self, data:Optional[Mapping[str, str]]=None) -> None:
+        self._store: Dict[str, Tuple[str, str]] = {}
+        if data is not None:
+            self.update(data)
+
+    def __setitem__(self, key:str, value:str) -> None:
+        self._store[key.lower()] = (key, value)
+
+    def __getitem__(self, key:str) -> str:
+        return self._store[key.lower()][1]
+
+    def __delitem__(self, key:str) -> None:
+        del self._store[key.lower()]
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, _ in self._store.values())
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __contains__(self, key:object) -> bool:
+        return isinstance(key, str) and key.lower() in self._store
+
+    def __repr__(self) -> str:
+        return str(dict(self.items()))
+
 class ITag(Protocol):
     """
     A HTML tag, decoupled from any particular HTTP library's API.
     """
     name: str
     attributes: Mapping[str, str]
-    inner_html: str
+    @property
+    def inner_html(self) -> str:
+        raise NotImplementedError()
 
 class BaseTag(ITag, abc.ABC):
     """
@@ -37,7 +78,7 @@ class BaseTag(ITag, abc.ABC):
         self.name = name
         self.attributes = attributes
     @property
-    def inner_html(self) -> str: # type: ignore
+    def inner_html(self) -> str:
         """Returns the inner HTML of an element as a UTF-8 encoded bytestring"""
         raise NotImplementedError()
 
@@ -54,6 +95,13 @@ class IWebPage(Protocol):
     meta: Mapping[str, str]
     def select(self, selector:str) -> Iterable[ITag]: 
         raise NotImplementedError()
+    def select_all(self, selectors:Iterable[str]) -> Mapping[str, Sequence[ITag]]:
+        """
+        Execute many CSS selects, returns the matching tags of each selector.
+
+        Subclasses can override this to evaluate all the selectors in a single walk of the DOM.
+        """
+        return {selector: list(self.select(selector)) for selector in selectors}
 
 class BaseWebPage(IWebPage):
     """
@@ -82,9 +130,19 @@ class BaseWebPage(IWebPage):
 
     def _parse_html(self):
         raise NotImplementedError()
+
+    def features(self, keep_html: bool = False) -> 'PageFeatures':
+        """
+        Returns a compact snapshot of the features of the page, to analyze it again later
+        without parsing it, see `Wappalyzer.features`.
+
+        :param keep_html: Keep the html, compressed, so that the html patterns and CSS selectors can be evaluated.
+        """
+        from .features import PageFeatures
+        return PageFeatures.from_webpage(self, keep_html)
     
     @classmethod
-    def new_from_url(cls, url: str, **kwargs:Any) -> IWebPage:
+    def new_from_url(cls, url: str, max_bytes: Optional[int] = MAX_BYTES, **kwargs:Any) -> IWebPage:
         """
         Constructs a new WebPage object for the URL,
         using the `requests` module to fetch the HTML.
@@ -92,31 +150,47 @@ class BaseWebPage(IWebPage):
         >>> from Wappalyzer import WebPage
         >>> page = WebPage.new_from_url('exemple.com', timeout=5)
 
+        The body is streamed and at most `max_bytes` of it are read.
+
         :param url: URL 
+        :param max_bytes: (optional) Maximum number of bytes of the body read, None for no limit.
         :param headers: (optional) Dictionary of HTTP Headers to send.
         :param cookies: (optional) Dict or CookieJar object to send.
         :param timeout: (optional) How many seconds to wait for the server to send data before giving up. 
         :param proxies: (optional) Dictionary mapping protocol to the URL of the proxy.
         :param verify: (optional) Boolean, it controls whether we verify the SSL certificate validity. 
         :param \*\*kwargs: Any other arguments are passed to `requests.get` method as well. 
+        :raises ValueError: If the content type of the response can't hold HTML.
         """
-        response = requests.get(url, **kwargs)
-        return cls.new_from_response(response)
+        import requests
+        kwargs['stream'] = True
+        with requests.get(url, **kwargs) as response:
+            return cls.new_from_response(response, max_bytes=max_bytes)
 
     @classmethod
-    def new_from_response(cls, response:requests.Response) -> IWebPage:
+    def new_from_response(cls, response:'requests.Response', max_bytes: Optional[int] = MAX_BYTES) -> IWebPage:
         """
         Constructs a new WebPage object for the response,
         using the `BeautifulSoup` module to parse the HTML.
 
-        :param response: `requests.Response` object
+        The charset is read from the headers or the ``<meta charset>`` of the page, and only 
+        detected on the beginning of the body if both are missing and the body is not UTF-8.
+
+        :param response: `requests.Response` object, preferably fetched with ``stream=True``.
+        :param max_bytes: (optional) Maximum number of bytes of the body read, None for no limit.
+        :raises ValueError: If the content type of the response can't hold HTML.
         """
-        return cls(response.url, html=response.text, headers=response.headers)
+        content_type = response.headers.get('Content-Type')
+        check_content_type(content_type, response.url)
+        body = read_capped(response.iter_content(CHUNK_SIZE), max_bytes)
+        return cls(response.url, html=decode(body, content_type), headers=response.headers)
 
 
     @classmethod
     async def new_from_url_async(cls, url: str, verify: bool = True,
-                                 aiohttp_client_session: aiohttp.ClientSession = None, **kwargs:Any) -> IWebPage:
+                                 aiohttp_client_session: Optional['aiohttp.ClientSession'] = None, 
+                                 executor: Optional['Executor'] = None, 
+                                 max_bytes: Optional[int] = MAX_BYTES, **kwargs:Any) -> IWebPage:
         """
         Same as new_from_url only Async.
 
@@ -135,19 +209,29 @@ class BaseWebPage(IWebPage):
         :param cookies: Dict. HTTP Cookies to send with the request (optional).
         :param timeout: Int. override the session's timeout (optional)
         :param proxy: Proxy URL, `str` or `yarl.URL` (optional).
+        :param executor: (optional) Executor the HTML is parsed in, see new_from_response_async.
+        :param max_bytes: (optional) Maximum number of bytes of the body read, None for no limit.
         :param \*\*kwargs: Any other arguments are passed to `aiohttp.ClientSession.get` method as well. 
 
+        Pass a session to reuse its connections across requests, 
+        otherwise a new session is created and closed for this request.
         """
 
         if not aiohttp_client_session:
+            import aiohttp
+            # Don't leak the connector of a session used for a single request
             connector = aiohttp.TCPConnector(ssl=verify)
-            aiohttp_client_session = aiohttp.ClientSession(connector=connector)
+            async with aiohttp.ClientSession(connector=connector) as session:
+                return await cls.new_from_url_async(url, aiohttp_client_session=session, 
+                                                    executor=executor, max_bytes=max_bytes, **kwargs)
 
         async with aiohttp_client_session.get(url, **kwargs) as response:
-            return await cls.new_from_response_async(response)
+            return await cls.new_from_response_async(response, executor=executor, max_bytes=max_bytes)
 
     @classmethod
-    async def new_from_response_async(cls, response:aiohttp.ClientResponse) -> IWebPage:
+    async def new_from_response_async(cls, response:'aiohttp.ClientResponse', 
+                                      executor: Optional['Executor'] = None,
+                                      max_bytes: Optional[int] = MAX_BYTES) -> IWebPage:
         """
         Constructs a new WebPage object for the response,
         using the `BeautifulSoup` module to parse the HTML.
@@ -160,6 +244,103 @@ class BaseWebPage(IWebPage):
         >>> webpage = await WebPage.new_from_response_async(page)
 
         :param response: `aiohttp.ClientResponse` object
+        :param executor: (optional) Executor the body is decoded and parsed in, a thread or process pool,
+            so that parsing doesn't block the event loop. By default, it's parsed in the event loop.
+        :param max_bytes: (optional) Maximum number of bytes of the body read, None for no limit.
+        :raises ValueError: If the content type of the response can't hold HTML.
+
+        The body is streamed and its charset resolved as in `new_from_response`.
         """
-        html = await response.text()
-        return cls(str(response.url), html=html, headers=response.headers)
\ No newline at end of file
+        url, body, content_type, headers = await read_response_async(response, max_bytes)
+        if executor is None:
+            return new_from_body(cls, url, body, content_type, headers)
+        import asyncio
+        # Decoded in the executor too, detecting the charset of a big body takes a while
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, new_from_body, cls, url, body, content_type, headers)
+
+def new_from_body(cls: Type['BaseWebPage'], url: str, body: bytes, content_type: Optional[str],
+                  headers: Mapping[str, str]) -> 'BaseWebPage':
+    """
+    Returns a WebPage of the class for the body read by `read_response_async`, decoded with its charset.
+    """
+    return cls(url, html=decode(body, content_type), headers=headers)
+
+async def read_response_async(response:'aiohttp.ClientResponse', 
+                              max_bytes: Optional[int] = MAX_BYTES) -> Tuple[str, bytes, Optional[str], CaseInsensitiveDict]:
+    """
+    Returns the ``(url, body, content_type, headers)`` of the response, reading the body 
+    as `BaseWebPage.new_from_response_async` does. The body is not decoded here, 
+    so that it can be decoded off the event loop, see `Wappalyzer._analyze_body`.
+
+    :raises ValueError: If the content type of the response can't hold HTML.
+    """
+    content_type = response.headers.get('Content-Type')
+    check_content_type(content_type, str(response.url))
+    body = bytearray()
+    while max_bytes is None or len(body) < max_bytes:
+        chunk = await response.content.read(CHUNK_SIZE if max_bytes is None else min(CHUNK_SIZE, max_bytes - len(body)))
+        if not chunk:
+            break
+        body += chunk
+    # The aiohttp headers can't be sent to another process
+    return str(response.url), bytes(body), content_type, CaseInsensitiveDict(response.headers)
+
+# The WebPage implementations, by backend name, and the one used by default.
+BACKENDS = {'bs4': '._bs4', 'lxml': '._lxml'}
+_backend = os.environ.get('WAPPALYZER_BACKEND', 'bs4')
+
+def clear_selector_caches(keep: AbstractSet[str] = frozenset()) -> None:
+    """
+    Forget the CSS selectors compiled so far by the backends already imported.
+
+    :param keep: (optional) Selectors kept compiled.
+    """
+    for module_name in BACKENDS.values():
+        module = sys.modules.get(__package__ + module_name)
+        if module is None:
+            continue
+        compiled_selectors: Dict[str, Any] = module._compiled_selectors # type: ignore
+        # Selectors can be compiled by other threads meanwhile
+        for selector in list(compiled_selectors):
+            if selector not in keep:
+                compiled_selectors.pop(selector, None)
+
+def set_backend(name: str) -> None:
+    """
+    Select the implementation of `Wappalyzer.WebPage`, for the pages created from now on.
+
+    >>> import Wappalyzer
+    >>> Wappalyzer.set_backend('lxml')
+
+    :param name: 'bs4', the default, parses the HTML with BeautifulSoup and evaluates the CSS selectors with soupsieve.
+        'lxml' evaluates them on the lxml tree, translated to XPath, depends on `cssselect`.
+        The default can also be set with the ``WAPPALYZER_BACKEND`` environment variable.
+    :raises ValueError: If the backend is unknown.
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown WebPage backend {name!r}, use one of {', '.join(BACKENDS)}")
+    _backend = name
+
+def backend_name(page: Optional[IWebPage] = None) -> str:
+    """
+    Returns the name of the backend the DOM of the page is queried with: the one of its WebPage class, 
+    or the one selected with `set_backend` for other pages, e.g. `PageFeatures` snapshots parsed on demand.
+    """
+    if isinstance(page, BaseWebPage):
+        for klass in type(page).__mro__:
+            for name, module_name in BACKENDS.items():
+                if klass.__module__ == __package__ + module_name:
+                    return name
+    return _backend
+
+def webpage_class(backend: Optional[str] = None) -> Type[BaseWebPage]:
+    """
+    Returns the WebPage class of the backend, the one selected with `set_backend` by default.
+    """
+    import importlib
+    name = backend or _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown WebPage backend {name!r}, use one of {', '.join(BACKENDS)}")
+    return importlib.import_module(BACKENDS[name], __package__).WebPage # type: ignore
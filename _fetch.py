@@ -0,0 +1,120 @@
+"""
+Helpers to read HTTP response bodies: size cap, content type and charset.
+
+Bodies are read in chunks up to a byte cap, so a gigantic response costs at most
+the cap in memory and time. The charset is resolved from the ``Content-Type`` header,
+a byte order mark or a ``<meta charset>`` tag. Only if none is found, and the body is
+not valid UTF-8, is the charset detected, over a small prefix of the body.
+
+This module is an implementation detail and is not considered public API.
+"""
+import codecs
+import re
+import logging
+from typing import Iterable, Optional
+
+logger = logging.getLogger(name="python-Wappalyzer")
+
+# Default maximum number of bytes of a body read, the rest is ignored.
+MAX_BYTES = 10 * 1024 * 1024
+
+# Size of the chunks the bodies are read by.
+CHUNK_SIZE = 64 * 1024
+
+# Number of bytes searched for a <meta charset>, as in the HTML standard.
+META_PREFIX = 1024
+
+# Number of bytes the charset is detected on.
+DETECTION_PREFIX = 64 * 1024
+
+_BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+_HEADER_CHARSET_REGEXP = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+# Matches <meta charset="..."> and <meta http-equiv="Content-Type" content="text/html; charset=...">
+_META_CHARSET_REGEXP = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+
+
+def check_content_type(content_type: Optional[str], url: str) -> None:
+    """
+    Raise ValueError if the content type can't hold HTML, e.g. an image or an archive.
+    Responses without a content type are accepted.
+    """
+    if not content_type:
+        return
+    mime = content_type.split(';', 1)[0].strip().lower()
+    if not mime or mime.startswith('text/') or 'html' in mime or 'xml' in mime:
+        return
+    raise ValueError(f"The content type {mime!r} of {url} can't hold HTML")
+
+
+def read_capped(chunks: Iterable[bytes], max_bytes: Optional[int]) -> bytes:
+    """
+    Join the chunks, stopping once `max_bytes` are read.
+    """
+    body = bytearray()
+    for chunk in chunks:
+        body += chunk
+        if max_bytes is not None and len(body) >= max_bytes:
+            del body[max_bytes:]
+            break
+    return bytes(body)
+
+
+def _valid(encoding: Optional[str]) -> Optional[str]:
+    if not encoding:
+        return None
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        logger.debug(f"Ignoring the unknown charset {encoding!r}")
+        return None
+
+
+def _detect(prefix: bytes) -> Optional[str]:
+    """
+    Detect the charset of the prefix with the module used by `requests`, if available.
+    """
+    try:
+        import charset_normalizer # type: ignore
+    except ImportError:
+        try:
+            import chardet # type: ignore
+        except ImportError:
+            return None
+        return chardet.detect(prefix)['encoding']
+    best = charset_normalizer.from_bytes(prefix).best()
+    return best.encoding if best is not None else None
+
+
+def resolve_charset(body: bytes, content_type: Optional[str]) -> str:
+    """
+    Returns the charset of the body: the one of the content type, the byte order mark,
+    or the <meta charset>. Otherwise UTF-8 if the body is valid UTF-8, or the charset
+    detected on the beginning of the body.
+    """
+    header_match = _HEADER_CHARSET_REGEXP.search(content_type or '')
+    encoding = _valid(header_match.group(1)) if header_match else None
+    if encoding:
+        return encoding
+    for bom, encoding in _BOMS:
+        if body.startswith(bom):
+            return encoding
+    meta_match = _META_CHARSET_REGEXP.search(body, 0, META_PREFIX)
+    encoding = _valid(meta_match.group(1).decode('ascii')) if meta_match else None
+    if encoding:
+        return encoding
+    try:
+        body.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as err:
+        # A multi-byte character cut by the byte cap is still UTF-8
+        if err.start >= len(body) - 3 and err.reason == 'unexpected end of data':
+            return 'utf-8'
+    return _valid(_detect(body[:DETECTION_PREFIX])) or 'utf-8'
+
+
+def decode(body: bytes, content_type: Optional[str]) -> str:
+    """
+    Decode the body with its charset, undecodable bytes are replaced.
+    """
+    return body.decode(resolve_charset(body, content_type), errors='replace')
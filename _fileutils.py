@@ -0,0 +1,25 @@
+"""
+File helpers.
+
+This module is an implementation detail and is not considered public API.
+"""
+import os
+import pathlib
+
+
+def write_atomic(path: pathlib.Path, data: bytes) -> None:
+    """
+    Write the file through a temporary file renamed over it, so readers
+    never see a partially written file.
+    """
+    import tempfile
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmpfile:
+            tmpfile.write(data)
+        # mkstemp creates files only readable by their owner
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,241 @@
+"""
+Implementation of WebPage based on lxml only, without BeautifulSoup, depends on lxml and cssselect.
+
+CSS selectors are translated once to compiled XPath expressions, evaluated by libxml2.
+"""
+import html
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+try:
+    from functools import cached_property
+except ImportError:
+    # Python < 3.8, the cached_property package imports asyncio, which is slow to import
+    from cached_property import cached_property # type: ignore
+
+from lxml import etree # type: ignore
+try:
+    from cssselect import HTMLTranslator # type: ignore
+except ImportError as err:
+    raise ImportError("The lxml WebPage backend depends on cssselect: pip install cssselect") from err
+
+from ._bs4 import _ScriptsAndMetaTarget
+from ._common import BaseWebPage, BaseTag
+
+logger = logging.getLogger(name="python-Wappalyzer")
+
+# Compiled CSS selectors, None when the selector is not supported.
+_compiled_selectors: Dict[str, Optional[etree.XPath]] = {}
+
+# Attributes holding a list of values, split as BeautifulSoup does so that both backends give the same results.
+_LIST_ATTRIBUTES = {
+    '*': {'class', 'accesskey', 'dropzone'},
+    'a': {'rel', 'rev'},
+    'link': {'rel', 'rev'},
+    'td': {'headers'},
+    'th': {'headers'},
+    'form': {'accept-charset'},
+    'object': {'archive'},
+    'area': {'rel'},
+    'icon': {'sizes'},
+    'iframe': {'sandbox'},
+    'output': {'for'},
+}
+
+# Elements whose text is not escaped when serialized.
+_RAW_TEXT_ELEMENTS = {'script', 'style'}
+
+# Content after the end of the <html> element, that libxml2 drops when it builds the tree itself.
+_AFTER_HTML_END = re.compile(r'</html\b[^>]*>\s*\S', re.I)
+
+# Root of the tree of pages having content after </html>, never returned by the CSS selectors.
+_DOCUMENT_TAG = 'wappalyzer-document'
+
+# Prefix of the element and attribute names that lxml rejects when building a tree from Python,
+# e.g. Vue's :class and @click attributes, encoded to be kept in the tree. See _decode_name.
+_ENCODED_NAME_PREFIX = 'wappalyzer-encoded-'
+_ENCODED_NAME = re.compile(_ENCODED_NAME_PREFIX + '([0-9a-f]+)')
+
+
+def _decode_name(name: str) -> str:
+    if name.startswith(_ENCODED_NAME_PREFIX):
+        return bytes.fromhex(name[len(_ENCODED_NAME_PREFIX):]).decode('utf-8')
+    return name
+
+
+class _DocumentTarget:
+    """
+    Parser target building the tree of a page with content after </html>: 
+    it starts a new <html> element, as with BeautifulSoup, instead of being dropped. 
+    All the <html> elements are children of a `_DOCUMENT_TAG` element.
+    """
+    def __init__(self) -> None:
+        self._builder = etree.TreeBuilder()
+        self._builder.start(_DOCUMENT_TAG, {})
+        # Names rejected by lxml, and their encoded form
+        self._encoded: Dict[str, str] = {}
+
+    def _name(self, name: str) -> str:
+        encoded = self._encoded.get(name)
+        if encoded is None:
+            try:
+                etree.Element(name, {name: ''})
+                encoded = name
+            except ValueError:
+                encoded = _ENCODED_NAME_PREFIX + name.encode('utf-8').hex()
+            self._encoded[name] = encoded
+        return encoded
+
+    def start(self, tag: str, attrib: Mapping[str, str]) -> None:
+        try:
+            self._builder.start(tag, attrib)
+        except ValueError:
+            # Names valid in HTML but not in XML, the parser keeps them when it builds the tree itself
+            self._builder.start(self._name(tag), {self._name(name): value for name, value in attrib.items()})
+
+    def end(self, tag: str) -> None:
+        self._builder.end(self._encoded.get(tag, tag))
+
+    def data(self, data: str) -> None:
+        self._builder.data(data)
+
+    def comment(self, text: str) -> None:
+        self._builder.comment(text)
+
+    def pi(self, target: str, data: Optional[str] = None) -> None:
+        self._builder.pi(target, data)
+
+    def close(self) -> etree._Element:
+        self._builder.end(_DOCUMENT_TAG)
+        return self._builder.close()
+
+def _compile_selector(selector: str) -> Optional[etree.XPath]:
+    try:
+        return _compiled_selectors[selector]
+    except KeyError:
+        pass
+    try:
+        compiled = etree.XPath(HTMLTranslator().css_to_xpath(selector))
+    except Exception as e:
+        logger.error(f"Error while trying to compile the CSS selector {selector!r}: {e}")
+        compiled = None
+    _compiled_selectors[selector] = compiled
+    return compiled
+
+class Tag(BaseTag):
+    """
+    Wraps a lxml element, its attributes and inner HTML are computed on first use.
+    """
+    def __init__(self, element: etree._Element) -> None:
+        self.name = _decode_name(element.tag)
+        self._element = element
+
+    @cached_property
+    def attributes(self) -> Mapping[str, Union[str, List[str]]]: # type: ignore
+        list_attributes = _LIST_ATTRIBUTES['*'] | _LIST_ATTRIBUTES.get(self.name, set())
+        return {_decode_name(name): value.split() if name in list_attributes else value
+                for name, value in self._element.attrib.items()}
+
+    @cached_property
+    def inner_html(self) -> str:
+        element = self._element
+        parts = []
+        if element.text:
+            parts.append(element.text if element.tag in _RAW_TEXT_ELEMENTS else html.escape(element.text, quote=False))
+        parts.extend(etree.tostring(child, method='html', encoding='unicode', with_tail=True) for child in element)
+        inner_html = ''.join(parts)
+        if _ENCODED_NAME_PREFIX in inner_html:
+            inner_html = _ENCODED_NAME.sub(lambda match: _decode_name(match.group(0)), inner_html)
+        return inner_html
+
+class WebPage(BaseWebPage):
+    """
+    Simple representation of a web page, decoupled
+    from any particular HTTP library's API.
+
+    Same as the BeautifulSoup based WebPage, but the HTML is parsed into a lxml tree
+    that CSS selectors are evaluated on as XPath expressions.
+    Selected with ``Wappalyzer.set_backend('lxml')``.
+    """
+
+    @cached_property
+    def _root(self) -> Optional[etree._Element]:
+        """
+        The lxml tree of the page, parsed on first use.
+        """
+        # Same parser as BeautifulSoup's 'lxml' tree builder, so the same tree is built.
+        # Building the tree from Python callbacks is slower, only do it when needed.
+        if _AFTER_HTML_END.search(self.html):
+            try:
+                return self._parse(_DocumentTarget())
+            except Exception as e:
+                # The content after </html> is dropped rather than failing the analysis
+                logger.debug(f"Could not parse the content after </html> of the webpage {self.url}: {e!r}")
+        try:
+            return self._parse(None)
+        except (UnicodeDecodeError, LookupError, etree.LxmlError) as e:
+            logger.debug(f"Could not parse the HTML of the webpage {self.url}: {e}")
+            return None
+
+    def _parse(self, target: Optional[_DocumentTarget]) -> etree._Element:
+        parser = etree.HTMLParser(target=target, recover=True)
+        parser.feed(self.html)
+        return parser.close()
+
+    def _parse_html(self):
+        """
+        Find <script> and <meta> tags with a single streaming pass of the lxml parser.
+
+        The lxml tree is only built when the DOM is first queried, see _root.
+        """
+        target = _ScriptsAndMetaTarget()
+        parser = etree.HTMLParser(target=target, recover=True)
+        try:
+            parser.feed(self.html)
+            parser.close()
+        except (UnicodeDecodeError, LookupError, etree.LxmlError) as e:
+            logger.debug(f"Could not find the <script> and <meta> tags of the webpage {self.url}: {e}")
+            return
+        self.scripts.extend(target.scripts)
+        self.meta = target.meta
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # lxml trees can't be pickled, e.g. to be analyzed in a process pool: 
+        # the tree is parsed again if the DOM is queried
+        state = self.__dict__.copy()
+        state.pop('_root', None)
+        return state
+
+    def _xpath(self, selector: str) -> List[etree._Element]:
+        compiled = _compile_selector(selector)
+        if compiled is None or self._root is None:
+            return []
+        try:
+            elements = compiled(self._root)
+        except Exception as e:
+            logger.error(f"Error while trying to query the CSS selector {selector!r} on the webpge {self.url} DOM: {e}")
+            return []
+        if self._root.tag == _DOCUMENT_TAG:
+            return [element for element in elements if element is not self._root]
+        return elements
+
+    def select(self, selector: str) -> Iterable[Tag]:
+        """Execute a CSS select and returns results as Tag objects."""
+        return [Tag(element) for element in self._xpath(selector)]
+
+    def select_all(self, selectors: Iterable[str]) -> Mapping[str, List[Tag]]:
+        """
+        Execute many CSS selects and returns the Tag objects matching each selector.
+
+        Each element is wrapped in at most one Tag object, so its inner HTML is serialized at most once.
+        """
+        tags: Dict[Any, Tag] = {}
+        results: Dict[str, List[Tag]] = {}
+        for selector in selectors:
+            matches = results[selector] = []
+            for element in self._xpath(selector):
+                tag = tags.get(element)
+                if tag is None:
+                    tag = tags[element] = Tag(element)
+                matches.append(tag)
+        return results
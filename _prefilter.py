@@ -0,0 +1,162 @@
+"""
+Literal prefilter for regular expression patterns.
+
+Extracts the literal substrings a pattern cannot match without, and finds all of
+them in a text with a single pass of a multi-pattern automaton. Only the patterns
+whose literals are present need to run their full regular expression.
+
+This module is an implementation detail and is not considered public API.
+"""
+import re
+from typing import AbstractSet, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+try:
+    from re import _parser as sre_parse  # type: ignore
+    from re import _constants as sre_constants  # type: ignore
+except ImportError:
+    import sre_parse  # type: ignore
+    import sre_constants  # type: ignore
+
+try:
+    import ahocorasick  # type: ignore
+except ImportError:
+    ahocorasick = None
+
+# Shorter literals are found on almost every page, they don't filter anything.
+MIN_LITERAL_LENGTH = 3
+
+# Characters that re.IGNORECASE matches against ASCII letters but that
+# str.lower() maps to something else.
+_CASE_FOLD_ODDITIES = (('İ', 'i'), ('ı', 'i'), ('ſ', 's'))
+
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+
+
+def _sequence_literals(items: Iterable[Tuple[object, object]]) -> Optional[FrozenSet[str]]:
+    """
+    Returns the best set of alternative literals required by a parsed sequence:
+    any match of the sequence contains at least one of them.
+    """
+    candidates: List[FrozenSet[str]] = []
+    run: List[str] = []
+
+    def flush() -> None:
+        if run:
+            candidates.append(frozenset([''.join(run)]))
+            run.clear()
+
+    for op, av in items:
+        if op is sre_constants.LITERAL and av < 128:  # type: ignore
+            run.append(chr(av).lower())  # type: ignore
+            continue
+        flush()
+        if op is sre_constants.SUBPATTERN:
+            found = _sequence_literals(av[-1])  # type: ignore
+        elif op in _REPEATS and av[0] >= 1:  # type: ignore
+            found = _sequence_literals(av[2])  # type: ignore
+        elif op is sre_constants.BRANCH:
+            branches = [_sequence_literals(b) for b in av[1]]  # type: ignore
+            found = frozenset().union(*branches) if all(branches) else None  # type: ignore
+        else:
+            found = None
+        if found:
+            candidates.append(found)
+    flush()
+
+    candidates = [c for c in candidates if min(map(len, c)) >= MIN_LITERAL_LENGTH]
+    if not candidates:
+        return None
+    # The rarest requirement is the one with the longest shortest alternative.
+    return max(candidates, key=lambda c: (min(map(len, c)), -len(c)))
+
+
+def required_literals(expression: str) -> Optional[FrozenSet[str]]:
+    """
+    Returns lowercase literals such that any case-insensitive match of the expression
+    contains at least one of them, or None if no such literals can be extracted.
+    """
+    try:
+        return _sequence_literals(sre_parse.parse(expression, re.I))
+    except Exception:
+        return None
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercase the text the same way the literals are.
+    """
+    if not text.isascii():
+        for char, replacement in _CASE_FOLD_ODDITIES:
+            if char in text:
+                text = text.replace(char, replacement)
+    return text.lower()
+
+
+class LiteralMatcher:
+    """
+    Finds which of a set of literals occur in a text, in one pass.
+
+    Uses `pyahocorasick` when it's available, otherwise a regular expression
+    built as a trie of the literals.
+    """
+
+    def __init__(self, literals: Iterable[str]) -> None:
+        self.literals: FrozenSet[str] = frozenset(literals)
+        self._automaton = None
+        self._regex: Optional['re.Pattern'] = None
+        # Maps each literal to all the literals it contains, itself included.
+        self._contained: Dict[str, FrozenSet[str]] = {}
+        if not self.literals:
+            return
+        if ahocorasick is not None:
+            self._automaton = automaton = ahocorasick.Automaton()
+            for literal in self.literals:
+                automaton.add_word(literal, literal)
+            automaton.make_automaton()
+        else:
+            trie: Dict[str, dict] = {}
+            for literal in self.literals:
+                node = trie
+                for char in literal:
+                    node = node.setdefault(char, {})
+                node[''] = {}
+            # The lookahead reports the longest literal starting at each position,
+            # the shorter ones are recovered from the containment table.
+            self._regex = re.compile('(?=(%s))' % self._trie_regex(trie))
+            self._contained = {literal: self._find_contained(trie, literal) for literal in self.literals}
+
+    @classmethod
+    def _trie_regex(cls, node: Dict[str, dict]) -> str:
+        alternatives = [re.escape(char) + cls._trie_regex(child)
+                        for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ''
+        expression = alternatives[0] if len(alternatives) == 1 else '(?:%s)' % '|'.join(alternatives)
+        if '' in node:
+            expression = '(?:%s)?' % expression
+        return expression
+
+    @staticmethod
+    def _find_contained(trie: Dict[str, dict], literal: str) -> FrozenSet[str]:
+        contained = set()
+        for start in range(len(literal)):
+            node = trie
+            for end in range(start, len(literal)):
+                node = node.get(literal[end])  # type: ignore
+                if node is None:
+                    break
+                if '' in node:
+                    contained.add(literal[start:end + 1])
+        return frozenset(contained)
+
+    def search(self, text: str) -> AbstractSet[str]:
+        """
+        Returns the literals found in the text. The text must be normalized.
+        """
+        if self._automaton is not None:
+            return {literal for _, literal in self._automaton.iter(text)}
+        if self._regex is None:
+            return frozenset()
+        found: Set[str] = set()
+        for longest in {m.group(1) for m in self._regex.finditer(text)}:
+            found.update(self._contained[longest])
+        return found
@@ -0,0 +1,142 @@
+"""
+Binary snapshots of the prepared fingerprints.
+
+A snapshot is a pickle of the categories and fingerprints built from a technologies file,
+and of the technologies implied by each fingerprint, preceded by a header line holding the snapshot format version and the SHA-256 of the source JSON.
+It's only loaded if both match, so it is rebuilt whenever the technologies file changes.
+
+Unpickling runs code, so snapshots are kept in a private cache directory of the user 
+(see `snapshot_file`), and only loaded if no other user can have written them.
+Only the `MAX_SNAPSHOTS` most recently used snapshots are kept there.
+
+This module is an implementation detail and is not considered public API.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import pathlib
+import pickle
+from typing import Any, Optional
+
+from ._fileutils import write_atomic
+
+logger = logging.getLogger(name="python-Wappalyzer")
+
+# Bump when the pickled classes or objects change in a incompatible way.
+SNAPSHOT_VERSION = 4
+
+# Snapshots kept in the cache directory, the least recently used ones are removed when a snapshot is written.
+MAX_SNAPSHOTS = 8
+
+_MAGIC = b'python-Wappalyzer-snapshot'
+
+
+def digest(source: bytes) -> str:
+    """
+    Returns the key of a snapshot of the technologies file with the given content.
+    """
+    return hashlib.sha256(source).hexdigest()
+
+
+def _cache_dir() -> pathlib.Path:
+    base = os.environ.get('XDG_CACHE_HOME') or (os.environ.get('LOCALAPPDATA') if os.name == 'nt' else None)
+    return pathlib.Path(base or os.path.join(os.path.expanduser('~'), '.cache')) / 'python-Wappalyzer'
+
+
+def _is_private(stat: os.stat_result) -> bool:
+    """
+    Whether the file is owned by the current user and not writable by others.
+    Always True where files have no POSIX owner, e.g. on Windows.
+    """
+    if not hasattr(os, 'getuid'):
+        return True
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def snapshot_file(technologies_file: pathlib.Path) -> Optional[pathlib.Path]:
+    """
+    Returns the snapshot file of a technologies file, in the private cache directory of the user,
+    e.g. ``~/.cache/python-Wappalyzer``. None if that directory can't be created or isn't private.
+    """
+    directory = _cache_dir()
+    try:
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        private = _is_private(directory.stat())
+    except OSError as err:
+        logger.debug(f"Not using snapshots, could not create {directory}: {err!r}")
+        return None
+    if not private:
+        logger.warning(f"Not using snapshots, {directory} is not private to the current user")
+        return None
+    name = hashlib.sha256(str(pathlib.Path(technologies_file).resolve()).encode('utf-8')).hexdigest()
+    return directory / f'{name}.snapshot'
+
+
+def _header(source_digest: str) -> bytes:
+    return b'%s %d %s\n' % (_MAGIC, SNAPSHOT_VERSION, source_digest.encode('ascii'))
+
+
+def load(path: pathlib.Path, source_digest: str) -> Optional[Any]:
+    """
+    Load the snapshot at `path`, memory mapped.
+    Returns None if it doesn't exist, is invalid, was not built from the same source,
+    or could have been written by another user.
+    """
+    header = _header(source_digest)
+    try:
+        with path.open('rb') as sfile:
+            if not _is_private(os.fstat(sfile.fileno())):
+                logger.warning(f"Ignoring snapshot {path}, it's not private to the current user")
+                return None
+            with mmap.mmap(sfile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:len(header)] != header:
+                    return None
+                with memoryview(data) as view, view[len(header):] as body:
+                    obj = pickle.loads(body)
+    except FileNotFoundError:
+        return None
+    except Exception as err:
+        logger.debug(f"Ignoring invalid snapshot {path}: {err!r}")
+        return None
+    try:
+        # Marks the snapshot as recently used, see _prune
+        os.utime(path)
+    except OSError:
+        pass
+    return obj
+
+
+def dump(path: pathlib.Path, source_digest: str, obj: Any) -> None:
+    """
+    Write the snapshot atomically. Failures are logged and ignored,
+    the fingerprints are then prepared from the technologies file on each load.
+    """
+    try:
+        write_atomic(path, _header(source_digest) + pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception as err:
+        logger.debug(f"Could not write snapshot {path}: {err!r}")
+        return
+    _prune(path)
+
+
+def _prune(path: pathlib.Path) -> None:
+    """
+    Remove the snapshots of the directory of `path` but the `MAX_SNAPSHOTS` most recently used,
+    e.g. those of technologies files that were removed, always keeping `path`.
+    """
+    snapshots = []
+    for snapshot in path.parent.glob('*.snapshot'):
+        try:
+            snapshots.append((snapshot.stat().st_mtime, snapshot))
+        except OSError:
+            # Removed meanwhile
+            continue
+    snapshots.sort(reverse=True)
+    for _, snapshot in snapshots[MAX_SNAPSHOTS:]:
+        if snapshot == path:
+            continue
+        try:
+            snapshot.unlink()
+        except OSError as err:
+            logger.debug(f"Could not remove snapshot {snapshot}: {err!r}")
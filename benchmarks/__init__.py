@@ -0,0 +1,9 @@
+"""
+Benchmarks of python-Wappalyzer, run them as modules, e.g.::
+
+    python -m Wappalyzer.benchmarks.analyze --help
+    python -m Wappalyzer.benchmarks.startup --help
+    python -m Wappalyzer.benchmarks.import_time --help
+    python -m Wappalyzer.benchmarks.server --help
+    python -m Wappalyzer.benchmarks.parity --help
+"""
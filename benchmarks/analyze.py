@@ -0,0 +1,294 @@
+"""
+Analysis benchmark: pages/sec, time spent in each stage of the analysis and peak memory,
+over synthetic pages or a recorded corpus. Runs offline, on local files only.
+
+    python -m Wappalyzer.benchmarks.analyze
+    python -m Wappalyzer.benchmarks.analyze --pages 50 --scripts 200 --dom-elements 20000 --inline-js-kb 2048
+    python -m Wappalyzer.benchmarks.analyze --corpus pages.jsonl
+    python -m Wappalyzer.benchmarks.analyze --backend lxml
+    python -m Wappalyzer.benchmarks.analyze --memo 100000
+    python -m Wappalyzer.benchmarks.analyze --detailed
+    python -m Wappalyzer.benchmarks.analyze --early-exit
+
+By default all the fingerprints are evaluated on each page, with `Wappalyzer.detect`, so that each stage
+is timed on every page. `Wappalyzer.analyze` stops as soon as the categories it returns are detected,
+with ``--early-exit`` it is timed instead, and the later stages only run on the pages not decided yet.
+
+A corpus is a JSON lines file, each line a ``[url, headers, html]`` array
+or a ``{"url": ..., "headers": ..., "html": ...}`` object, see `Wappalyzer.ingest`.
+
+Save the results with ``--save-baseline FILE``, and compare a later run with ``--baseline FILE``:
+the run fails if the throughput dropped, or the time of a stage grew, by more than ``--threshold``.
+Both runs must analyze the same pages the same way, their options are saved with the results.
+
+``benchmarks/baseline.json`` holds the results of the default options, as a reference of the
+relative cost of the stages. Timings depend on the machine, so CI compares two runs on the same runner,
+the baseline saved from the target branch first:
+
+    git checkout main && python -m Wappalyzer.benchmarks.analyze --save-baseline /tmp/baseline.json
+    git checkout - && python -m Wappalyzer.benchmarks.analyze --baseline /tmp/baseline.json
+"""
+import argparse
+import functools
+import json
+import pathlib
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Tuple
+
+from .._common import BACKENDS, backend_name, set_backend
+from ..cache import MatchMemo
+from ..ingest import read_jsonl
+from ..wappalyzer import Wappalyzer
+
+Page = Tuple[str, Mapping[str, str], str]
+
+# Stages of the analysis, and the method timed for each one.
+# 'parse' is the creation of the WebPage, with the bs4 backend the BeautifulSoup tree is built lazily, in 'dom select'.
+STAGES = (
+    ('parse', None),
+    ('headers/meta', '_find_by_name'),
+    ('prefilter', '_find_literals'),
+    ('script memo', '_find_by_scripts'),
+    ('url/scripts', '_has_technology'),
+    ('html', '_has_html'),
+    ('dom select', 'select_all'),
+    ('dom patterns', '_has_dom'),
+    ('implied', '_get_implied_technologies'),
+)
+
+
+# Options of the command line that change the pages analyzed, or how, see compare().
+_WORKLOAD_OPTIONS = ('corpus', 'pages', 'scripts', 'dom_elements', 'inline_js_kb', 'headers',
+                     'backend', 'memo', 'detailed', 'early_exit')
+
+
+def synthetic_pages(wappalyzer: Wappalyzer, count: int, scripts: int, dom_elements: int,
+                    inline_js_kb: int, headers: int, seed: int = 0) -> Iterator[Page]:
+    """
+    Generate pages of controlled size. They contain random prefilter literals of the
+    fingerprints, so that some patterns run their regex, and some do match.
+    """
+    rnd = random.Random(seed)
+    literals = sorted(wappalyzer._literal_matcher.literals) or ['wappalyzer']
+    header_names = sorted(wappalyzer._headers_index) or ['server']
+
+    def word() -> str:
+        return rnd.choice(literals) if rnd.random() < 0.05 else '%x' % rnd.getrandbits(32)
+
+    for index in range(count):
+        html = ['<!DOCTYPE html><html><head><title>Page %d</title>' % index]
+        html.extend('<script src="https://cdn.example.com/%s/%s.js"></script>' % (word(), word())
+                    for _ in range(scripts))
+        html.append('<meta name="generator" content="%s">' % word())
+        html.append('</head><body>')
+        for i in range(dom_elements):
+            html.append('<div id="d%d" class="c%d %s"><a href="/%s">%s</a></div>' % (i, i % 50, word(), word(), word()))
+        if inline_js_kb:
+            chunk = 'var %s = "%s";\n'
+            js: List[str] = []
+            size = 0
+            while size < inline_js_kb * 1024:
+                line = chunk % ('v%x' % rnd.getrandbits(16), word())
+                js.append(line)
+                size += len(line)
+            html.append('<script>%s</script>' % ''.join(js))
+        html.append('</body></html>')
+        page_headers = {rnd.choice(header_names) if i % 4 == 0 else 'x-header-%d' % i: word()
+                        for i in range(headers)}
+        yield 'https://%s.example.com/%s' % (word(), word()), page_headers, '\n'.join(html)
+
+
+def corpus_pages(path: pathlib.Path) -> Iterator[Page]:
+    for _, (url, html, headers) in read_jsonl(path):
+        yield url, headers, html
+
+
+def _timed(func: Callable[..., Any], timings: Dict[str, float], stage: str) -> Callable[..., Any]:
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[stage] += time.perf_counter() - start
+    return wrapper
+
+
+def mode(detailed: bool = False, early_exit: bool = False) -> str:
+    """
+    Returns the name of the analysis timed, see `analyze`.
+    """
+    if detailed:
+        return 'analyze_detailed'
+    return 'analyze' if early_exit else 'detect'
+
+
+def analyze(wappalyzer: Wappalyzer, webpage: Any, detailed: bool = False, early_exit: bool = False) -> None:
+    """
+    Analyze the page with `Wappalyzer.analyze_detailed` if `detailed`, with `Wappalyzer.analyze`,
+    which stops once its categories are detected, if `early_exit`, otherwise evaluate all the
+    fingerprints with `Wappalyzer.detect` and get the categories of the technologies detected.
+    """
+    if detailed:
+        wappalyzer.analyze_detailed(webpage)
+    elif early_exit:
+        wappalyzer.analyze(webpage)
+    else:
+        wappalyzer.categories_of(wappalyzer.detect(webpage))
+
+
+def run(wappalyzer: Wappalyzer, pages: List[Page], detailed: bool = False, early_exit: bool = False) -> Dict[str, Any]:
+    """
+    Analyze the pages, returns the total and per-stage timings.
+
+    :param detailed: Use `Wappalyzer.analyze_detailed`, only its 'parse' and 'dom select' stages are timed.
+    :param early_exit: Use `Wappalyzer.analyze`, that skips the later stages once its categories are detected.
+    """
+    from .. import WebPage
+    timings: Dict[str, float] = defaultdict(float)
+    for stage, method in STAGES:
+        if method and hasattr(wappalyzer, method):
+            setattr(wappalyzer, method, _timed(getattr(wappalyzer, method), timings, stage))
+    try:
+        start = time.perf_counter()
+        for url, headers, html in pages:
+            parse_start = time.perf_counter()
+            webpage = WebPage(url, html, headers)
+            timings['parse'] += time.perf_counter() - parse_start
+            webpage.select_all = _timed(webpage.select_all, timings, 'dom select')  # type: ignore
+            analyze(wappalyzer, webpage, detailed, early_exit)
+        total = time.perf_counter() - start
+    finally:
+        for _, method in STAGES:
+            if method:
+                wappalyzer.__dict__.pop(method, None)
+    return {'mode': mode(detailed, early_exit), 'pages': len(pages), 'seconds': total, 'pages_per_sec': len(pages) / total,
+            'stages': {stage: timings[stage] for stage, _ in STAGES}}
+
+
+def peak_memory(wappalyzer: Wappalyzer, pages: List[Page], detailed: bool = False, early_exit: bool = False) -> int:
+    """
+    Peak of the memory allocated by Python while analyzing one page at a time, in bytes.
+    """
+    from .. import WebPage
+    tracemalloc.start()
+    try:
+        for url, headers, html in pages:
+            analyze(wappalyzer, WebPage(url, html, headers), detailed, early_exit)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Returns the regressions of the results compared to the baseline.
+    """
+    regressions = []
+    # Timings of different analyses or pages can't be compared
+    if results.get('mode') != baseline.get('mode'):
+        return [f"the baseline times {baseline.get('mode', 'analyze')}, not {results.get('mode')}"]
+    if results.get('options') != baseline.get('options'):
+        return [f"the baseline was run with the options {baseline.get('options')}, not {results.get('options')}"]
+    if results['pages_per_sec'] < baseline['pages_per_sec'] * (1 - threshold):
+        regressions.append(f"pages/sec: {results['pages_per_sec']:.1f} < {baseline['pages_per_sec']:.1f}")
+    for stage, seconds in results['stages'].items():
+        before = baseline['stages'].get(stage)
+        # Ignore stages too short to be measured reliably
+        if before and max(before, seconds) > 0.01 and seconds > before * (1 + threshold):
+            regressions.append(f"{stage}: {seconds * 1000:.1f} ms > {before * 1000:.1f} ms")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', type=pathlib.Path, help="JSON lines file of recorded pages")
+    parser.add_argument('--pages', type=int, default=100, help="number of synthetic pages")
+    parser.add_argument('--scripts', type=int, default=30, help="<script src> per synthetic page")
+    parser.add_argument('--dom-elements', type=int, default=500, help="elements per synthetic page")
+    parser.add_argument('--inline-js-kb', type=int, default=64, help="inline javascript per synthetic page")
+    parser.add_argument('--headers', type=int, default=20, help="HTTP headers per synthetic page")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), help="WebPage backend, see `Wappalyzer.set_backend`")
+    parser.add_argument('--memo', type=int, metavar='N',
+                        help="memoize the matches of up to N script sources and header values across pages")
+    parser.add_argument('--detailed', action='store_true', help="analyze with versions and confidence")
+    parser.add_argument('--early-exit', action='store_true',
+                        help="time analyze(), that stops once its categories are detected, instead of detect()")
+    parser.add_argument('--repeat', type=int, default=3, help="runs over the pages, the fastest is kept")
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak memory measure")
+    parser.add_argument('--profile', type=int, metavar='N', help="print the N costliest patterns")
+    parser.add_argument('--baseline', type=pathlib.Path, help="fail on regressions compared to this baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative slowdown tolerated, default 0.2")
+    parser.add_argument('--save-baseline', type=pathlib.Path, help="save the results as the new baseline")
+    args = parser.parse_args()
+
+    if args.backend:
+        set_backend(args.backend)
+    wappalyzer = Wappalyzer(memo=MatchMemo(args.memo) if args.memo else None)
+    if args.corpus:
+        pages = list(corpus_pages(args.corpus))
+    else:
+        pages = list(synthetic_pages(wappalyzer, args.pages, args.scripts, args.dom_elements,
+                                     args.inline_js_kb, args.headers))
+    size = sum(len(html) for _, _, html in pages)
+    print(f"{len(pages)} pages, {size / len(pages) / 1024:.1f} KB of html on average, "
+          f"{len(wappalyzer.technologies)} technologies")
+    if args.early_exit and not args.detailed:
+        print("Timing analyze(): the stages after the detection of its categories don't run")
+    else:
+        print(f"Timing {mode(args.detailed)}(): all the fingerprints are evaluated on each page")
+
+    # Warm up: compile the regexes and selectors
+    run(wappalyzer, pages[:1], args.detailed, args.early_exit)
+    results = min((run(wappalyzer, pages, args.detailed, args.early_exit) for _ in range(max(args.repeat, 1))),
+                  key=lambda r: r['seconds'])
+    # The options changing the pages analyzed, or how
+    results['options'] = {option: str(value) if isinstance(value, pathlib.Path) else value
+                          for option, value in sorted(vars(args).items()) if option in _WORKLOAD_OPTIONS}
+    results['options']['backend'] = backend_name()
+    if not args.no_memory:
+        results['peak_memory'] = peak_memory(wappalyzer, pages, args.detailed, args.early_exit)
+    try:
+        import resource
+        results['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        # Not on Windows
+        pass
+
+    print(f"{results['pages_per_sec']:10.1f} pages/sec ({results['seconds'] * 1000:.1f} ms)")
+    for stage, seconds in results['stages'].items():
+        print(f"{seconds * 1000:10.1f} ms  {stage:<18} {seconds / results['seconds'] * 100:5.1f}%")
+    if 'peak_memory' in results:
+        print(f"{results['peak_memory'] / 1024 / 1024:10.1f} MB peak python memory")
+    if 'max_rss_kb' in results:
+        print(f"{results['max_rss_kb'] / 1024:10.1f} MB max RSS")
+    if wappalyzer.memo is not None:
+        results['memo'] = wappalyzer.memo.stats()
+        print(f"{results['memo']['hit_rate'] * 100:10.1f} % memo hit rate, {results['memo']['entries']} entries")
+
+    if args.profile:
+        from ..profiling import Profiler
+        profiler = Profiler()
+        wappalyzer.set_profiler(profiler)
+        run(wappalyzer, pages)
+        wappalyzer.set_profiler(None)
+        print(f"{'total ms':>10} {'max ms':>8} {'calls':>7} {'matches':>7}  pattern")
+        for stats in profiler.report()['patterns'][:args.profile]:
+            print(f"{stats['total_time'] * 1000:10.2f} {stats['max_time'] * 1000:8.2f} {stats['calls']:7} "
+                  f"{stats['matches']:7}  {stats['technology']} {stats['field']} {stats['pattern']!r}")
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
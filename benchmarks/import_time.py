@@ -0,0 +1,57 @@
+"""
+Import time regression check: imports the package in a fresh interpreter, prints the
+slowest imports, and exits with an error if it imported one of the modules that are 
+supposed to be loaded only on first use (HTTP clients, BeautifulSoup, process pools...).
+
+    python -m Wappalyzer.benchmarks.import_time
+    python -m Wappalyzer.benchmarks.import_time --max-ms 100
+"""
+import argparse
+import subprocess
+import sys
+from typing import List, Tuple
+
+# Modules that importing the package must not load.
+LAZY_MODULES = ('aiohttp', 'requests', 'bs4', 'soupsieve', 'lxml', 'asyncio', 'multiprocessing',
+                'concurrent.futures', 'cached_property')
+
+_PACKAGE = (__package__ or __name__).split('.')[0]
+
+
+def _import_times(statement: str) -> List[Tuple[str, int]]:
+    """
+    Returns (module, cumulative microseconds) for each module imported by the statement.
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        times.append((module.strip(), int(cumulative)))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-ms', type=float, help="also fail if importing the package takes longer")
+    parser.add_argument('--top', type=int, default=10, help="number of slowest imports to print")
+    args = parser.parse_args()
+
+    times = _import_times(f'import {_PACKAGE}')
+    total = dict(times)[_PACKAGE] / 1000
+    for module, cumulative in sorted(times, key=lambda t: t[1], reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:8.2f} ms  {module}")
+
+    errors = [f"importing {_PACKAGE} imported {module}" for module, _ in times
+              if any(module == lazy or module.startswith(lazy + '.') for lazy in LAZY_MODULES)]
+    if args.max_ms is not None and total > args.max_ms:
+        errors.append(f"importing {_PACKAGE} took {total:.2f} ms, more than {args.max_ms} ms")
+    for error in errors:
+        print(f"error: {error}", file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
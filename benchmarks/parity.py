@@ -0,0 +1,95 @@
+"""
+Parity check of the WebPage backends: the lxml backend must find the same scripts, meta tags,
+DOM elements and technologies as the BeautifulSoup one, over synthetic pages or a recorded corpus.
+
+    python -m Wappalyzer.benchmarks.parity
+    python -m Wappalyzer.benchmarks.parity --corpus pages.jsonl
+
+Exits with status 1 if any page differs. The inner HTML of the elements is not compared:
+lxml serializes void elements as ``<br>`` where BeautifulSoup writes ``<br/>``.
+"""
+import argparse
+import pathlib
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Mapping
+
+from .._common import IWebPage, webpage_class
+from ..wappalyzer import Wappalyzer
+from .analyze import Page, corpus_pages, synthetic_pages
+
+
+def _elements(webpage: IWebPage, selectors: Iterable[str]) -> Dict[str, List[Any]]:
+    return {selector: [(tag.name, sorted((name, str(value)) for name, value in tag.attributes.items()))
+                       for tag in tags]
+            for selector, tags in webpage.select_all(selectors).items()}
+
+
+def with_edge_cases(pages: Iterable[Page]) -> Iterator[Page]:
+    """
+    Yields the pages, and after each one a variant with markup the backends parse differently:
+    framework attribute names such as Vue's ``:class`` and ``@click``, and content after ``</html>``.
+    """
+    for url, headers, html in pages:
+        yield url, headers, html
+        html = html.replace('<body>', '<body><div :class="{a: 1}" @click="go" v-on:x="y"><p>vue</p></div>', 1)
+        yield url + '#edge-cases', headers, html + '\n<div id="after" class="a"><p>after</p></div>'
+
+
+def differences(wappalyzer: Wappalyzer, url: str, headers: Mapping[str, str], html: str,
+                selectors: List[str]) -> List[str]:
+    """
+    Returns the differences between the pages of both backends.
+    """
+    expected, actual = webpage_class('bs4')(url, html, headers), webpage_class('lxml')(url, html, headers)
+    found = []
+    if expected.scripts != actual.scripts:
+        found.append(f"scripts: {expected.scripts} != {actual.scripts}")
+    if dict(expected.meta) != dict(actual.meta):
+        found.append(f"meta: {expected.meta} != {actual.meta}")
+    expected_elements, actual_elements = _elements(expected, selectors), _elements(actual, selectors)
+    for selector in selectors:
+        if expected_elements[selector] != actual_elements[selector]:
+            found.append(f"{selector!r}: {len(expected_elements[selector])} != {len(actual_elements[selector])} elements")
+    expected_technologies = wappalyzer.detect(expected)
+    actual_technologies = wappalyzer.detect(actual)
+    if expected_technologies != actual_technologies:
+        found.append(f"technologies: {sorted(expected_technologies ^ actual_technologies)} differ")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', type=pathlib.Path, help="JSON lines file of recorded pages")
+    parser.add_argument('--pages', type=int, default=50, help="number of synthetic pages")
+    parser.add_argument('--dom-elements', type=int, default=200, help="elements per synthetic page")
+    args = parser.parse_args()
+
+    wappalyzer = Wappalyzer()
+    pages: Iterable[Page]
+    if args.corpus:
+        pages = corpus_pages(args.corpus)
+    else:
+        pages = with_edge_cases(synthetic_pages(wappalyzer, args.pages, 10, args.dom_elements, 4, 10))
+    selectors = sorted({selector.selector for fingerprint in wappalyzer.technologies.values()
+                        for selector in fingerprint.dom})
+    start = time.perf_counter()
+    count = failed = 0
+    for url, headers, html in pages:
+        count += 1
+        try:
+            found = differences(wappalyzer, url, headers, html, selectors)
+        except Exception as err:
+            found = [f"failed: {err!r}"]
+        if found:
+            failed += 1
+            print(url, file=sys.stderr)
+            for difference in found:
+                print(f"    {difference}", file=sys.stderr)
+    print(f"{count - failed}/{count} pages identical, {len(selectors)} selectors, "
+          f"{time.perf_counter() - start:.1f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Scan server benchmark: throughput and latency of local clients, see `Wappalyzer.server`.
+
+    python -m Wappalyzer.benchmarks.server
+    python -m Wappalyzer.benchmarks.server --workers 4 --clients 32 --batch 8
+    python -m Wappalyzer.benchmarks.server --unix /run/wappalyzer.sock  # a server already running
+
+Unless a socket is given, a server is started on a temporary Unix socket.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from ..server import ScanServer
+from ..wappalyzer import Wappalyzer
+from .analyze import synthetic_pages
+
+
+async def _client(session: aiohttp.ClientSession, batches: List[List[Dict[str, Any]]],
+                  latencies: List[float], rejected: List[int]) -> None:
+    while batches:
+        batch = batches.pop()
+        start = time.perf_counter()
+        async with session.post('http://localhost/analyze', json=batch) as response:
+            await response.read()
+            if response.status == 503:
+                rejected.append(len(batch))
+                batches.append(batch)
+                await asyncio.sleep(0.05)
+                continue
+            response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(unix: str, pages: List[Dict[str, Any]], clients: int, batch: int) -> Dict[str, Any]:
+    batches = [pages[i:i + batch] for i in range(0, len(pages), batch)]
+    latencies: List[float] = []
+    rejected: List[int] = []
+    connector = aiohttp.UnixConnector(path=unix, limit=clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(_client(session, batches, latencies, rejected) for _ in range(clients)))
+        total = time.perf_counter() - start
+    latencies.sort()
+    return {'pages': len(pages), 'seconds': total, 'pages_per_sec': len(pages) / total,
+            'latency_p50': statistics.median(latencies),
+            'latency_p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            'rejected': sum(rejected)}
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    wappalyzer = Wappalyzer()
+    pages = [{'url': url, 'headers': headers, 'html': html} for url, headers, html in
+             synthetic_pages(wappalyzer, args.pages, args.scripts, args.dom_elements, args.inline_js_kb, 10)]
+    runner: Optional[web.AppRunner] = None
+    executor = None
+    unix = args.unix
+    if unix is None:
+        wappalyzer.compile()
+        if args.workers > 1:
+            executor = wappalyzer.new_process_executor(args.workers)
+        unix = os.path.join(tempfile.mkdtemp(), 'wappalyzer.sock')
+        runner = web.AppRunner(ScanServer(wappalyzer, executor, args.max_queue).app())
+        await runner.setup()
+        await web.UnixSite(runner, unix).start()
+    try:
+        # Warm up the workers
+        await run(unix, pages[:args.clients], args.clients, 1)
+        results = await run(unix, pages, args.clients, args.batch)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        if executor is not None:
+            executor.shutdown()
+    print(f"{results['pages_per_sec']:10.1f} pages/sec ({results['pages']} pages in {results['seconds']:.2f}s)")
+    print(f"{results['latency_p50'] * 1000:10.1f} ms  median latency of a request of {args.batch} pages")
+    print(f"{results['latency_p99'] * 1000:10.1f} ms  99th percentile latency")
+    print(f"{results['rejected']:10}     pages rejected by backpressure, and sent again")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--unix', help="Unix socket of a running server, otherwise one is started")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes of the server started")
+    parser.add_argument('--max-queue', type=int, default=1000, help="pages pending in the server started")
+    parser.add_argument('--clients', type=int, default=8, help="concurrent connections")
+    parser.add_argument('--batch', type=int, default=1, help="pages per request")
+    parser.add_argument('--pages', type=int, default=200, help="number of synthetic pages")
+    parser.add_argument('--scripts', type=int, default=30, help="<script src> per synthetic page")
+    parser.add_argument('--dom-elements', type=int, default=200, help="elements per synthetic page")
+    parser.add_argument('--inline-js-kb', type=int, default=16, help="inline javascript per synthetic page")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Startup benchmark: time to get the prepared fingerprints of a technologies file,
+from the JSON source and from its snapshot.
+
+    python -m Wappalyzer.benchmarks.startup
+    python -m Wappalyzer.benchmarks.startup --technologies /path/to/technologies.json
+    python -m Wappalyzer.benchmarks.startup --download  # full upstream dataset, all categories
+"""
+import argparse
+import json
+import pathlib
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+from .. import _snapshot, fingerprint
+from ..get_data import GetData
+
+
+def _timeit(func: Callable[[], object], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        # Each repetition is a cold start: don't let the literals computed by the previous one hide their cost.
+        # The regexes are compiled on first use, not when the fingerprints are prepared or loaded.
+        fingerprint.clear_caches()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--technologies', type=pathlib.Path, default=GetData().technologies_file(),
+                        help="technologies.json file, defaults to the one of the package")
+    parser.add_argument('--download', action='store_true',
+                        help="benchmark the full upstream dataset instead, all categories included")
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.download:
+            from ..store_data import StoreData
+            source = json.dumps(StoreData().get_all_tech_data()).encode('utf-8')
+        else:
+            source = args.technologies.read_bytes()
+        snapshot_file = pathlib.Path(tmpdir) / 'technologies.snapshot'
+        source_digest = _snapshot.digest(source)
+
+        def from_json() -> None:
+            GetData.prepare(json.loads(source))
+
+        def from_snapshot() -> None:
+            _snapshot.digest(source)
+            assert _snapshot.load(snapshot_file, source_digest) is not None
+
+        _snapshot.dump(snapshot_file, source_digest, GetData.prepare(json.loads(source)))
+        fingerprint.clear_caches()
+        technologies = len(json.loads(source)['technologies'])
+        print(f"{technologies} technologies, {len(source)} bytes of JSON, "
+              f"{snapshot_file.stat().st_size} bytes of snapshot, best of {args.repeat}")
+        baseline = None
+        for name, func in (('json', from_json), ('snapshot', from_snapshot)):
+            timings = _timeit(func, args.repeat)
+            best = min(timings)
+            baseline = baseline or best
+            print(f"{name:>10}: first {timings[0] * 1000:8.2f} ms, best {best * 1000:8.2f} ms, "
+                  f"median {statistics.median(timings) * 1000:8.2f} ms, x{baseline / best:.1f}")
+
+
+if __name__ == '__main__':
+    main()
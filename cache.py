@@ -0,0 +1,246 @@
+"""
+Caches of analysis results, see the `cache` argument of `Wappalyzer`.
+
+Results are keyed by a hash of everything the analysis of a page depends on,
+including the version of the fingerprints, so identical pages are only analyzed once
+and results are never served after the technologies file changed.
+
+`MatchMemo` caches the results of the patterns for the values that are repeated across pages,
+such as script sources and header values, see the `memo` argument of `Wappalyzer`.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Hashable, List, Optional, Tuple
+try:
+    from typing import Protocol
+except ImportError:
+    Protocol = object # type: ignore
+
+if TYPE_CHECKING:
+    import sqlite3
+
+# SqliteCache evicts expired and extra results every this many results set.
+_PRUNE_EVERY = 1000
+
+
+class IResultCache(Protocol):
+    """
+    Interface of a result cache.
+    """
+    def get(self, key: str) -> Optional[List[str]]:
+        """Returns the result cached for the key, or None."""
+        raise NotImplementedError()
+
+    def set(self, key: str, result: List[str]) -> None:
+        """Cache the result for the key."""
+        raise NotImplementedError()
+
+
+class MemoryCache(IResultCache):
+    """
+    In-memory least recently used cache.
+
+    >>> from Wappalyzer import Wappalyzer
+    >>> from Wappalyzer.cache import MemoryCache
+    >>> wappalyzer = Wappalyzer(cache=MemoryCache(max_entries=100000, ttl=3600))
+
+    :param max_entries: Maximum number of results kept, the least recently used are evicted first.
+    :param ttl: (optional) Seconds after which a result expires.
+    """
+    def __init__(self, max_entries: int = 10000, ttl: Optional[float] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expiry time, result)
+        self._entries: 'OrderedDict[str, Tuple[Optional[float], List[str]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, result = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def set(self, key: str, result: List[str]) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class SqliteCache(IResultCache):
+    """
+    On-disk cache in a sqlite database, that can be shared by several processes.
+
+    >>> wappalyzer = Wappalyzer(cache=SqliteCache('/var/cache/wappalyzer.db', ttl=86400))
+
+    :param path: The database file, created if needed.
+    :param ttl: (optional) Seconds after which a result expires.
+    :param max_entries: (optional) Maximum number of results kept, the oldest are evicted first.
+        Expired and extra results are evicted every 1000 results set.
+    :param timeout: Seconds to wait for other processes to release the database.
+    """
+    def __init__(self, path: str, ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None, timeout: float = 30) -> None:
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sets = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connection(self) -> 'sqlite3.Connection':
+        import sqlite3
+        # sqlite connections can't be shared with forked processes nor between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS results '
+                               '(key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS results_created ON results (created)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str) -> Optional[List[str]]:
+        row = self._connection().execute('SELECT result, created FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        result, created = row
+        if self.ttl is not None and created + self.ttl < time.time():
+            return None
+        return json.loads(result)
+
+    def set(self, key: str, result: List[str]) -> None:
+        connection = self._connection()
+        now = time.time()
+        connection.execute('INSERT OR REPLACE INTO results (key, result, created) VALUES (?, ?, ?)',
+                           (key, json.dumps(result), now))
+        self._sets += 1
+        if self._sets % _PRUNE_EVERY:
+            return
+        if self.ttl is not None:
+            connection.execute('DELETE FROM results WHERE created < ?', (now - self.ttl,))
+        if self.max_entries is not None:
+            connection.execute('DELETE FROM results WHERE key IN '
+                               '(SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)',
+                               (self.max_entries,))
+
+
+class MatchMemo:
+    """
+    Thread-safe memo of the technologies, or the evidence of the patterns, matched by a value,
+    shared by all the pages analyzed.
+
+    >>> from Wappalyzer.cache import MatchMemo
+    >>> wappalyzer = Wappalyzer(memo=MatchMemo(max_entries=200000))
+    >>> wappalyzer.memo.stats()
+    {'entries': 12000, 'hits': 950000, 'misses': 12000, 'evictions': 0, 'hit_rate': 0.987}
+
+    It's a segmented LRU: values are first kept on probation, and become protected once
+    they are seen again. Values seen once, such as script urls with a cache-busting query,
+    are evicted first, so they don't evict the values common to many pages in long running processes.
+
+    :param max_entries: Maximum number of values kept.
+    :param protected_ratio: Share of the entries kept for the values seen more than once.
+    """
+    def __init__(self, max_entries: int = 100000, protected_ratio: float = 0.8) -> None:
+        self.max_entries = max_entries
+        self.max_protected = int(max_entries * protected_ratio)
+        self._probation: 'OrderedDict[Hashable, FrozenSet[Any]]' = OrderedDict()
+        self._protected: 'OrderedDict[Hashable, FrozenSet[Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[FrozenSet[Any]]:
+        """Returns what the value of the key matched, or None."""
+        with self._lock:
+            matched = self._protected.get(key)
+            if matched is not None:
+                self._protected.move_to_end(key)
+                self.hits += 1
+                return matched
+            matched = self._probation.pop(key, None)
+            if matched is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._protected[key] = matched
+            if len(self._protected) > self.max_protected:
+                # Back on probation, as the most recently used
+                demoted, value = self._protected.popitem(last=False)
+                self._probation[demoted] = value
+            return matched
+
+    def set(self, key: Hashable, matched: FrozenSet[Any]) -> None:
+        """Memoize what the value of the key matched."""
+        with self._lock:
+            if key in self._protected:
+                return
+            self._probation[key] = matched
+            while len(self._probation) + len(self._protected) > self.max_entries:
+                (self._probation or self._protected).popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._probation.clear()
+            self._protected.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the number of entries, hits, misses and evictions, and the hit rate.
+        """
+        return {'entries': len(self), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': round(self.hit_rate, 3)}
+
+    def __len__(self) -> int:
+        return len(self._probation) + len(self._protected)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
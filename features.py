@@ -0,0 +1,122 @@
+"""
+Compact snapshots of the features of a page the fingerprints are matched against,
+to analyze the page again without fetching nor parsing it.
+
+>>> from Wappalyzer import Wappalyzer, WebPage
+>>> from Wappalyzer.features import PageFeatures
+>>> features = WebPage(url, html, headers).features(keep_html=True)
+>>> stored = json.dumps(features.to_dict())
+...
+>>> features = PageFeatures.from_dict(json.loads(stored))
+>>> wappalyzer.analyze(features)
+
+A snapshot holds the url, the headers, the script sources, the meta tags and a hash of the html.
+The html patterns and CSS selectors can only match if the snapshot keeps the html, compressed.
+
+When the technologies file is updated, only the fingerprints that changed need to be evaluated
+against the snapshots, see `Wappalyzer.detect` and `GetData.changed_technologies`.
+"""
+import base64
+import hashlib
+import zlib
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from ._common import CaseInsensitiveDict, IWebPage, ITag, webpage_class
+
+
+def html_hash(html: str) -> str:
+    """
+    Returns the hash of the html stored in snapshots, to find the pages that changed.
+    """
+    return hashlib.blake2b(html.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+class PageFeatures(IWebPage):
+    """
+    Features of a page, that can be analyzed like a WebPage.
+
+    :param url: The web page URL.
+    :param headers: The HTTP response headers.
+    :param scripts: The sources of the ``<script>`` tags.
+    :param meta: The ``<meta>`` tags, by lowercase name.
+    :param html_hash: Hash of the html, see `html_hash`.
+    :param compressed_html: (optional) The html, compressed with zlib.
+    """
+    def __init__(self, url: str, headers: Mapping[str, str], scripts: List[str], meta: Mapping[str, str],
+                 html_hash: str, compressed_html: Optional[bytes] = None) -> None:
+        self.url = url
+        self.headers = CaseInsensitiveDict(headers)
+        self.scripts = list(scripts)
+        self.meta = dict(meta)
+        self.html_hash = html_hash
+        self.compressed_html = compressed_html
+        # The html decompressed, and the page parsed from it, on first use
+        self._html: Optional[str] = None
+        self._webpage: Optional[IWebPage] = None
+
+    @classmethod
+    def from_webpage(cls, webpage: IWebPage, keep_html: bool = False) -> 'PageFeatures':
+        """
+        Take a snapshot of the features of a page.
+
+        :param keep_html: Keep the html, compressed, so that the html patterns and CSS selectors can be evaluated.
+        """
+        compressed_html = zlib.compress(webpage.html.encode('utf-8', 'surrogatepass')) if keep_html else None
+        return cls(webpage.url, {name.lower(): value for name, value in webpage.headers.items()},
+                   webpage.scripts, webpage.meta, html_hash(webpage.html), compressed_html)
+
+    @property
+    def has_html(self) -> bool:
+        return self.compressed_html is not None
+
+    @property
+    def html(self) -> str:  # type: ignore
+        """
+        The html, decompressed on first access. Empty if the snapshot doesn't keep it.
+        """
+        if self.compressed_html is None:
+            return ''
+        if self._html is None:
+            self._html = zlib.decompress(self.compressed_html).decode('utf-8', 'surrogatepass')
+        return self._html
+
+    def _parsed(self) -> Optional[IWebPage]:
+        if self._webpage is None and self.compressed_html is not None:
+            self._webpage = webpage_class()(self.url, self.html, self.headers)
+        return self._webpage
+
+    def select(self, selector: str) -> Iterable[ITag]:
+        webpage = self._parsed()
+        return webpage.select(selector) if webpage is not None else ()
+
+    def select_all(self, selectors: Iterable[str]) -> Mapping[str, List[ITag]]:
+        webpage = self._parsed()
+        if webpage is None:
+            return {selector: [] for selector in selectors}
+        return webpage.select_all(selectors)  # type: ignore
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The decompressed html and the parsed page are rebuilt if needed
+        state = self.__dict__.copy()
+        state['_html'] = None
+        state['_webpage'] = None
+        return state
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the snapshot as a JSON serializable dict.
+        """
+        return {
+            'url': self.url,
+            'headers': dict(self.headers.items()),
+            'scripts': self.scripts,
+            'meta': self.meta,
+            'html_hash': self.html_hash,
+            'html': base64.b64encode(self.compressed_html).decode('ascii') if self.compressed_html is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'PageFeatures':
+        html = data.get('html')
+        return cls(data['url'], data['headers'], data['scripts'], data['meta'], data['html_hash'],
+                   base64.b64decode(html) if html is not None else None)
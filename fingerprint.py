@@ -3,39 +3,123 @@ Classes to load and prepare technology fingerprints.
 
 This module is an implementation detail and is not considered public API.
 """
-import sre_compile
 import re
+import sys
 import logging
-from typing import Optional, Union, Mapping, Dict, List, Any
+from typing import AbstractSet, FrozenSet, Iterator, Optional, Union, Mapping, Dict, List, Sequence, Set, Tuple, Any
+
+from ._prefilter import required_literals
 
 logger = logging.getLogger(name="python-Wappalyzer")
 
+_CONFIDENCE_REGEXP = re.compile(r"(.+)\\;confidence:(\d+)")
+# Back references and ternaries of the version templates, e.g. "\\1" or "\\1?yes:no"
+_BACKREFERENCE_REGEXP = re.compile(r"\\(\d+)")
+_TERNARY_REGEXP = re.compile(r"\\(\d+)\?([^:]+):(.*)$")
+
+# Fields of the technologies file that are not needed to detect technologies.
+# They are not kept with the fingerprints, see `Wappalyzer.technology_metadata`.
+METADATA_FIELDS = ('website', 'description', 'icon', 'cpe', 'saas', 'oss', 'pricing')
+
+# One compiled regex per distinct pattern string, shared by all the patterns using it
+_regexes: Dict[str, 're.Pattern'] = {}
+
 
 class Pattern:
+    __slots__ = ('string', '_regex', 'version', 'confidence', 'literals')
+
     def __init__(self, string: str,
                  regex: Optional['re.Pattern'] = None,
                  version: Optional[str] = None,
-                 confidence: Optional[str] = None) -> None:
+                 confidence: Optional[str] = None,
+                 literals: Optional[FrozenSet[str]] = None) -> None:
         self.string: str = string
-        self.regex: 're.Pattern' = regex or sre_compile.compile('', 0)
+        # Compiled on first use, see regex
+        self._regex: Optional['re.Pattern'] = regex
         self.version: Optional[str] = version
         self.confidence: int = int(confidence) if confidence else 100
+        # Lowercase literals, at least one of them is part of any match. None if unknown.
+        self.literals: Optional[FrozenSet[str]] = literals
+
+    @property
+    def regex(self) -> 're.Pattern':
+        if self._regex is None:
+            regex = _regexes.get(self.string)
+            if regex is None:
+                regex = _regexes.setdefault(self.string, self._compile(self.string))
+            self._regex = regex
+        return self._regex
+
+    @staticmethod
+    def _compile(expression: str) -> 're.Pattern':
+        try:
+            return re.compile(expression, re.I)
+        except re.error as err:
+            # Wappalyzer is a JavaScript application therefore some of the regex wont compile in Python.
+            logger.debug(
+                "Caught '{error}' compiling regex: {regex}".format(
+                    error=err, regex=expression)
+            )
+            # regex that never matches:
+            # http://stackoverflow.com/a/1845097/413622
+            return re.compile(r'(?!x)x')
+
+    def __getstate__(self) -> Tuple[str, Optional[str], int, Optional[FrozenSet[str]]]:
+        # Pickled patterns are compiled again on first use, not when loaded
+        return self.string, self.version, self.confidence, self.literals
+
+    def __setstate__(self, state: Tuple[str, Optional[str], int, Optional[FrozenSet[str]]]) -> None:
+        self.string, self.version, self.confidence, self.literals = state
+        self._regex = None
+
+    def resolve_version(self, match: 're.Match') -> Optional[str]:
+        """
+        Returns the version found by a match of the regex, from the version template of the pattern:
+        ``\\1`` is replaced by the first group, ``\\1?a:b`` by ``a`` if the first group matched, else by ``b``.
+        None if the pattern has no version template, or the version is empty.
+        """
+        if not self.version:
+            return None
+        groups = (match.group(0),) + match.groups()
+
+        def group(index: int) -> str:
+            return (groups[index] if index < len(groups) else None) or ''
+
+        version = _TERNARY_REGEXP.sub(lambda m: m.group(2) if group(int(m.group(1))) else m.group(3), self.version)
+        version = _BACKREFERENCE_REGEXP.sub(lambda m: group(int(m.group(1))), version).strip()
+        return version or None
+
+    def is_candidate(self, found_literals: Optional[AbstractSet[str]]) -> bool:
+        """
+        Whether the regex can match a text in which only `found_literals` were found.
+        """
+        return found_literals is None or self.literals is None or not self.literals.isdisjoint(found_literals)
 
 
 class DomSelector:
+    __slots__ = ('selector', 'exists', 'text', 'attributes')
+
     def __init__(self,
                  selector: str,
                  exists: Optional[bool] = None,
-                 text: Optional[List['Pattern']] = None,
-                 attributes: Optional[Mapping[str, List['Pattern']]] = None, ) -> None:
-        self.selector: str = selector
+                 text: Optional[Sequence['Pattern']] = None,
+                 attributes: Optional[Mapping[str, Sequence['Pattern']]] = None, ) -> None:
+        self.selector: str = sys.intern(selector)
         self.exists: bool = bool(exists)
-        self.text: Optional[List['Pattern']] = text
-        self.attributes: Optional[Mapping[str, List['Pattern']]] = attributes
+        self.text: Optional[Sequence['Pattern']] = text
+        self.attributes: Optional[Mapping[str, Sequence['Pattern']]] = attributes
         # self.properties Not supported
 
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return self.selector, self.exists, self.text, self.attributes
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        self.selector, self.exists, self.text, self.attributes = state
+
 
 class Category:
+    __slots__ = ('name', 'groups', 'priority')
+
     def __init__(self, name: str,
                  groups: Optional[List[int]] = None,
                  priority: Optional[int] = None) -> None:
@@ -43,6 +127,37 @@ class Category:
         self.groups: List[int] = groups or []
         self.priority: int = priority or 0
 
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return self.name, self.groups, self.priority
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        self.name, self.groups, self.priority = state
+
+
+_literals_cache: Dict[str, Optional[FrozenSet[str]]] = {}
+
+def _literals(expression: str) -> Optional[FrozenSet[str]]:
+    """
+    Same as `required_literals`, the same frozenset is returned for identical expressions.
+    """
+    if expression not in _literals_cache:
+        _literals_cache[expression] = required_literals(expression)
+    return _literals_cache[expression]
+
+
+def clear_caches(keep: AbstractSet[str] = frozenset()) -> None:
+    """
+    Forget the compiled regexes and the literals shared by the patterns built so far.
+    The patterns already built keep theirs, the next ones build them again.
+
+    :param keep: (optional) Pattern strings whose regex and literals are kept.
+    """
+    for cache in (_regexes, _literals_cache):
+        # Patterns can be built by other threads meanwhile
+        for string in list(cache):
+            if string not in keep:
+                cache.pop(string, None)
+
 
 class Technology:
     """
@@ -54,6 +169,14 @@ class Technology:
         self.confidence: Dict[str, int] = {}
         self.versions: List[str] = []
 
+    def add_match(self, key: str, confidence: int, version: Optional[str] = None) -> None:
+        """
+        Record a pattern matching the page, the confidence of each pattern key counts once.
+        """
+        self.confidence[key] = confidence
+        if version and version not in self.versions:
+            self.versions.append(version)
+
     @property
     def confidenceTotal(self) -> int:
         total = 0
@@ -74,42 +197,38 @@ class Fingerprint:
     A Fingerprint represent a single piece of information about a tech.
     Validated, normalized and regex expressions complied.
 
+    Only the fields needed to detect the technology are kept, the metadata 
+    (see `METADATA_FIELDS`) are ignored. Absent patterns are empty tuples.
+
     See https://github.com/AliasIO/wappalyzer#json-fields
     """
+    __slots__ = ('name', 'cats', 'implies', 'dom', 'headers', 'meta', 'html', 'text', 'url', 'scriptSrc', 'scripts')
 
     def __init__(self, name: str, **attrs: Any) -> None:
         # Required infos
-        self.name: str = name
+        self.name: str = sys.intern(name)
 
-        # Metadata
-        self.website: str = attrs.get('website', '??')
-        self.cats: List[int] = attrs.get('cats', [])
-        self.description: Optional[str] = attrs.get('description')  # type:ignore
-        self.icon: Optional[str] = attrs.get('icon')  # type:ignore
-        self.cpe: Optional[str] = attrs.get('cpe')  # type:ignore
-        self.saas: Optional[bool] = attrs.get('saas')  # type:ignore
-        self.oss: Optional[bool] = attrs.get('oss')  # type:ignore
-        self.pricing: List[str] = self._prepare_list(attrs['princing']) if 'princing' in attrs else []
+        self.cats: Tuple[int, ...] = tuple(attrs.get('cats', ()))
 
         # Implies and cie
-        self.implies: List[str] = self._prepare_list(attrs['implies']) if 'implies' in attrs else []
+        self.implies: Sequence[Tuple[str, int]] = tuple(self._prepare_implies(attrs['implies'])) if 'implies' in attrs else ()
         # self.requires: List[str] = self._prepare_list(attrs['requires']) if 'requires' in attrs else [] # Not supported
         # self.requiresCategory: List[str] = self._prepare_list(attrs['requiresCategory']) if 'requiresCategory' in attrs else [] # Not supported
         # self.excludes: List[str] = self._prepare_list(attrs['excludes']) if 'excludes' in attrs else [] # Not supported
 
         # Patterns
-        self.dom: List[DomSelector] = self._prepare_dom(attrs['dom']) if 'dom' in attrs else []
+        self.dom: Sequence[DomSelector] = tuple(self._prepare_dom(attrs['dom'])) if 'dom' in attrs else ()
 
-        self.headers: Mapping[str, List[Pattern]] = self._prepare_headers(
+        self.headers: Mapping[str, Sequence[Pattern]] = self._prepare_headers(
             attrs['headers']) if 'headers' in attrs else {}
-        self.meta: Mapping[str, List[Pattern]] = self._prepare_meta(attrs['meta']) if 'meta' in attrs else {}
+        self.meta: Mapping[str, Sequence[Pattern]] = self._prepare_meta(attrs['meta']) if 'meta' in attrs else {}
 
-        self.html: List[Pattern] = self._prepare_pattern(attrs['html']) if 'html' in attrs else []
-        self.text: List[Pattern] = self._prepare_pattern(attrs['text']) if 'text' in attrs else []
-        self.url: List[Pattern] = self._prepare_pattern(attrs['url']) if 'url' in attrs else []
+        self.html: Sequence[Pattern] = tuple(self._prepare_pattern(attrs['html'])) if 'html' in attrs else ()
+        self.text: Sequence[Pattern] = tuple(self._prepare_pattern(attrs['text'])) if 'text' in attrs else ()
+        self.url: Sequence[Pattern] = tuple(self._prepare_pattern(attrs['url'])) if 'url' in attrs else ()
 
-        self.scriptSrc: List[Pattern] = self._prepare_pattern(attrs['scriptSrc']) if 'scriptSrc' in attrs else []
-        self.scripts: List[Pattern] = self._prepare_pattern(attrs['scripts']) if 'scripts' in attrs else []
+        self.scriptSrc: Sequence[Pattern] = tuple(self._prepare_pattern(attrs['scriptSrc'])) if 'scriptSrc' in attrs else ()
+        self.scripts: Sequence[Pattern] = tuple(self._prepare_pattern(attrs['scripts'])) if 'scripts' in attrs else ()
 
         # For python-Wappayzer, we match
 
@@ -120,6 +239,32 @@ class Fingerprint:
         # self.robots: List[Pattern] Not supported (yet)
         # self.xhr: List[Pattern] Not supported
 
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def patterns(self) -> Iterator[Tuple[str, str, Pattern]]:
+        """
+        Yields the (field, description, pattern) of the patterns matched against pages,
+        the description is the pattern string prefixed by the header, meta or selector it applies to.
+        """
+        for field in ('url', 'scriptSrc', 'html'):
+            for pattern in getattr(self, field):
+                yield field, pattern.string, pattern
+        for field in ('headers', 'meta'):
+            for name, patterns in getattr(self, field).items():
+                for pattern in patterns:
+                    yield field, f'{name}: {pattern.string}', pattern
+        for selector in self.dom:
+            for pattern in selector.text or ():
+                yield 'dom', f'{selector.selector} text: {pattern.string}', pattern
+            for name, patterns in (selector.attributes or {}).items():
+                for pattern in patterns:
+                    yield 'dom', f'{selector.selector} [{name}]: {pattern.string}', pattern
+
     @classmethod
     def _prepare_list(cls, thing: Any) -> List[Any]:
         if not isinstance(thing, list):
@@ -127,12 +272,32 @@ class Fingerprint:
         else:
             return thing
 
+    @classmethod
+    def _prepare_implies(cls, thing: Union[str, List[str]]) -> List[Tuple[str, int]]:
+        """
+        Parse implied technologies into (name, confidence) pairs.
+        Strip out the "\\;confidence:" suffix, implies with an unreadable confidence are dropped.
+        """
+        implies = []
+        for implie in cls._prepare_list(thing):
+            # If we have no doubts just add technology
+            if 'confidence' not in implie:
+                implies.append((sys.intern(implie), 100))
+                continue
+            # Case when we have "confidence" (some doubts)
+            match = _CONFIDENCE_REGEXP.search(implie)
+            if match:
+                app_name, confidence = match.groups()
+                implies.append((sys.intern(app_name), int(confidence)))
+        return implies
+
     @classmethod
     def _prepare_pattern(cls, pattern: Union[str, List[str]]) -> List[Pattern]:
         """
         Prepare regular expression patterns.
-        Strip out key:value pairs from the pattern and compile the regular
-        expression.
+        Strip out key:value pairs from the pattern and extract the required
+        literals of the regular expression.
+        Identical expressions share the same string and literals objects.
         """
         pattern_objects = []
         if isinstance(pattern, list):
@@ -143,18 +308,9 @@ class Fingerprint:
             patterns = pattern.split('\\;')
             for index, expression in enumerate(patterns):
                 if index == 0:
-                    attrs['string'] = expression
-                    try:
-                        attrs['regex'] = re.compile(expression, re.I)  # type: ignore
-                    except re.error as err:
-                        # Wappalyzer is a JavaScript application therefore some of the regex wont compile in Python.
-                        logger.debug(
-                            "Caught '{error}' compiling regex: {regex}".format(
-                                error=err, regex=patterns)
-                        )
-                        # regex that never matches:
-                        # http://stackoverflow.com/a/1845097/413622
-                        attrs['regex'] = re.compile(r'(?!x)x')  # type: ignore
+                    # The regex is compiled on first use, see Pattern.regex
+                    attrs['string'] = sys.intern(expression)
+                    attrs['literals'] = _literals(attrs['string'])  # type: ignore
                 else:
                     attr = expression.split(':')
                     if len(attr) > 1:
@@ -166,14 +322,12 @@ class Fingerprint:
         return pattern_objects
 
     @classmethod
-    def _prepare_pattern_dict(cls, thing: Dict[str, Union[str, List[str]]]) -> Mapping[str, List[Pattern]]:
-        for k in thing:
-            thing[k] = cls._prepare_pattern(thing[k])  # type: ignore
-        return thing  # type: ignore
+    def _prepare_pattern_dict(cls, thing: Dict[str, Union[str, List[str]]]) -> Mapping[str, Sequence[Pattern]]:
+        return {sys.intern(k): tuple(cls._prepare_pattern(v)) for k, v in thing.items()}
 
     @classmethod
     def _prepare_meta(cls, thing: Union[str, List[str], Dict[str, Union[str, List[str]]]]) -> Mapping[
-        str, List[Pattern]]:
+        str, Sequence[Pattern]]:
         # Ensure dict
         if not isinstance(thing, dict):
             thing = {'generator': thing}
@@ -181,7 +335,7 @@ class Fingerprint:
         return cls._prepare_pattern_dict({k.lower(): v for k, v in thing.items()})
 
     @classmethod
-    def _prepare_headers(cls, thing: Dict[str, Union[str, List[str]]]) -> Mapping[str, List[Pattern]]:
+    def _prepare_headers(cls, thing: Dict[str, Union[str, List[str]]]) -> Mapping[str, Sequence[Pattern]]:
         # Enure lowercase keys
         return cls._prepare_pattern_dict({k.lower(): v for k, v in thing.items()})
 
@@ -204,13 +358,33 @@ class Fingerprint:
                 if clause.get('exists') is not None:
                     _exists = True
                 if clause.get('text'):
-                    _prep_text_patterns = cls._prepare_pattern(clause['text'])
+                    _prep_text_patterns = tuple(cls._prepare_pattern(clause['text']))
                 if clause.get('attributes'):
                     _prep_attr_patterns = {}
                     for _key, pattern in clause['attributes'].items():  # type: ignore
-                        _prep_attr_patterns[_key] = cls._prepare_pattern(pattern)
+                        _prep_attr_patterns[sys.intern(_key)] = tuple(cls._prepare_pattern(pattern))
                 selectors.append(DomSelector(cssselect,
                                              exists=_exists,
                                              text=_prep_text_patterns,
                                              attributes=_prep_attr_patterns))
-        return selectors
\ No newline at end of file
+        return selectors
+
+def implied_closures(technologies: Mapping[str, Fingerprint]) -> Mapping[str, FrozenSet[str]]:
+    """
+    Returns the technologies implied with a confidence of at least 50% by each technology, 
+    directly or through other implied technologies.
+    """
+    implies = {name: [app_name for app_name, confidence in technology.implies if confidence >= 50]
+               for name, technology in technologies.items()}
+    closures = {}
+    for name in implies:
+        closure: Set[str] = set()
+        todo = list(implies[name])
+        while todo:
+            tech = todo.pop()
+            # Implies can have cycles
+            if tech not in closure:
+                closure.add(tech)
+                todo.extend(implies.get(tech, ()))
+        closures[name] = frozenset(closure)
+    return closures
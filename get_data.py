@@ -1,10 +1,42 @@
 import os
 import json
+import time
+import logging
 import pathlib
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Set, Tuple, Union
+
+from . import _snapshot
+from ._fileutils import write_atomic
+from .fingerprint import Category, Fingerprint, METADATA_FIELDS, implied_closures
 from .store_data import StoreData
 
+logger = logging.getLogger(name="python-Wappalyzer")
+
+# Minimum number of seconds between two downloads of the technologies.
+UPDATE_INTERVAL = 24 * 60 * 60
+
 
 class GetData:
+    """
+    :param technologies_file: (optional) The technologies file to use instead of the one of the package.
+    """
+    def __init__(self, technologies_file: Optional[Union[str, 'os.PathLike[str]']] = None) -> None:
+        self._technologies_file = pathlib.Path(technologies_file) if technologies_file is not None else None
+
+    def technologies_file(self) -> pathlib.Path:
+        """
+        The ``technologies.json`` file inside the package ressource, unless another one was given.
+        """
+        if self._technologies_file is not None:
+            return self._technologies_file
+        _file = os.path.join(pathlib.Path(__file__).resolve().parent, 'technologies.json')
+        return pathlib.Path(_file)
+
+    def cache_file(self) -> pathlib.Path:
+        """
+        The file where the last update saves the files it downloaded, see `StoreData`.
+        """
+        return self.technologies_file().with_name('technologies.cache.json')
 
     def latest(self, force_update):
         """
@@ -25,18 +57,78 @@ class GetData:
             from `AliasIO/wappalyzer <https://github.com/AliasIO/wappalyzer>`_ repository.
 
         """
-        _technologies_file: pathlib.Path
-        _file = os.path.join(pathlib.Path(__file__).resolve().parent, 'technologies.json')
-        _technologies_file = pathlib.Path(_file)
+        _technologies_file = self.technologies_file()
         if force_update:
-            try:
-                obj = StoreData().get_latest_tech_data()
-                with _technologies_file.open('w', encoding='utf-8') as tfile:
-                    tfile.write(json.dumps(obj))
-
-            except Exception as err:  # Or loads default
-                obj = None
-        else:
-            with _technologies_file.open('r', encoding='utf-8') as tfile:
-                obj = json.load(tfile)
-        return obj
\ No newline at end of file
+            store = StoreData(cache_file=self.cache_file())
+            checked = store.last_checked()
+            if checked is not None and time.time() - checked < UPDATE_INTERVAL:
+                logger.debug(f"{_technologies_file} was updated less than {UPDATE_INTERVAL}s ago")
+            else:
+                try:
+                    obj = store.get_latest_tech_data()
+                    write_atomic(_technologies_file, json.dumps(obj).encode('utf-8'))
+                    return obj
+                except Exception as err:  # Or loads default
+                    logger.warning(f"Could not update {_technologies_file}, using the current one: {err!r}")
+        with _technologies_file.open('r', encoding='utf-8') as tfile:
+            obj = json.load(tfile)
+        return obj
+
+    def latest_fingerprints(self, force_update) -> Tuple[Mapping[str, Category], Mapping[str, Fingerprint],
+                                                         Mapping[str, FrozenSet[str]], str]:
+        """
+        Same as latest, but returns the prepared categories, fingerprints and technologies implied by each one
+        (see `prepare`), and the version of the technologies file: the hash of its content.
+
+        They are loaded from a snapshot of the technologies file when it's up to date,
+        otherwise built from the technologies file and saved to the snapshot, see `_snapshot.snapshot_file`.
+        """
+        if force_update:
+            self.latest(force_update)
+        _technologies_file = self.technologies_file()
+        source = _technologies_file.read_bytes()
+        source_digest = _snapshot.digest(source)
+        snapshot_file = _snapshot.snapshot_file(_technologies_file)
+
+        prepared = _snapshot.load(snapshot_file, source_digest) if snapshot_file is not None else None
+        if prepared is None:
+            prepared = self.prepare(json.loads(source))
+            if snapshot_file is not None:
+                _snapshot.dump(snapshot_file, source_digest, prepared)
+        categories, technologies, implied_technologies = prepared
+        return categories, technologies, implied_technologies, source_digest
+
+    @staticmethod
+    def prepare(obj: Dict[str, Any]) -> Tuple[Mapping[str, Category], Mapping[str, Fingerprint],
+                                              Mapping[str, FrozenSet[str]]]:
+        """
+        Build the categories and fingerprints of a technologies file content, 
+        and the technologies implied by each fingerprint, see `implied_closures`.
+        """
+        categories = {k: Category(**v) for k, v in obj['categories'].items()}
+        technologies = {k: Fingerprint(name=k, **v) for k, v in obj['technologies'].items()}
+        return categories, technologies, implied_closures(technologies)
+
+    def metadata(self) -> Mapping[str, Dict[str, Any]]:
+        """
+        Read the metadata of the technologies from the technologies file, see `METADATA_FIELDS`.
+        """
+        with self.technologies_file().open('r', encoding='utf-8') as tfile:
+            technologies = json.load(tfile)['technologies']
+        return {name: {field: attrs[field] for field in METADATA_FIELDS if field in attrs}
+                for name, attrs in technologies.items()}
+
+    @staticmethod
+    def changed_technologies(old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+        """
+        Returns the names of the technologies added, removed, or whose fingerprint changed 
+        between two technologies file contents. Changes of their metadata are ignored.
+
+        The results of the other technologies don't change, see `Wappalyzer.detect`.
+        """
+        def fingerprint(attrs: Dict[str, Any]) -> Dict[str, Any]:
+            return {field: value for field, value in attrs.items() if field not in METADATA_FIELDS}
+        old_technologies, new_technologies = old['technologies'], new['technologies']
+        return {name for name in set(old_technologies) | set(new_technologies)
+                if name not in old_technologies or name not in new_technologies
+                or fingerprint(old_technologies[name]) != fingerprint(new_technologies[name])}
@@ -0,0 +1,393 @@
+"""
+Batch analysis of archived pages, streamed from JSON lines or WARC files.
+
+    python -m Wappalyzer crawl.warc.gz --output results.jsonl --workers 8
+    python -m Wappalyzer crawl.warc.gz --output results.jsonl --workers 8 --resume
+
+>>> from Wappalyzer import Wappalyzer, WebPage
+>>> from Wappalyzer.ingest import read_pages
+>>> wappalyzer = Wappalyzer()
+>>> for offset, (url, html, headers) in read_pages('crawl.warc.gz'):
+...     print(offset, url, wappalyzer.analyze(WebPage(url, html, headers)))
+
+Supported inputs:
+
+- JSON lines files, each line a ``[url, headers, html]`` array
+  or a ``{"url": ..., "headers": ..., "html": ...}`` object, optionally gzipped.
+- WARC files, uncompressed or compressed with one gzip member per record, as written by crawlers.
+  Only the ``response`` records of HTML content are analyzed.
+
+Uncompressed files are memory mapped. Records are read one at a time, and the size of each
+body read is capped, so memory stays bounded whatever the size of the input.
+
+Each record is identified by its offset in the file: the byte offset of the line or WARC record,
+or of the gzip member holding it. Results are written as JSON lines of
+``{"offset": ..., "url": ..., "categories": [...]}``, in the order of the input,
+so an interrupted scan can be resumed after the last offset written.
+"""
+import argparse
+import gzip
+import json
+import logging
+import mmap
+import os
+import pathlib
+import sys
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, Optional, TextIO, Tuple, Union
+
+from ._common import CaseInsensitiveDict
+from ._fetch import MAX_BYTES, check_content_type, decode
+from .cache import MatchMemo
+from .wappalyzer import Wappalyzer
+
+logger = logging.getLogger(name="python-Wappalyzer")
+
+# A page read from an archive: (url, html, headers)
+Page = Tuple[str, str, Mapping[str, str]]
+
+# Size of the compressed chunks gzip members are decompressed by.
+_CHUNK_SIZE = 64 * 1024
+
+# First bytes of a gzip member.
+_GZIP_MAGIC = b'\x1f\x8b'
+
+# Bytes of a WARC record kept on top of the body cap, for the WARC and HTTP headers.
+_HEADERS_SIZE = 64 * 1024
+
+# Bytes of an output file read at a time, backwards, looking for its last complete line.
+_TAIL_SIZE = 64 * 1024
+
+
+@contextmanager
+def _mapped(path: pathlib.Path) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Memory map the file, empty files can't be mapped.
+    """
+    with path.open('rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def _is_gzip(path: pathlib.Path) -> bool:
+    with path.open('rb') as file:
+        return file.read(2) == _GZIP_MAGIC
+
+
+def _json_page(offset: int, line: bytes) -> Optional[Page]:
+    """
+    Returns the page of a JSON line, None if it's not a valid record.
+    """
+    try:
+        record = json.loads(line)
+        if isinstance(record, dict):
+            url, html, headers = record['url'], record['html'], record.get('headers')
+        else:
+            url, headers, html = record
+        if not isinstance(url, str) or not isinstance(html, str):
+            raise TypeError("url and html must be strings")
+    except (ValueError, KeyError, TypeError) as err:
+        logger.warning(f"Skipping the invalid JSON record at offset {offset}: {err!r}")
+        return None
+    return url, html, headers or {}
+
+
+def read_jsonl(path: Union[str, pathlib.Path], start: int = 0) -> Iterator[Tuple[int, Page]]:
+    """
+    Yields the ``(offset, (url, html, headers))`` of the pages of a JSON lines file, from the line at `start`.
+    The offsets of a gzipped file are offsets in its uncompressed content.
+    Invalid lines are logged and skipped.
+    """
+    path = pathlib.Path(path)
+    if _is_gzip(path):
+        with gzip.open(path, 'rb') as gfile:
+            # gzip files can't be seeked into, the lines before start are decompressed and skipped
+            offset = 0
+            for line in gfile:
+                if offset >= start and line.strip():
+                    page = _json_page(offset, line)
+                    if page is not None:
+                        yield offset, page
+                offset += len(line)
+        return
+    with _mapped(path) as data:
+        offset = start
+        while offset < len(data):
+            end = data.find(b'\n', offset)
+            if end == -1:
+                end = len(data)
+            line = data[offset:end]
+            if line.strip():
+                page = _json_page(offset, line)
+                if page is not None:
+                    yield offset, page
+            offset = end + 1
+
+
+def _gzip_members(data: Union[mmap.mmap, bytes], start: int, max_size: int) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yields the offset and the first `max_size` decompressed bytes of each gzip member of the data.
+    """
+    offset = start
+    while offset < len(data):
+        decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        content = bytearray()
+        position = offset
+        try:
+            while not decompressor.eof:
+                chunk = data[position:position + _CHUNK_SIZE]
+                if not chunk:
+                    logger.warning(f"Truncated gzip member at offset {offset}")
+                    break
+                position += len(chunk)
+                # Decompressed by bounded pieces, the rest of a member too big is decompressed but not kept
+                while chunk and not decompressor.eof:
+                    content += decompressor.decompress(chunk, _CHUNK_SIZE * 16)[:max(max_size - len(content), 0)]
+                    chunk = decompressor.unconsumed_tail
+        except zlib.error as err:
+            logger.warning(f"Skipping the corrupt gzip member at offset {offset}: {err}")
+            # Resume at the next gzip header
+            offset = data.find(_GZIP_MAGIC, offset + 1)
+            if offset == -1:
+                return
+            continue
+        yield offset, bytes(content)
+        offset = position - len(decompressor.unused_data)
+
+
+def _warc_records(data: Union[mmap.mmap, bytes], start: int = 0,
+                  max_size: Optional[int] = None) -> Iterator[Tuple[int, Dict[str, str], bytes]]:
+    """
+    Yields the offset, headers with lowercase names and first `max_size` bytes of the block of each WARC record.
+    """
+    offset = start
+    while offset < len(data):
+        if data[offset:offset + 5] != b'WARC/':
+            # Blank lines between records
+            next_offset = data.find(b'WARC/', offset)
+            if next_offset == -1:
+                return
+            offset = next_offset
+        headers_end = data.find(b'\r\n\r\n', offset)
+        if headers_end == -1:
+            return
+        headers = {}
+        for line in bytes(data[offset:headers_end]).decode('utf-8', 'replace').split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        block_start = headers_end + 4
+        try:
+            length = int(headers['content-length'])
+            if length < 0:
+                raise ValueError(length)
+        except (KeyError, ValueError):
+            logger.warning(f"Skipping the WARC record at offset {offset}, "
+                           f"invalid Content-Length: {headers.get('content-length')!r}")
+            # Its block ends where the next record starts
+            next_offset = data.find(b'\r\nWARC/', block_start)
+            if next_offset == -1:
+                return
+            offset = next_offset + 2
+            continue
+        block_end = block_start + length if max_size is None else block_start + min(length, max_size)
+        yield offset, headers, bytes(data[block_start:block_end])
+        offset = block_start + length
+
+
+def _dechunk(body: bytes) -> bytes:
+    """
+    Decode a body sent with ``Transfer-Encoding: chunked``, as far as it goes.
+    """
+    content = bytearray()
+    position = 0
+    while True:
+        line_end = body.find(b'\r\n', position)
+        if line_end == -1:
+            break
+        try:
+            size = int(body[position:line_end].split(b';')[0], 16)
+        except ValueError:
+            break
+        if size == 0:
+            break
+        content += body[line_end + 2:line_end + 2 + size]
+        position = line_end + 2 + size + 2
+    return bytes(content)
+
+
+def _http_page(url: str, block: bytes, max_bytes: Optional[int]) -> Optional[Page]:
+    """
+    Returns the page of a HTTP response, None if it doesn't hold HTML.
+    """
+    head_end = block.find(b'\r\n\r\n')
+    if head_end == -1:
+        return None
+    headers = CaseInsensitiveDict()
+    for line in block[:head_end].decode('iso-8859-1').split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip()] = value.strip()
+    content_type = headers.get('Content-Type')
+    try:
+        check_content_type(content_type, url)
+    except ValueError:
+        return None
+    body = block[head_end + 4:]
+    if 'chunked' in headers.get('Transfer-Encoding', '').lower():
+        body = _dechunk(body)
+    encoding = headers.get('Content-Encoding', '').lower()
+    if encoding in ('gzip', 'x-gzip', 'deflate'):
+        # Detect gzip and zlib headers, raw deflate is tried if both are missing
+        for wbits in (zlib.MAX_WBITS | 32, -zlib.MAX_WBITS):
+            try:
+                body = zlib.decompressobj(wbits=wbits).decompress(body, max_bytes or 0)
+                break
+            except zlib.error:
+                continue
+        else:
+            logger.debug(f"Could not decompress the {encoding} body of {url}")
+            return None
+    if max_bytes is not None:
+        body = body[:max_bytes]
+    return url, decode(body, content_type), headers
+
+
+def read_warc(path: Union[str, pathlib.Path], start: int = 0,
+              max_bytes: Optional[int] = MAX_BYTES) -> Iterator[Tuple[int, Page]]:
+    """
+    Yields the ``(offset, (url, html, headers))`` of the HTML responses of a WARC file,
+    from the record or gzip member at `start`.
+
+    :param max_bytes: (optional) Maximum number of bytes of the body of each response read, None for no limit.
+    """
+    path = pathlib.Path(path)
+    max_size = max_bytes + _HEADERS_SIZE if max_bytes is not None else None
+    with _mapped(path) as data:
+        records: Iterator[Tuple[int, Dict[str, str], bytes]]
+        if data[:2] == _GZIP_MAGIC:
+            records = ((offset, headers, block)
+                       for offset, content in _gzip_members(data, start, max_size or sys.maxsize)
+                       for _, headers, block in _warc_records(content, 0, max_size))
+        else:
+            records = _warc_records(data, start, max_size)
+        for offset, headers, block in records:
+            if headers.get('warc-type') != 'response' or 'application/http' not in headers.get('content-type', ''):
+                continue
+            page = _http_page(headers.get('warc-target-uri', '').strip('<>'), block, max_bytes)
+            if page is not None:
+                yield offset, page
+
+
+def read_pages(path: Union[str, pathlib.Path], start: int = 0,
+               max_bytes: Optional[int] = MAX_BYTES) -> Iterator[Tuple[int, Page]]:
+    """
+    Yields the ``(offset, (url, html, headers))`` of the pages of a WARC or JSON lines file,
+    guessing the format from the file name.
+    """
+    name = pathlib.Path(path).name.lower()
+    if '.warc' in name:
+        return read_warc(path, start, max_bytes)
+    return read_jsonl(path, start)
+
+
+def last_offset(output: pathlib.Path) -> Optional[int]:
+    """
+    Returns the offset of the last result of an output file, None if there's none.
+    A last line partially written is removed from the file.
+    """
+    if not output.exists():
+        return None
+    with output.open('rb+') as ofile:
+        tail_start = ofile.seek(0, os.SEEK_END)
+        tail = b''
+        # Read backwards until the tail holds the last complete line, however long it is
+        while tail_start > 0:
+            read_start = max(tail_start - _TAIL_SIZE, 0)
+            ofile.seek(read_start)
+            tail = ofile.read(tail_start - read_start) + tail
+            tail_start = read_start
+            complete_lines = tail[:tail.rfind(b'\n') + 1].rstrip()
+            if complete_lines and b'\n' in complete_lines:
+                break
+        complete = tail.rfind(b'\n') + 1
+        if complete < len(tail):
+            ofile.truncate(tail_start + complete)
+            tail = tail[:complete]
+    for line in reversed(tail.splitlines()):
+        if line.strip():
+            return int(json.loads(line)['offset'])
+    return None
+
+
+def scan(wappalyzer: Wappalyzer, path: Union[str, pathlib.Path], output: TextIO,
+         start: int = 0, workers: Optional[int] = None,
+         max_bytes: Optional[int] = MAX_BYTES, skip_start: bool = False) -> int:
+    """
+    Analyze the pages of a WARC or JSON lines file, writing the results to `output`
+    as they come, in the order of the file. Returns the number of pages analyzed.
+
+    :param start: Offset of the first record to analyze.
+    :param workers: Number of processes, see `Wappalyzer.analyze_many`.
+    :param max_bytes: (optional) Maximum number of bytes of the body of each response read, None for no limit.
+    :param skip_start: Skip the record at `start`, e.g. if it is the last one already analyzed.
+    """
+    # offset and url of the pages submitted, by index
+    submitted: Dict[int, Tuple[int, str]] = {}
+
+    def pages() -> Iterator[Page]:
+        index = 0
+        for offset, page in read_pages(path, start, max_bytes):
+            if skip_start and offset <= start:
+                continue
+            submitted[index] = (offset, page[0])
+            index += 1
+            yield page
+
+    count = 0
+    for index, categories in wappalyzer.analyze_many(pages(), workers=workers):
+        offset, url = submitted.pop(index)
+        output.write(json.dumps({'offset': offset, 'url': url, 'categories': categories}) + '\n')
+        count += 1
+    output.flush()
+    return count
+
+
+def main(argv: Optional[Any] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m Wappalyzer', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', type=pathlib.Path, help="WARC or JSON lines file")
+    parser.add_argument('-o', '--output', type=pathlib.Path,
+                        help="JSON lines file the results are written to, defaults to the standard output")
+    parser.add_argument('-w', '--workers', type=int, help="number of processes, defaults to the number of CPUs")
+    parser.add_argument('--start-offset', type=int, default=0, help="offset of the first record to analyze")
+    parser.add_argument('--resume', action='store_true',
+                        help="append to the output, starting after the last record it holds")
+    parser.add_argument('--max-bytes', type=int, default=MAX_BYTES,
+                        help=f"maximum bytes of each body read, default {MAX_BYTES}")
+    parser.add_argument('--memo', type=int, default=100000, metavar='N',
+                        help="memoize the matches of up to N script sources and header values, 0 to disable")
+    parser.add_argument('--update', action='store_true', help="download the latest technologies file first")
+    args = parser.parse_args(argv)
+
+    start, skip_start = args.start_offset, False
+    if args.resume:
+        if args.output is None:
+            parser.error("--resume requires --output")
+        last = last_offset(args.output)
+        if last is not None:
+            start, skip_start = last, True
+
+    wappalyzer = Wappalyzer(force_update=args.update, memo=MatchMemo(args.memo) if args.memo else None)
+    if args.output is None:
+        count = scan(wappalyzer, args.input, sys.stdout, start, args.workers, args.max_bytes, skip_start)
+    else:
+        with args.output.open('a' if args.resume else 'w', encoding='utf-8') as ofile:
+            count = scan(wappalyzer, args.input, ofile, start, args.workers, args.max_bytes, skip_start)
+    print(f"{count} pages analyzed", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Limits bounding the time spent matching the html of a page, see the `limits` argument of `Wappalyzer`.
+
+>>> from Wappalyzer import Wappalyzer
+>>> from Wappalyzer.limits import MatchLimits
+>>> wappalyzer = Wappalyzer(limits=MatchLimits(html_window=256 * 1024, html_time_budget=0.05))
+
+Python regexes can't be interrupted: the budget is checked between two patterns,
+so a page can exceed it by the time of one search. The patterns that repeatedly take
+longer than `slow_pattern_time` are quarantined, and not run anymore.
+
+Skipped checks are logged, counted in `MatchLimits.skipped`, and passed to the `on_skip` callback.
+Results of pages with skipped checks are not cached.
+"""
+import logging
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from ._common import IWebPage
+    from .fingerprint import Pattern
+
+logger = logging.getLogger(name="python-Wappalyzer")
+
+# End of the <head> of a page, that the html window is extended to.
+_HEAD_END = re.compile(r'</head\s*>', re.I)
+
+# Reasons a check is skipped.
+QUARANTINED = 'quarantined'
+BUDGET_EXCEEDED = 'budget exceeded'
+
+# Called with the url of the page, the technology, the pattern string and the reason a check is skipped.
+SkipCallback = Callable[[str, str, str, str], None]
+
+
+class MatchLimits:
+    """
+    :param html_window: (optional) Number of characters of the html that the html patterns are matched against.
+        The window is extended to the end of the ``<head>`` of the page if it ends after it.
+    :param html_time_budget: (optional) Seconds that the html patterns can take on each page,
+        the remaining patterns are skipped once it's spent.
+    :param slow_pattern_time: (optional) Seconds after which a search is considered slow,
+        defaults to the html time budget.
+    :param quarantine_after: Number of slow searches after which a pattern is quarantined.
+    :param on_skip: (optional) Called for each skipped check.
+    :param max_html_window: (optional) Number of characters the window can be extended to,
+        the ``<head>`` of the page must end before it. Defaults to 4 times `html_window`.
+    """
+    def __init__(self, html_window: Optional[int] = None,
+                 html_time_budget: Optional[float] = None,
+                 slow_pattern_time: Optional[float] = None,
+                 quarantine_after: int = 3,
+                 on_skip: Optional[SkipCallback] = None,
+                 max_html_window: Optional[int] = None) -> None:
+        self.html_window = html_window
+        if max_html_window is None and html_window is not None:
+            max_html_window = 4 * html_window
+        self.max_html_window = max_html_window
+        self.html_time_budget = html_time_budget
+        self.slow_pattern_time = slow_pattern_time if slow_pattern_time is not None else html_time_budget
+        self.quarantine_after = quarantine_after
+        self.on_skip = on_skip
+        # Number of slow searches of each (technology, pattern string)
+        self.strikes: Dict[Tuple[str, str], int] = {}
+        self.quarantined: Set[Tuple[str, str]] = set()
+        # Number of skipped checks per reason
+        self.skipped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def window(self, html: str) -> str:
+        """
+        Returns the part of the html that is matched: the first `html_window` characters,
+        extended to the end of the ``<head>`` if it ends after them, within `max_html_window` characters.
+        """
+        if self.html_window is None or len(html) <= self.html_window:
+            return html
+        head_end = _HEAD_END.search(html, 0, max(self.max_html_window or 0, self.html_window))
+        if head_end is not None and head_end.end() > self.html_window:
+            return html[:head_end.end()]
+        return html[:self.html_window]
+
+    def strike(self, technology: str, pattern: str) -> None:
+        with self._lock:
+            key = (technology, pattern)
+            self.strikes[key] = self.strikes.get(key, 0) + 1
+            if self.strikes[key] >= self.quarantine_after and key not in self.quarantined:
+                logger.warning(f"Quarantined the html pattern {pattern!r} of {technology}, "
+                               f"slower than {self.slow_pattern_time}s {self.strikes[key]} times")
+                self.quarantined.add(key)
+
+    def skip(self, url: str, technology: str, pattern: str, reason: str) -> None:
+        with self._lock:
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        if self.on_skip is not None:
+            self.on_skip(url, technology, pattern, reason)
+
+
+class HtmlScan:
+    """
+    Matches the html patterns against a page, within the limits.
+    Created for each page analyzed, this class is an implementation detail.
+    """
+    def __init__(self, limits: MatchLimits, webpage: 'IWebPage') -> None:
+        self.limits = limits
+        self.url = webpage.url
+        self.html = limits.window(webpage.html)
+        self.spent = 0.0
+        self.skipped = 0
+
+    def search(self, technology: str, pattern: 'Pattern') -> Optional['re.Match']:
+        limits = self.limits
+        key = (technology, pattern.string)
+        if key in limits.quarantined:
+            self._skip(technology, pattern, QUARANTINED)
+            return None
+        if limits.html_time_budget is not None and self.spent >= limits.html_time_budget:
+            self._skip(technology, pattern, BUDGET_EXCEEDED)
+            return None
+        start = time.perf_counter()
+        match = pattern.regex.search(self.html)
+        elapsed = time.perf_counter() - start
+        self.spent += elapsed
+        if limits.slow_pattern_time is not None and elapsed > limits.slow_pattern_time:
+            limits.strike(technology, pattern.string)
+        return match
+
+    def _skip(self, technology: str, pattern: 'Pattern', reason: str) -> None:
+        self.skipped += 1
+        self.limits.skip(self.url, technology, pattern.string, reason)
+
+    def log_skipped(self) -> None:
+        if self.skipped:
+            # Patterns are quarantined with a warning, then skipped on every page
+            logger.debug(f"Skipped {self.skipped} html checks on the webpage {self.url}, "
+                           f"spent {self.spent:.3f}s matching its html")
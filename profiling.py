@@ -0,0 +1,183 @@
+"""
+Per-technology, per-field and per-pattern profiling of the analysis.
+
+>>> from Wappalyzer import Wappalyzer
+>>> from Wappalyzer.profiling import Profiler
+>>> profiler = Profiler()
+>>> wappalyzer = Wappalyzer(profiler=profiler)
+>>> wappalyzer.analyze(webpage)
+>>> for stats in profiler.report()['patterns'][:10]:
+...     print(stats)
+
+While a profiler is installed, each regex search of a fingerprint pattern is timed and
+recorded under its technology, field (url, headers, scriptSrc, meta, html, dom) and pattern string.
+When no profiler is installed, the patterns run their regexes directly, without any overhead.
+
+CSS selectors are evaluated for all technologies at once, so only the regexes of
+the dom text and attributes are recorded for the dom field.
+
+Only the searches of the current process are recorded: the worker processes of
+`Wappalyzer.analyze_many` and `Wappalyzer.new_process_executor` run without the profiler.
+"""
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+if TYPE_CHECKING:
+    import re
+    from .fingerprint import Fingerprint, Pattern
+
+# (technology, field, pattern) a regex search is recorded under.
+Key = Tuple[str, str, str]
+
+# Called with the technology, field, pattern, seconds elapsed and whether the regex matched.
+Sink = Callable[[str, str, str, float, bool], None]
+
+
+class Stats:
+    """
+    Statistics of the regex searches of a pattern, a field or a technology.
+    """
+    __slots__ = ('calls', 'matches', 'total_time', 'max_time')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.matches = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, elapsed: float, matched: bool) -> None:
+        self.calls += 1
+        self.matches += matched
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+
+    def copy(self) -> 'Stats':
+        stats = Stats()
+        stats.merge(self)
+        return stats
+
+    def merge(self, other: 'Stats') -> None:
+        self.calls += other.calls
+        self.matches += other.matches
+        self.total_time += other.total_time
+        self.max_time = max(self.max_time, other.max_time)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'calls': self.calls, 'matches': self.matches,
+                'total_time': self.total_time, 'max_time': self.max_time}
+
+
+class _ProfiledRegex:
+    """
+    Stands for the compiled regex of a pattern while it's profiled.
+    """
+    __slots__ = ('regex', 'key', 'profiler')
+
+    def __init__(self, regex: 're.Pattern', key: Key, profiler: 'Profiler') -> None:
+        self.regex = regex
+        self.key = key
+        self.profiler = profiler
+
+    def search(self, string: str, *args: Any) -> Any:
+        start = time.perf_counter()
+        match = self.regex.search(string, *args)
+        self.profiler.record(self.key, time.perf_counter() - start, match is not None)
+        return match
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.regex, name)
+
+
+class Profiler:
+    """
+    Records the regex searches of the fingerprint patterns.
+
+    :param sink: (optional) Called after each search with the technology, field, pattern,
+        seconds elapsed and whether the regex matched, e.g. to feed a metrics system.
+
+    Only the analyses run in the current process are recorded, the worker processes of
+    `Wappalyzer.analyze_many` or of a process executor don't profile theirs, a warning is logged.
+    A profiler can be shared by threads, e.g. of a thread pool executor.
+    """
+    def __init__(self, sink: Optional[Sink] = None) -> None:
+        self.sink = sink
+        self.stats: Dict[Key, Stats] = {}
+        self._lock = threading.Lock()
+        # patterns instrumented by install(), to restore them in uninstall()
+        self._installed: List['Pattern'] = []
+
+    def record(self, key: Key, elapsed: float, matched: bool) -> None:
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = Stats()
+            stats.add(elapsed, matched)
+        if self.sink is not None:
+            self.sink(key[0], key[1], key[2], elapsed, matched)
+
+    def install(self, technologies: Mapping[str, 'Fingerprint']) -> None:
+        """
+        Instrument the patterns of the technologies.
+        """
+        for name, technology in technologies.items():
+            for field, string, pattern in technology.patterns():
+                regex = pattern.regex
+                if isinstance(regex, _ProfiledRegex):
+                    regex = regex.regex
+                pattern._regex = _ProfiledRegex(regex, (name, field, string), self)  # type: ignore
+                self._installed.append(pattern)
+
+    def uninstall(self, technologies: Optional[Mapping[str, 'Fingerprint']] = None) -> None:
+        """
+        Give the instrumented patterns their regexes back:
+        only those of the technologies if given, e.g. of a Wappalyzer that is replaced, else all of them.
+        """
+        if technologies is None:
+            patterns, self._installed = self._installed, []
+        else:
+            patterns = [pattern for technology in technologies.values() for _, _, pattern in technology.patterns()]
+            removed = set(patterns)
+            self._installed = [pattern for pattern in self._installed if pattern not in removed]
+        for pattern in patterns:
+            regex = pattern._regex
+            if isinstance(regex, _ProfiledRegex) and regex.profiler is self:
+                pattern._regex = regex.regex
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def report(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Returns the statistics per technology, per (technology, field) and per pattern,
+        each list sorted by total time, the costliest first.
+        """
+        # Threads may still be recording: report a copy of the statistics
+        with self._lock:
+            all_stats = {key: stats.copy() for key, stats in self.stats.items()}
+        technologies: Dict[str, Stats] = {}
+        fields: Dict[Tuple[str, str], Stats] = {}
+        for (technology, field, _), stats in all_stats.items():
+            technologies.setdefault(technology, Stats()).merge(stats)
+            fields.setdefault((technology, field), Stats()).merge(stats)
+
+        def by_time(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return sorted(items, key=lambda item: item['total_time'], reverse=True)
+
+        return {
+            'technologies': by_time([dict(technology=k, **v.as_dict()) for k, v in technologies.items()]),
+            'fields': by_time([dict(technology=k[0], field=k[1], **v.as_dict()) for k, v in fields.items()]),
+            'patterns': by_time([dict(technology=k[0], field=k[1], pattern=k[2], **v.as_dict())
+                                 for k, v in all_stats.items()]),
+        }
@@ -0,0 +1,152 @@
+"""
+A Wappalyzer that reloads its technologies file without blocking the analyses, for long running services.
+
+>>> from Wappalyzer.reloading import ReloadingWappalyzer
+>>> wappalyzer = ReloadingWappalyzer('/etc/wappalyzer/technologies.json', watch_interval=60)
+>>> wappalyzer.analyze(webpage)
+>>> wappalyzer.version
+>>> wappalyzer.reload().result()  # Reload now, and wait for it
+
+The new fingerprints are loaded and their regexes compiled in a background thread,
+then the new `Wappalyzer` replaces the current one with a single assignment.
+Analyses in progress finish with the Wappalyzer they started with. Once it's not used anymore,
+the caches shared by the fingerprints, and the profiler, only keep the ones of the current Wappalyzer.
+If the new file can't be loaded, the error is logged and the current Wappalyzer is kept.
+"""
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, Mapping, Optional, Tuple, Union
+
+from . import _snapshot, fingerprint
+from ._common import clear_selector_caches
+from .fingerprint import Fingerprint
+from .get_data import GetData
+from .wappalyzer import Wappalyzer
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+    from .profiling import Profiler
+
+logger = logging.getLogger(name="python-Wappalyzer")
+
+
+class ReloadingWappalyzer:
+    """
+    Holds the current `Wappalyzer` of a technologies file, all its attributes and methods are available.
+
+    :param technologies_file: (optional) The technologies file, defaults to the one of the package.
+    :param watch_interval: (optional) Check the technologies file for changes every this many seconds,
+        and reload it when it changed. Without it, the file is only reloaded by `reload`.
+    :param \\*\\*kwargs: Any other arguments are passed to `Wappalyzer`, e.g. ``cache`` or ``limits``.
+    """
+    def __init__(self, technologies_file: Optional[Union[str, 'os.PathLike[str]']] = None,
+                 watch_interval: Optional[float] = None, **kwargs: Any) -> None:
+        self.technologies_file = GetData(technologies_file).technologies_file()
+        self.watch_interval = watch_interval
+        self._kwargs = kwargs
+        self._wappalyzer = self._load()
+        # Previous Wappalyzers still used by analyses in progress
+        self._replaced: 'weakref.WeakSet[Wappalyzer]' = weakref.WeakSet()
+        # Time the current Wappalyzer was loaded at
+        self.loaded_at = time.time()
+        self._executor: Optional['ThreadPoolExecutor'] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._stat = self._file_stat()
+        if watch_interval is not None:
+            threading.Thread(target=self._watch, name='wappalyzer-reload-watch', daemon=True).start()
+
+    @property
+    def current(self) -> Wappalyzer:
+        """
+        The current Wappalyzer, use it for a series of calls that must see the same fingerprints.
+        """
+        return self._wappalyzer
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for the attributes not defined here: the methods of the current Wappalyzer.
+        # Methods are bound when looked up, so a call in progress keeps its Wappalyzer.
+        if name.startswith('__') or name == '_wappalyzer':
+            raise AttributeError(name)
+        return getattr(self._wappalyzer, name)
+
+    def _load(self) -> Wappalyzer:
+        wappalyzer = Wappalyzer(technologies_file=self.technologies_file, **self._kwargs)
+        # Don't compile the regexes during the first analyses
+        wappalyzer.compile()
+        return wappalyzer
+
+    def _file_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.technologies_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> 'Future[bool]':
+        """
+        Load the technologies file in the background, and use it once it's ready.
+        Returns a future of whether the Wappalyzer was replaced:
+        False if the file didn't change or couldn't be loaded.
+        """
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                # One reload at a time
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='wappalyzer-reload')
+            return self._executor.submit(self._reload)
+
+    def _reload(self) -> bool:
+        try:
+            if _snapshot.digest(self.technologies_file.read_bytes()) == self._wappalyzer.version:
+                logger.debug(f"{self.technologies_file} is unchanged")
+                return False
+            wappalyzer = self._load()
+        except Exception as err:
+            logger.error(f"Could not reload {self.technologies_file}, keeping version {self.version}: {err!r}")
+            return False
+        previous = self._wappalyzer
+        self._wappalyzer = wappalyzer
+        self.loaded_at = time.time()
+        # The analyses in progress hold a reference to the previous Wappalyzer:
+        # only release what it uses once they are all done and it's garbage collected.
+        self._replaced.add(previous)
+        weakref.finalize(previous, self._release, previous.technologies, previous.profiler)
+        logger.info(f"Reloaded {self.technologies_file}: version {previous.version} -> {wappalyzer.version}, "
+                    f"{len(wappalyzer.technologies)} technologies")
+        return True
+
+    def _release(self, technologies: Mapping[str, Fingerprint], profiler: Optional['Profiler']) -> None:
+        """
+        Release the resources of a previous Wappalyzer that is not used anymore.
+        """
+        # Don't keep the patterns of the previous version instrumented by the profiler, if any
+        if profiler is not None:
+            profiler.uninstall(technologies)
+        # The compiled regexes, literals and CSS selectors are shared by all the fingerprints ever
+        # loaded: only keep those of the Wappalyzers in use, not those of every previous version.
+        in_use = [technology for wappalyzer in [self._wappalyzer, *self._replaced]
+                  for technology in wappalyzer.technologies.values()]
+        fingerprint.clear_caches({pattern.string for technology in in_use for _, _, pattern in technology.patterns()})
+        clear_selector_caches({selector.selector for technology in in_use for selector in technology.dom})
+
+    def _watch(self) -> None:
+        assert self.watch_interval is not None
+        while not self._stopped.wait(self.watch_interval):
+            stat = self._file_stat()
+            if stat is not None and stat != self._stat:
+                self._stat = stat
+                self.reload()
+
+    def close(self) -> None:
+        """
+        Stop watching the technologies file, and wait for a reload in progress.
+        """
+        self._stopped.set()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,146 @@
+"""
+Local scan server: keeps one loaded Wappalyzer and a pool of workers, for callers that
+can't afford to load the fingerprints each time, or are not written in Python. Depends on `aiohttp`.
+
+    python -m Wappalyzer.server --port 8080 --workers 4
+    python -m Wappalyzer.server --unix /run/wappalyzer.sock
+
+``POST /analyze`` takes a JSON page ``{"url": ..., "headers": {...}, "html": ...}``,
+optionally with the ``"categories"`` to look for, or a list of pages.
+It answers ``{"categories": [...]}`` for each page, or ``{"error": ...}`` if the page is invalid
+or could not be analyzed, in the same order. A single invalid page is answered ``400 Bad Request``.
+
+``GET /status`` answers the version of the fingerprints, the number of pages pending,
+and the statistics of the memo of the server process, see `Wappalyzer.cache.MatchMemo`.
+
+At most `max_queue` pages are pending at once, requests that would exceed it
+are answered ``503 Service Unavailable`` right away, so clients can back off.
+A list of more than `max_queue` pages can never be accepted, it's answered ``413 Payload Too Large``.
+Connections are kept alive and pipelined requests are answered in order.
+
+>>> curl --unix-socket /run/wappalyzer.sock -d '{"url": "https://example.com", "html": "..."}' http://localhost/analyze
+"""
+import argparse
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from aiohttp import web
+
+from .cache import MatchMemo
+from .wappalyzer import Wappalyzer
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+logger = logging.getLogger(name="python-Wappalyzer")
+
+# Default maximum size of a request body, in bytes.
+MAX_BODY = 64 * 1024 * 1024
+
+
+class ScanServer:
+    """
+    :param wappalyzer: The Wappalyzer analyzing the pages.
+    :param executor: (optional) Executor the pages are analyzed in, see `Wappalyzer.analyze_async`.
+    :param max_queue: Maximum number of pages pending at once.
+    """
+    def __init__(self, wappalyzer: Wappalyzer, executor: Optional['Executor'] = None, max_queue: int = 1000) -> None:
+        self.wappalyzer = wappalyzer
+        self.executor = executor
+        self.max_queue = max_queue
+        self.pending = 0
+        self.analyzed = 0
+
+    def app(self, max_body: int = MAX_BODY) -> web.Application:
+        app = web.Application(client_max_size=max_body)
+        app.router.add_post('/analyze', self.analyze)
+        app.router.add_get('/status', self.status)
+        return app
+
+    async def _analyze_page(self, page: Any) -> Dict[str, Any]:
+        if not isinstance(page, dict) or not isinstance(page.get('url'), str) or not isinstance(page.get('html'), str):
+            return {'error': "A page must be an object with 'url' and 'html' strings"}
+        headers = page.get('headers') or {}
+        categories = page.get('categories')
+        if not isinstance(headers, dict) or not (categories is None or isinstance(categories, list)):
+            return {'error': "'headers' must be an object and 'categories' a list"}
+        if not all(isinstance(value, str) for value in headers.values()):
+            return {'error': "'headers' values must be strings"}
+        if categories is not None and not all(isinstance(name, str) for name in categories):
+            return {'error': "'categories' must be strings"}
+        try:
+            result = await self.wappalyzer.analyze_async((page['url'], page['html'], headers),
+                                                         categories=categories, executor=self.executor)
+        except ValueError as err:
+            return {'error': str(err)}
+        except Exception as err:
+            # A page that can't be analyzed must not fail the other pages of the batch
+            logger.error(f"Error while trying to analyze the page {page['url']}: {err!r}")
+            return {'error': f"Could not analyze the page: {err!r}"}
+        return {'categories': result}
+
+    async def analyze(self, request: web.Request) -> web.Response:
+        import asyncio
+        try:
+            payload = await request.json()
+        except ValueError:
+            return web.json_response({'error': "The body must be JSON"}, status=400)
+        pages: List[Any] = payload if isinstance(payload, list) else [payload]
+        if len(pages) > self.max_queue:
+            return web.json_response({'error': f"Too many pages in a request, at most {self.max_queue}"},
+                                     status=413)
+        if self.pending + len(pages) > self.max_queue:
+            return web.json_response({'error': f"Too many pages pending, at most {self.max_queue}"},
+                                     status=503, headers={'Retry-After': '1'})
+        self.pending += len(pages)
+        try:
+            results = await asyncio.gather(*(self._analyze_page(page) for page in pages))
+        finally:
+            self.pending -= len(pages)
+        self.analyzed += len(pages)
+        if isinstance(payload, list):
+            return web.json_response(results)
+        return web.json_response(results[0], status=400 if 'error' in results[0] else 200)
+
+    async def status(self, request: web.Request) -> web.Response:
+        status: Dict[str, Any] = {'version': self.wappalyzer.version,
+                                  'technologies': len(self.wappalyzer.technologies),
+                                  'pending': self.pending, 'analyzed': self.analyzed}
+        if self.wappalyzer.memo is not None:
+            # Worker processes have their own copy of the memo
+            status['memo'] = self.wappalyzer.memo.stats()
+        return web.json_response(status)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m Wappalyzer.server', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on, default 127.0.0.1")
+    parser.add_argument('--port', type=int, default=8080, help="port to listen on, default 8080")
+    parser.add_argument('--unix', help="listen on this Unix socket instead")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of processes analyzing the pages, default 1: a thread of the server")
+    parser.add_argument('--max-queue', type=int, default=1000, help="maximum number of pages pending")
+    parser.add_argument('--max-body', type=int, default=MAX_BODY, help="maximum size of a request, in bytes")
+    parser.add_argument('--memo', type=int, default=100000, metavar='N',
+                        help="memoize the matches of up to N script sources and header values, 0 to disable")
+    parser.add_argument('--update', action='store_true', help="download the latest technologies file first")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    wappalyzer = Wappalyzer(force_update=args.update, memo=MatchMemo(args.memo) if args.memo else None)
+    wappalyzer.compile()
+    if args.workers > 1:
+        executor: 'Executor' = wappalyzer.new_process_executor(args.workers)
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=1)
+    app = ScanServer(wappalyzer, executor, args.max_queue).app(args.max_body)
+    try:
+        web.run_app(app, host=None if args.unix else args.host, port=None if args.unix else args.port, path=args.unix)
+    finally:
+        executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,116 @@
-import requests
-from typing import Dict, Any
+import json
+import logging
+import pathlib
+import time
+from typing import Dict, Any, Optional
 from .constants import CATEGORIES
+from ._fileutils import write_atomic
+
+logger = logging.getLogger(name="python-Wappalyzer")
+
+BASE_URL = 'https://github.com/AliasIO/wappalyzer/raw/master/src/'
+
+# The technologies are split in one file per first letter, '_' for the others.
+SHARDS = '_abcdefghijklmnopqrstuvwxyz'
 
 class StoreData:
+    """
+    Downloads the categories and technologies files.
+
+    :param base_url: URL of the directory holding ``categories.json`` and ``technologies/{shard}.json``.
+    :param cache_file: (optional) JSON file where the files downloaded and their ``ETag``
+        and ``Last-Modified`` headers are saved, to only download the files that changed since last time.
+    :param workers: Number of files downloaded at once.
+    :param timeout: Timeout of each request, in seconds.
+    """
+    def __init__(self, base_url: str = BASE_URL, cache_file: Optional[pathlib.Path] = None,
+                 workers: int = 8, timeout: float = 30) -> None:
+        self.base_url = base_url
+        self.cache_file = cache_file
+        self.workers = workers
+        self.timeout = timeout
+
     def get_latest_tech_data(self) -> Dict[str, Any]:
-        cats = requests.get('https://github.com/AliasIO/wappalyzer/raw/master/src/categories.json').json()
-        techs: Dict[str, Any] = {}
-        for _ in '_abcdefghijklmnopqrstuvwxyz':
-            r = requests.get(f'https://github.com/AliasIO/wappalyzer/raw/master/src/technologies/{_}.json')
-            techs = {**techs, **r.json()}
-        obj = {'categories': cats, 'technologies': techs}
+        obj = self.get_all_tech_data()
         obj = self.__filter_needed_data(obj)
         return obj
 
+    def get_all_tech_data(self) -> Dict[str, Any]:
+        """
+        Download the categories and technologies of all categories.
+
+        Files are downloaded concurrently over one pool of connections. With a cache file,
+        they are requested conditionally and the cached content of the unchanged ones is reused.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        from concurrent.futures import ThreadPoolExecutor
+
+        cache = self._load_cache()
+        urls = [f'{self.base_url}categories.json'] + [f'{self.base_url}technologies/{_}.json' for _ in SHARDS]
+        with requests.Session() as session:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                entries = list(executor.map(lambda url: self._fetch(session, url, cache.get(url)), urls))
+
+        cats = entries[0]['data']
+        techs: Dict[str, Any] = {}
+        for entry in entries[1:]:
+            techs.update(entry['data'])
+
+        if self.cache_file is not None:
+            self._save_cache(dict(zip(urls, entries)))
+        return {'categories': cats, 'technologies': techs}
+
+    def last_checked(self) -> Optional[float]:
+        """
+        Timestamp of the last successful download with this cache file, None if unknown.
+        """
+        if self.cache_file is None or not self.cache_file.exists():
+            return None
+        try:
+            with self.cache_file.open('r', encoding='utf-8') as cfile:
+                return float(json.load(cfile)['checked'])
+        except Exception as err:
+            logger.debug(f"Ignoring invalid cache file {self.cache_file}: {err!r}")
+            return None
+
+    def _fetch(self, session: Any, url: str, cached: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Returns the cache entry of the URL: its JSON content and validators.
+        """
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        r = session.get(url, headers=headers, timeout=self.timeout)
+        if r.status_code == 304 and cached:
+            logger.debug(f"{url} is unchanged")
+            return cached
+        r.raise_for_status()
+        return {'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified'), 'data': r.json()}
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        if self.cache_file is None or not self.cache_file.exists():
+            return {}
+        try:
+            with self.cache_file.open('r', encoding='utf-8') as cfile:
+                return json.load(cfile)['files']
+        except Exception as err:
+            logger.debug(f"Ignoring invalid cache file {self.cache_file}: {err!r}")
+            return {}
+
+    def _save_cache(self, files: Dict[str, Dict[str, Any]]) -> None:
+        assert self.cache_file is not None
+        try:
+            write_atomic(self.cache_file, json.dumps({'checked': time.time(), 'files': files}).encode('utf-8'))
+        except OSError as err:
+            logger.debug(f"Could not write cache file {self.cache_file}: {err!r}")
+
     def __filter_needed_data(self, data) -> Dict[str, Any]:
         needed_categories = CATEGORIES.keys()
 
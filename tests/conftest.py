@@ -0,0 +1,21 @@
+import re
+
+import pytest
+
+
+def unescape(pattern):
+    """
+    Returns a text matching most fingerprint patterns: their literal characters, without regex syntax.
+    """
+    pattern = re.sub(r'\\(.)', r'\1', pattern.split('\\;')[0])
+    return re.sub(r'[\^$()?*+\[\]{}|]', '', pattern)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cache_home(tmp_path_factory):
+    """
+    Writes the snapshots of the technologies files in a temporary directory, not in the cache of the user.
+    """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path_factory.mktemp('cache')))
+        yield
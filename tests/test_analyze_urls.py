@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from Wappalyzer import Wappalyzer
+from Wappalyzer import wappalyzer as wappalyzer_module
+from Wappalyzer._fetch import decode
+
+SHOP = '<script src="/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js"></script>'
+
+
+@pytest.fixture(scope="module")
+def wappalyzer():
+    return Wappalyzer()
+
+
+class Site:
+    """
+    Local server counting the requests in progress, in total and per host.
+    """
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.started = 0
+        self.active: Dict[str, int] = {}
+        self.max_active = 0
+        self.max_active_per_host = 0
+
+    async def page(self, request):
+        host = request.host
+        self.started += 1
+        self.active[host] = self.active.get(host, 0) + 1
+        self.max_active = max(self.max_active, sum(self.active.values()))
+        self.max_active_per_host = max(self.max_active_per_host, self.active[host])
+        try:
+            await asyncio.sleep(float(request.query.get('delay', self.delay)))
+        finally:
+            self.active[host] -= 1
+        if request.path == '/image':
+            return web.Response(body=b'\x89PNG', content_type='image/png')
+        return web.Response(text=SHOP if request.path == '/shop' else '<p>', content_type='text/html')
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/{path:.*}', self.page)
+        return app
+
+
+async def collect(wappalyzer, site, urls, **kwargs):
+    async with TestServer(site.app()) as server:
+        base = f'http://127.0.0.1:{server.port}'
+        return [result async for result in wappalyzer.analyze_urls_async([base + url for url in urls], **kwargs)], base
+
+
+def test_results(wappalyzer):
+    results, base = asyncio.run(collect(wappalyzer, Site(), ['/shop', '/plain']))
+    assert dict(results) == {base + '/shop': ['eCommerce'], base + '/plain': []}
+
+
+def test_concurrency_limit(wappalyzer):
+    site = Site()
+    results, _ = asyncio.run(collect(wappalyzer, site, ['/%d' % i for i in range(12)],
+                                     concurrency=3, per_host_limit=10))
+    assert len(results) == 12
+    assert site.max_active == 3
+
+
+def test_per_host_limit(wappalyzer):
+    site = Site()
+    results, _ = asyncio.run(collect(wappalyzer, site, ['/%d' % i for i in range(12)],
+                                     concurrency=10, per_host_limit=2))
+    assert len(results) == 12
+    assert site.max_active_per_host == 2
+
+
+def test_timeout(wappalyzer):
+    results, base = asyncio.run(collect(wappalyzer, Site(), ['/slow?delay=5', '/plain'], timeout=0.5))
+    results = dict(results)
+    assert isinstance(results[base + '/slow?delay=5'], asyncio.TimeoutError)
+    assert results[base + '/plain'] == []
+
+
+def test_content_type_rejected(wappalyzer):
+    results, base = asyncio.run(collect(wappalyzer, Site(), ['/image']))
+    assert isinstance(dict(results)[base + '/image'], ValueError)
+
+
+def test_early_aclose(wappalyzer):
+    site = Site(delay=0.2)
+
+    async def first_result():
+        async with TestServer(site.app()) as server:
+            urls = [f'http://127.0.0.1:{server.port}/{i}' for i in range(100)]
+            results = wappalyzer.analyze_urls_async(urls, concurrency=4)
+            result = await results.__anext__()
+            await results.aclose()
+            started = site.started
+            await asyncio.sleep(0.5)
+            return result, started
+
+    result, started = asyncio.run(first_result())
+    assert result[1] == []
+    # No request is started once the consumer stopped
+    assert started <= 5
+    assert site.started == started
+
+
+def test_pages_parsed_once_in_process_pool(wappalyzer, monkeypatch):
+    sent = []
+    run_in_executor = wappalyzer._run_in_executor
+
+    async def record(executor, method, *args):
+        sent.append((method, args))
+        return await run_in_executor(executor, method, *args)
+
+    monkeypatch.setattr(wappalyzer, '_run_in_executor', record)
+    with wappalyzer.new_process_executor(1) as executor:
+        results, base = asyncio.run(collect(wappalyzer, Site(), ['/shop', '/plain'], executor=executor))
+    assert dict(results) == {base + '/shop': ['eCommerce'], base + '/plain': []}
+    # The undecoded bodies are sent to the worker, that decodes, parses and analyzes them in one call
+    assert [method for method, _ in sent] == ['_analyze_body'] * 2
+    assert {args[1] for _, args in sent} == {SHOP.encode(), b'<p>'}
+    assert all(args[2].startswith('text/html') for _, args in sent)
+
+
+def test_bodies_decoded_in_executor(wappalyzer, monkeypatch):
+    decoded_in = []
+
+    def record(body, content_type):
+        decoded_in.append(threading.current_thread())
+        return decode(body, content_type)
+
+    monkeypatch.setattr(wappalyzer_module, 'decode', record)
+    with ThreadPoolExecutor(1) as executor:
+        results, base = asyncio.run(collect(wappalyzer, Site(), ['/shop', '/plain'], executor=executor))
+    assert dict(results) == {base + '/shop': ['eCommerce'], base + '/plain': []}
+    assert len(decoded_in) == 2 and threading.main_thread() not in decoded_in
@@ -0,0 +1,51 @@
+import pytest
+
+from Wappalyzer import _bs4
+from Wappalyzer._common import webpage_class
+
+HTML = '''<html><head><meta name="generator" content="x"><script src="/a.js"></script></head>
+<body><div id="Main" class="a B"><p>x</p><p class="b">y</p></div>
+<a href="https://example.com" class="b">z</a><span id="other">w</span></body></html>'''
+
+SELECTORS = ['div', '#Main', '.a', '.b', 'div.a > p', 'p, #other', 'a.b, p.b', '*', 'meta[name]',
+             ':not(*)', 'a[href^="https"]', 'body span', 'p:nth-of-type(2)', ':is(span, a)', 'div:has(p.b)']
+
+
+def elements(results):
+    return {selector: [id(tag._soup) for tag in tags] for selector, tags in results.items()}
+
+
+@pytest.fixture
+def page():
+    return webpage_class('bs4')('https://example.com', HTML, {})
+
+
+def test_select_all_same_as_select(page):
+    expected = {selector: list(page.select(selector)) for selector in SELECTORS}
+    assert all(expected[selector] for selector in SELECTORS if selector != ':not(*)')
+    assert elements(page.select_all(SELECTORS)) == elements(expected)
+
+
+def test_select_all_with_other_soupsieve_versions(page, monkeypatch):
+    expected = elements(page.select_all(SELECTORS))
+    monkeypatch.setattr(_bs4, '_SOUPSIEVE_MAJOR_VERSIONS', ())
+
+    def fail(compiled):
+        raise AssertionError("Private attributes of soupsieve read")
+
+    monkeypatch.setattr(_bs4, '_selector_keys', fail)
+    assert elements(page.select_all(SELECTORS)) == expected
+
+
+class Unreadable:
+    selectors = [object()]
+
+
+def test_selector_keys():
+    assert _bs4._selector_keys(_bs4._compile_selector('div#Main.a')) == [('id', 'main')]
+    assert _bs4._selector_keys(_bs4._compile_selector('p.b, a')) == [('class', 'b'), ('tag', 'a')]
+    # Any alternative matching any element makes the whole selector match any element
+    assert _bs4._selector_keys(_bs4._compile_selector('p, [href]')) == []
+    # Compiled selectors without the attributes read are matched against every element
+    assert _bs4._selector_keys(Unreadable()) == []
+    assert _bs4._selector_keys(object()) == []
@@ -0,0 +1,207 @@
+import json
+import pickle
+import sqlite3
+
+import pytest
+
+from Wappalyzer import Wappalyzer, WebPage, _common, cache
+from Wappalyzer._common import webpage_class
+from Wappalyzer.cache import MatchMemo, MemoryCache, SqliteCache
+
+SHOP = frozenset(['WooCommerce'])
+
+
+def test_memo_promotes_values_seen_again():
+    memo = MatchMemo(max_entries=4, protected_ratio=0.5)
+    memo.set('a', SHOP)
+    memo.set('b', frozenset())
+    assert list(memo._probation) == ['a', 'b'] and not memo._protected
+    assert memo.get('a') == SHOP
+    assert list(memo._probation) == ['b'] and list(memo._protected) == ['a']
+    # Setting a protected value again doesn't put it back on probation
+    memo.set('a', SHOP)
+    assert list(memo._protected) == ['a'] and 'a' not in memo._probation
+    # Protected values beyond the ratio are put back on probation, the least recently used first
+    memo.get('b')
+    memo.set('c', SHOP)
+    memo.get('c')
+    assert list(memo._protected) == ['b', 'c'] and list(memo._probation) == ['a']
+
+
+def test_memo_evicts_values_on_probation_first():
+    memo = MatchMemo(max_entries=4, protected_ratio=0.5)
+    for key in 'ab':
+        memo.set(key, SHOP)
+        memo.get(key)
+    for key in 'cdef':
+        memo.set(key, SHOP)
+    assert len(memo) == 4
+    assert list(memo._protected) == ['a', 'b'] and list(memo._probation) == ['e', 'f']
+    assert memo.evictions == 2
+    assert memo.get('c') is None
+    assert memo.get('a') == SHOP
+
+
+def test_memo_stats():
+    memo = MatchMemo()
+    assert memo.stats() == {'entries': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'hit_rate': 0.0}
+    assert memo.get('a') is None
+    memo.set('a', frozenset())
+    # An empty match is memoized too
+    assert memo.get('a') == frozenset()
+    assert memo.get('a') == frozenset()
+    assert memo.stats() == {'entries': 1, 'hits': 2, 'misses': 1, 'evictions': 0, 'hit_rate': 0.667}
+    memo.clear()
+    assert len(memo) == 0
+
+
+def test_memo_pickle_round_trip():
+    memo = MatchMemo(max_entries=10)
+    memo.set('a', SHOP)
+    memo.set('b', frozenset())
+    memo.get('a')
+    copy = pickle.loads(pickle.dumps(memo))
+    assert copy.stats() == memo.stats()
+    assert list(copy._protected) == ['a'] and list(copy._probation) == ['b']
+    assert copy.get('b') == frozenset()
+    copy.set('c', SHOP)
+    assert len(copy) == 3 and len(memo) == 2
+
+
+def test_memoized_analysis():
+    memo = MatchMemo()
+    wappalyzer = Wappalyzer(memo=memo)
+    html = '<script src="/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js"></script>'
+    for _ in range(3):
+        assert wappalyzer.analyze(WebPage('https://example.com', html, {'Server': 'nginx'})) == ['eCommerce']
+        assert wappalyzer.analyze(WebPage('https://example.com', '<p>', {'Server': 'nginx'})) == []
+    assert memo.hits > 0 and memo.misses > 0
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def rows(path):
+    with sqlite3.connect(str(path)) as connection:
+        return connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+
+def test_memory_cache_evicts_least_recently_used():
+    results = MemoryCache(max_entries=2)
+    results.set('a', ['eCommerce'])
+    results.set('b', [])
+    assert results.get('a') == ['eCommerce']
+    results.set('c', [])
+    assert len(results) == 2
+    assert results.get('b') is None
+    assert results.get('a') == ['eCommerce'] and results.get('c') == []
+
+
+def test_memory_cache_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'monotonic', clock)
+    results = MemoryCache(ttl=60)
+    results.set('a', ['eCommerce'])
+    clock.now += 59
+    assert results.get('a') == ['eCommerce']
+    clock.now += 2
+    assert results.get('a') is None
+    assert len(results) == 0
+
+
+def test_sqlite_cache_persists_across_instances(tmp_path):
+    path = tmp_path / 'results.db'
+    SqliteCache(path).set('a', ['eCommerce'])
+    assert SqliteCache(path).get('a') == ['eCommerce']
+    assert SqliteCache(path).get('b') is None
+    # Pickled copies use their own connection
+    copy = pickle.loads(pickle.dumps(SqliteCache(path)))
+    assert copy.get('a') == ['eCommerce']
+
+
+def test_sqlite_cache_ttl(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'time', clock)
+    results = SqliteCache(tmp_path / 'results.db', ttl=60)
+    results.set('a', ['eCommerce'])
+    clock.now += 61
+    assert results.get('a') is None
+
+
+def test_sqlite_cache_pruning(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'time', clock)
+    path = tmp_path / 'results.db'
+    results = SqliteCache(path, ttl=3600, max_entries=100)
+    results.set('expired', [])
+    clock.now += 7200
+    for index in range(1, cache._PRUNE_EVERY - 1):
+        clock.now += 1
+        results.set(str(index), [])
+    # Only pruned every _PRUNE_EVERY results set
+    assert rows(path) == cache._PRUNE_EVERY - 1
+    clock.now += 1
+    results.set('last', [])
+    assert rows(path) == 100
+    # The most recent are kept
+    assert results.get('last') == [] and results.get('expired') is None
+    assert results.get(str(cache._PRUNE_EVERY - 100)) == []
+    assert results.get(str(cache._PRUNE_EVERY - 101)) is None
+
+
+def shop_wappalyzer(tmp_path, name, script, **kwargs):
+    technologies_file = tmp_path / f'{name}.json'
+    technologies_file.write_text(json.dumps({
+        'categories': {'6': {'name': 'eCommerce'}},
+        'technologies': {'Shop': {'cats': [6], 'scriptSrc': script}}}))
+    return Wappalyzer(technologies_file=technologies_file, **kwargs)
+
+
+def test_results_invalidated_by_new_fingerprints(tmp_path):
+    results = SqliteCache(tmp_path / 'results.db')
+    page = WebPage('https://example.com', '<script src="/shop.js"></script>', {})
+    first = shop_wappalyzer(tmp_path, 'shop', 'shop\\.js', cache=results)
+    assert first.analyze(page) == ['eCommerce']
+    second = shop_wappalyzer(tmp_path, 'store', 'store\\.js', cache=results)
+    assert second.version != first.version
+    assert second.analyze(page) == []
+    assert first.analyze(page) == ['eCommerce']
+    assert rows(results.path) == 2
+
+
+def test_sqlite_cache_in_worker_processes(tmp_path):
+    results = SqliteCache(tmp_path / 'results.db')
+    # The connection of this process is not reused by the forked workers
+    assert results.get('a') is None
+    wappalyzer = shop_wappalyzer(tmp_path, 'shop', 'shop\\.js', cache=results)
+    pages = [('https://example.com/%d' % index, '<script src="/shop.js"></script>' if index % 2 else '<p>%d' % index, {})
+             for index in range(20)]
+    expected = [(index, ['eCommerce'] if index % 2 else []) for index in range(20)]
+    assert list(wappalyzer.analyze_many(pages, workers=2, chunksize=4)) == expected
+    # Identical pages share their key: one for the shop pages, one per other page
+    assert rows(results.path) == 11
+    assert list(wappalyzer.analyze_many(pages, workers=2, chunksize=4)) == expected
+    assert rows(results.path) == 11
+    assert results.get(wappalyzer._cache_key(*pages[1])) == ['eCommerce']
+
+
+def test_results_keyed_by_backend(tmp_path, monkeypatch):
+    pytest.importorskip('cssselect')
+    results = MemoryCache()
+    wappalyzer = shop_wappalyzer(tmp_path, 'shop', 'shop\\.js', cache=results)
+    html = '<script src="/shop.js"></script>'
+    for backend in ('bs4', 'lxml'):
+        assert wappalyzer.analyze(webpage_class(backend)('https://example.com', html, {})) == ['eCommerce']
+    assert len(results._entries) == 2
+    # Pages created in the analysis are parsed with the selected backend
+    page = ('https://example.com', html, {})
+    monkeypatch.setattr(_common, '_backend', 'bs4')
+    bs4_key = wappalyzer._cache_key(*page)
+    monkeypatch.setattr(_common, '_backend', 'lxml')
+    assert wappalyzer._cache_key(*page) != bs4_key
+    assert results.get(wappalyzer._cache_key(*page)) == ['eCommerce']
@@ -0,0 +1,27 @@
+from Wappalyzer import Wappalyzer
+from Wappalyzer.cache import MemoryCache
+from Wappalyzer.features import PageFeatures, html_hash
+
+WOOCOMMERCE = '/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js'
+
+
+def snapshot(scripts, meta=None):
+    return PageFeatures('https://example.com', {'Server': 'nginx'}, scripts, meta or {}, html_hash(''))
+
+
+def test_cached_snapshots_with_different_scripts():
+    wappalyzer = Wappalyzer(cache=MemoryCache())
+    assert wappalyzer.analyze(snapshot([WOOCOMMERCE])) == ['eCommerce']
+    assert wappalyzer.analyze(snapshot(['/static/app.js'])) == []
+    assert wappalyzer.analyze(snapshot([WOOCOMMERCE])) == ['eCommerce']
+
+
+def test_cached_snapshots_with_different_meta():
+    wappalyzer = Wappalyzer(cache=MemoryCache())
+    assert wappalyzer.analyze(snapshot([], {'generator': 'nothing'})) == []
+    assert wappalyzer.analyze(snapshot([], {'generator': 'WooCommerce 5.9'})) == ['eCommerce']
+
+
+def test_snapshot_round_trip():
+    features = snapshot([WOOCOMMERCE])
+    assert PageFeatures.from_dict(features.to_dict()).scripts == [WOOCOMMERCE]
@@ -0,0 +1,122 @@
+import codecs
+import sys
+import types
+
+import pytest
+
+from Wappalyzer import WebPage, _fetch
+from Wappalyzer._fetch import META_PREFIX, check_content_type, decode, read_capped, resolve_charset
+
+
+class FakeResponse:
+    """
+    The attributes of a `requests.Response` used by `WebPage.new_from_response`.
+    """
+    def __init__(self, body, content_type='text/html', chunk_size=3):
+        self.url = 'https://example.com'
+        self.headers = {'Content-Type': content_type}
+        self.read = 0
+        self._body = body
+        self._chunk_size = chunk_size
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self._body), self._chunk_size):
+            chunk = self._body[start:start + self._chunk_size]
+            self.read += len(chunk)
+            yield chunk
+
+
+def name(encoding):
+    return codecs.lookup(encoding).name
+
+
+def test_read_capped():
+    assert read_capped([b'abc', b'def', b'ghi'], 5) == b'abcde'
+    assert read_capped([b'abc', b'def'], 6) == b'abcdef'
+    assert read_capped([b'abc', b'def'], None) == b'abcdef'
+    # The chunks after the cap are not read
+    chunks = iter([b'abc', b'def', b'ghi'])
+    read_capped(chunks, 4)
+    assert list(chunks) == [b'ghi']
+
+
+def test_multibyte_character_cut_at_the_cap(monkeypatch):
+    monkeypatch.setattr(_fetch, '_detect', lambda prefix: 'latin-1')
+    body = read_capped(['éèà'.encode('utf-8')], 5)
+    assert resolve_charset(body, None) == 'utf-8'
+    assert decode(body, None) == 'éè�'
+    # Invalid UTF-8 before the end is not mistaken for a cut character
+    body = 'éèà'.encode('utf-8')[:3] + b' ' * 10
+    assert resolve_charset(body, None) == name('latin-1')
+
+
+def test_header_charset_beats_meta():
+    body = '<meta charset="utf-8"><p>café</p>'.encode('latin-1')
+    assert resolve_charset(body, 'text/html; charset="ISO-8859-1"') == name('iso-8859-1')
+    assert decode(body, 'text/html; charset=iso-8859-1').endswith('café</p>')
+    # An unknown header charset is ignored
+    assert resolve_charset(b'<meta charset="latin-1">', 'text/html; charset=nope') == name('latin-1')
+
+
+def test_bom():
+    body = codecs.BOM_UTF8 + '<meta charset="latin-1"><p>café</p>'.encode('utf-8')
+    assert resolve_charset(body, None) == 'utf-8-sig'
+    assert decode(body, None) == '<meta charset="latin-1"><p>café</p>'
+    body = codecs.BOM_UTF16_LE + '<p>café</p>'.encode('utf-16-le')
+    assert decode(body, 'text/html') == '<p>café</p>'
+
+
+@pytest.mark.parametrize('meta', ['<meta charset="windows-1252">',
+                                  '<meta http-equiv="Content-Type" content="text/html; charset=windows-1252">'])
+def test_meta_charset_in_prefix(meta):
+    body = meta.encode('ascii') + b'<p>ok</p>'
+    assert resolve_charset(body, 'text/html') == name('windows-1252')
+    # Only the first bytes are searched
+    body = b' ' * META_PREFIX + body
+    assert resolve_charset(body, 'text/html') == 'utf-8'
+
+
+def test_charset_detection_fallback(monkeypatch):
+    body = 'Ceci est une page en français, déjà très lisible. '.encode('cp1252') * 20
+    assert resolve_charset(body, None) != 'utf-8'
+
+    detected = []
+
+    def detect(prefix):
+        detected.append(prefix)
+        return {'encoding': 'windows-1252'}
+
+    # Without charset_normalizer, chardet is used
+    monkeypatch.setitem(sys.modules, 'charset_normalizer', None)
+    monkeypatch.setitem(sys.modules, 'chardet', types.SimpleNamespace(detect=detect))
+    assert resolve_charset(body, None) == name('windows-1252')
+    assert detected == [body]
+
+    # Without either, the body is decoded as UTF-8 with replacements
+    monkeypatch.setitem(sys.modules, 'chardet', None)
+    assert resolve_charset(body, None) == 'utf-8'
+    assert '�' in decode(body, None)
+
+
+@pytest.mark.parametrize('content_type', [None, '', 'text/html', 'text/plain; charset=utf-8',
+                                          'application/xhtml+xml', 'APPLICATION/XML'])
+def test_content_types_holding_html(content_type):
+    check_content_type(content_type, 'https://example.com')
+
+
+@pytest.mark.parametrize('content_type', ['image/png', 'image/svg', 'application/octet-stream', 'video/mp4'])
+def test_content_types_not_holding_html(content_type):
+    with pytest.raises(ValueError):
+        check_content_type(content_type, 'https://example.com')
+
+
+def test_new_from_response_max_bytes():
+    body = '<html><head><meta name="generator" content="café"></head><body>'.encode('utf-8') + b'x' * 1000
+    response = FakeResponse(body)
+    page = WebPage.new_from_response(response, max_bytes=100)
+    assert len(page.html.encode('utf-8')) <= 100
+    assert response.read < len(body)
+    assert page.meta == {'generator': 'café'}
+    assert WebPage.new_from_response(FakeResponse(body), max_bytes=None).html == body.decode('utf-8')
+    with pytest.raises(ValueError):
+        WebPage.new_from_response(FakeResponse(b'\x89PNG', content_type='image/png'))
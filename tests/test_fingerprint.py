@@ -0,0 +1,55 @@
+import pickle
+
+from Wappalyzer import fingerprint
+from Wappalyzer.fingerprint import Fingerprint, Pattern
+
+
+def compiles(monkeypatch):
+    compiled = []
+    compile = Pattern._compile
+
+    def counting(expression):
+        compiled.append(expression)
+        return compile(expression)
+
+    monkeypatch.setattr(Pattern, '_compile', staticmethod(counting))
+    return compiled
+
+
+def test_same_string_same_regex():
+    first = Fingerprint('First', html='shared-regex-[0-9]+\\;version:\\1', headers={'Server': 'shared-regex-[0-9]+'})
+    second = Fingerprint('Second', scriptSrc=['other', 'shared-regex-[0-9]+\\;confidence:50'],
+                         dom={'#shared': {'attributes': {'class': 'shared-regex-[0-9]+'}}})
+    patterns = [pattern for fp in (first, second) for _, _, pattern in fp.patterns()
+                if pattern.string == 'shared-regex-[0-9]+']
+    assert len(patterns) == 4
+    assert len({id(pattern.string) for pattern in patterns}) == 1
+    assert len({id(pattern.literals) for pattern in patterns}) == 1
+    assert len({id(pattern.regex) for pattern in patterns}) == 1
+    assert fingerprint._regexes['shared-regex-[0-9]+'] is patterns[0].regex
+    # The other attributes of the patterns stay their own
+    assert [pattern.version for pattern in patterns] == ['\\1', None, None, None]
+    assert [pattern.confidence for pattern in patterns] == [100, 100, 50, 100]
+
+
+def test_regex_compiled_once_on_first_use(monkeypatch):
+    compiled = compiles(monkeypatch)
+    patterns = Fingerprint('Lazy', html='lazy-regex', url=['lazy-regex', 'lazy-regex\\;version:1']).html
+    patterns += Fingerprint('Lazier', scriptSrc='lazy-regex').scriptSrc
+    assert compiled == []
+    assert all(pattern._regex is None for pattern in patterns)
+    assert patterns[0].regex.search('a LAZY-REGEX')
+    assert compiled == ['lazy-regex']
+    assert all(pattern.regex is patterns[0].regex for pattern in patterns)
+    assert compiled == ['lazy-regex']
+
+
+def test_unpickled_patterns_reuse_compiled_regex(monkeypatch):
+    compiled = compiles(monkeypatch)
+    pattern = Pattern('pickled-regex', version='\\1', confidence='20')
+    regex = pattern.regex
+    loaded = pickle.loads(pickle.dumps(pattern))
+    assert loaded._regex is None
+    assert (loaded.string, loaded.version, loaded.confidence) == ('pickled-regex', '\\1', 20)
+    assert loaded.regex is regex
+    assert compiled == ['pickled-regex']
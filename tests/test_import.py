@@ -0,0 +1,17 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+import Wappalyzer
+from Wappalyzer.benchmarks.import_time import LAZY_MODULES
+
+
+def test_import_is_lazy():
+    # In a fresh interpreter, the tests have already imported most of these modules
+    env = dict(os.environ, PYTHONPATH=str(pathlib.Path(Wappalyzer.__file__).parent.parent))
+    process = subprocess.run([sys.executable, '-c', f"import {Wappalyzer.__name__}, sys; print(*sys.modules)"],
+                             env=env, stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    imported = [module for module in process.stdout.split()
+                if any(module == lazy or module.startswith(lazy + '.') for lazy in LAZY_MODULES)]
+    assert imported == []
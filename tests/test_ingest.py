@@ -0,0 +1,82 @@
+import gzip
+import json
+
+from Wappalyzer.ingest import last_offset, main, read_jsonl, read_warc
+
+SHOP = b'<html><script src="/wp-content/plugins/woocommerce/x.js"></script></html>'
+
+
+def record(uri, block, length_header=None):
+    if length_header is None:
+        length_header = b'Content-Length: %d\r\n' % len(block)
+    return (b'WARC/1.0\r\nWARC-Type: response\r\nWARC-Target-URI: <%s>\r\n'
+            b'Content-Type: application/http; msgtype=response\r\n%s\r\n' % (uri, length_header)
+            + block + b'\r\n\r\n')
+
+
+def http(body):
+    return b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n' + body
+
+
+def test_warc_record_with_invalid_length(tmp_path):
+    path = tmp_path / 'pages.warc'
+    path.write_bytes(record(b'http://a/', http(SHOP))
+                     + record(b'http://b/', http(SHOP), b'Content-Length: x\r\n')
+                     + record(b'http://c/', http(SHOP), b'')
+                     + record(b'http://d/', http(SHOP)))
+    assert [url for _, (url, _, _) in read_warc(path)] == ['http://a/', 'http://d/']
+
+
+def test_corrupt_gzip_member_is_skipped(tmp_path, caplog):
+    members = [gzip.compress(record(b'http://%s/' % name, http(SHOP + b'x' * 1000))) for name in (b'a', b'b', b'c')]
+    corrupt = bytearray(members[1])
+    # Within the deflate data, after the gzip header
+    corrupt[20:40] = b'\xff' * 20
+    path = tmp_path / 'pages.warc.gz'
+    path.write_bytes(members[0] + bytes(corrupt) + members[2])
+    assert [url for _, (url, _, _) in read_warc(path)] == ['http://a/', 'http://c/']
+    assert f"corrupt gzip member at offset {len(members[0])}" in caplog.text
+    # A corrupt last member ends the scan
+    path.write_bytes(members[0] + bytes(corrupt))
+    assert [url for _, (url, _, _) in read_warc(path)] == ['http://a/']
+
+
+def test_last_offset_of_long_line(tmp_path):
+    output = tmp_path / 'results.jsonl'
+    lines = [{'offset': 10, 'url': 'a', 'categories': []},
+             {'offset': 20, 'url': 'b' * 200000, 'categories': []}]
+    output.write_text(''.join(json.dumps(line) + '\n' for line in lines))
+    assert last_offset(output) == 20
+    with output.open('a') as ofile:
+        ofile.write('{"offset": 30, "url": "' + 'c' * 100000)
+    assert last_offset(output) == 20
+    assert output.read_text().endswith('"categories": []}\n')
+
+
+def test_last_offset_of_empty_or_partial_file(tmp_path):
+    output = tmp_path / 'results.jsonl'
+    assert last_offset(output) is None
+    output.write_text('{"offset": 1')
+    assert last_offset(output) is None
+    assert output.read_text() == ''
+
+
+def test_invalid_json_lines_are_skipped(tmp_path):
+    path = tmp_path / 'pages.jsonl'
+    shop = SHOP.decode()
+    path.write_text(json.dumps({'url': 'http://a/', 'html': shop}) + '\n'
+                    + '{"url": "http://b/", "html": \n'
+                    + '42\n'
+                    + json.dumps({'url': 'http://c/'}) + '\n'
+                    + json.dumps(['http://d/', {}, shop]) + '\n')
+    assert [url for _, (url, _, _) in read_jsonl(path)] == ['http://a/', 'http://d/']
+
+    output = tmp_path / 'results.jsonl'
+    main([str(path), '-o', str(output), '-w', '1'])
+    assert [json.loads(line)['url'] for line in output.read_text().splitlines()] == ['http://a/', 'http://d/']
+    with path.open('a') as pfile:
+        pfile.write('not json\n' + json.dumps({'url': 'http://e/', 'html': shop}) + '\n')
+    main([str(path), '-o', str(output), '-w', '1', '--resume'])
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [result['url'] for result in results] == ['http://a/', 'http://d/', 'http://e/']
+    assert results[-1]['categories'] == ['eCommerce']
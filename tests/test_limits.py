@@ -0,0 +1,136 @@
+import json
+import logging
+
+import pytest
+
+from Wappalyzer import Wappalyzer, WebPage, limits
+from Wappalyzer.cache import MemoryCache
+from Wappalyzer.fingerprint import Pattern
+from Wappalyzer.limits import BUDGET_EXCEEDED, QUARANTINED, HtmlScan, MatchLimits
+
+BODY = '<body>' + 'x' * 1000 + '</body></html>'
+
+
+@pytest.mark.parametrize('html, head_end', [
+    ('<html><head><title>t</title></head>' + BODY, '</head>'),
+    ('<HTML><HEAD><TITLE>T</TITLE></HEAD>' + BODY, '</HEAD>'),
+    ('<html><head><title>t</title></head >' + BODY, '</head >'),
+])
+def test_window_ending_in_head(html, head_end):
+    # The window cuts inside the tag name of <head>
+    assert MatchLimits(html_window=10).window(html) == html[:html.index(head_end) + len(head_end)]
+
+
+def test_window_before_head():
+    html = '<!-- ' + 'c' * 500 + ' --><html><head><script src="/a.js"></script></head>' + BODY
+    expected = html[:html.index('</head>') + len('</head>')]
+    assert MatchLimits(html_window=100, max_html_window=1000).window(html) == expected
+
+
+def test_window_after_head():
+    html = '<html><head></head>' + BODY
+    assert MatchLimits(html_window=100).window(html) == html[:100]
+    assert MatchLimits(html_window=100).window('x' * 200) == 'x' * 100
+    assert MatchLimits().window(html) == html
+
+
+def test_window_extension_bounded():
+    html = '<html><head>' + 'h' * 1000 + '</head>' + BODY
+    # Defaults to 4 times the window
+    assert MatchLimits(html_window=100).window(html) == html[:100]
+    assert MatchLimits(html_window=100, max_html_window=2000).window(html) == html[:html.index('</head>') + 7]
+    assert MatchLimits(html_window=300).window(html) == html[:html.index('</head>') + 7]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+class SlowRegex:
+    """
+    A regex whose searches take `seconds` on the clock.
+    """
+    def __init__(self, clock, seconds, match=None):
+        self.clock = clock
+        self.seconds = seconds
+        self.match = match
+        self.searches = 0
+
+    def search(self, html):
+        self.searches += 1
+        self.clock.now += self.seconds
+        return self.match
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(limits.time, 'perf_counter', clock.perf_counter)
+    return clock
+
+
+PAGE = WebPage('https://example.com', '<html><p>x</p></html>', {})
+
+
+def test_html_time_budget(clock):
+    skips = []
+    match_limits = MatchLimits(html_time_budget=1.0, slow_pattern_time=10,
+                               on_skip=lambda *args: skips.append(args))
+    regexes = [SlowRegex(clock, 0.6) for _ in range(3)]
+    patterns = [Pattern(f'pattern-{index}', regex) for index, regex in enumerate(regexes)]
+    scan = HtmlScan(match_limits, PAGE)
+    assert [scan.search('Tech', pattern) for pattern in patterns] == [None] * 3
+    assert [regex.searches for regex in regexes] == [1, 1, 0]
+    assert scan.skipped == 1 and scan.spent == pytest.approx(1.2)
+    assert skips == [('https://example.com', 'Tech', 'pattern-2', BUDGET_EXCEEDED)]
+    assert match_limits.skipped == {BUDGET_EXCEEDED: 1}
+    # Each page has its own budget
+    scan = HtmlScan(match_limits, PAGE)
+    scan.search('Tech', patterns[2])
+    assert regexes[2].searches == 1 and not scan.skipped
+    assert not match_limits.quarantined
+
+
+def test_slow_patterns_quarantined(clock, caplog):
+    skips = []
+    match_limits = MatchLimits(slow_pattern_time=0.1, quarantine_after=2, on_skip=lambda *args: skips.append(args))
+    slow, fast = SlowRegex(clock, 0.5), SlowRegex(clock, 0.01)
+    patterns = [Pattern('slow', slow), Pattern('fast', fast)]
+    caplog.set_level(logging.DEBUG, logger='python-Wappalyzer')
+    for _ in range(4):
+        scan = HtmlScan(match_limits, PAGE)
+        for pattern in patterns:
+            scan.search('Tech', pattern)
+        scan.log_skipped()
+    assert slow.searches == 2 and fast.searches == 4
+    assert match_limits.quarantined == {('Tech', 'slow')}
+    assert match_limits.strikes == {('Tech', 'slow'): 2}
+    assert match_limits.skipped == {QUARANTINED: 2}
+    assert skips == [('https://example.com', 'Tech', 'slow', QUARANTINED)] * 2
+    # Warned once when quarantined, the skips of each page are only logged at debug level
+    assert [record.levelno for record in caplog.records if 'Quarantined' in record.getMessage()] == [logging.WARNING]
+    assert [record.levelno for record in caplog.records if 'Skipped' in record.getMessage()] == [logging.DEBUG] * 2
+
+
+def test_results_with_skipped_checks_not_cached(tmp_path):
+    technologies_file = tmp_path / 'technologies.json'
+    technologies_file.write_text(json.dumps({
+        'categories': {'6': {'name': 'eCommerce'}},
+        'technologies': {'Shop': {'cats': [6], 'html': 'shop-html'}}}))
+    page = WebPage('https://example.com', '<p>shop-html</p>', {})
+    result_cache = MemoryCache()
+    # No budget left: all the html checks are skipped
+    wappalyzer = Wappalyzer(technologies_file=technologies_file, cache=result_cache,
+                            limits=MatchLimits(html_time_budget=0))
+    assert wappalyzer.analyze(page) == []
+    assert len(result_cache._entries) == 0
+    assert wappalyzer.limits.skipped == {BUDGET_EXCEEDED: 1}
+
+    wappalyzer = Wappalyzer(technologies_file=technologies_file, cache=result_cache,
+                            limits=MatchLimits(html_time_budget=10))
+    assert wappalyzer.analyze(page) == ['eCommerce']
+    assert len(result_cache._entries) == 1
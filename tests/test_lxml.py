@@ -0,0 +1,108 @@
+import pickle
+
+import pytest
+
+pytest.importorskip('cssselect')
+
+from Wappalyzer import Wappalyzer, _lxml
+from Wappalyzer._common import webpage_class
+from Wappalyzer.benchmarks.parity import differences
+
+HTML = '''<html><head>
+<meta name="generator" content="WooCommerce 5.9.1">
+<script src="/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js"></script>
+</head><body><div id="main" class="a b">x &amp; y<br></div></body></html>'''
+
+
+@pytest.fixture(scope="module")
+def wappalyzer():
+    return Wappalyzer()
+
+
+def test_tree_built_on_first_query(wappalyzer):
+    WebPage = webpage_class('lxml')
+    page = WebPage('https://example.com', HTML, {})
+    assert page.scripts == ['/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js']
+    assert page.meta == {'generator': 'WooCommerce 5.9.1'}
+    # Decided by the script sources
+    assert wappalyzer.analyze(page) == ['eCommerce']
+    assert '_root' not in page.__dict__
+    page = WebPage('https://example.com', '<p>', {})
+    assert wappalyzer.analyze(page) == []
+    assert '_root' in page.__dict__
+
+
+def test_pickle_rebuilds_the_tree():
+    WebPage = webpage_class('lxml')
+    page = pickle.loads(pickle.dumps(WebPage('https://example.com', HTML, {})))
+    # Only parsed again when the DOM is queried
+    assert '_root' not in page.__dict__
+    assert page.scripts == ['/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js']
+    assert page.meta == {'generator': 'WooCommerce 5.9.1'}
+    tags = list(page.select('div.a'))
+    assert [tag.attributes['class'] for tag in tags] == [['a', 'b']]
+    assert tags[0].inner_html == 'x &amp; y<br>'
+
+
+def test_analyze_many_in_process_pool(wappalyzer):
+    WebPage = webpage_class('lxml')
+    pages = [WebPage('https://example.com/%d' % i, HTML if i % 2 else '<p>', {}) for i in range(8)]
+    expected = [wappalyzer.analyze(page) for page in pages]
+    assert expected[1] == ['eCommerce']
+    results = dict(wappalyzer.analyze_many(pages, workers=2, chunksize=2))
+    assert [sorted(results[i]) for i in range(len(pages))] == [sorted(result) for result in expected]
+
+
+def test_new_from_response_async_in_process_pool(wappalyzer):
+    import asyncio
+    from aiohttp import web
+    from aiohttp.test_utils import TestClient, TestServer
+
+    async def handler(request):
+        return web.Response(text=HTML, content_type='text/html')
+
+    async def scan():
+        app = web.Application()
+        app.router.add_get('/', handler)
+        executor = wappalyzer.new_process_executor(2)
+        try:
+            async with TestClient(TestServer(app)) as client:
+                response = await client.get('/')
+                page = await WebPage.new_from_response_async(response, executor=executor)
+                return await wappalyzer.analyze_async(page, executor=executor)
+        finally:
+            executor.shutdown()
+
+    WebPage = webpage_class('lxml')
+    assert asyncio.run(scan()) == ['eCommerce']
+
+
+@pytest.mark.parametrize('html', [
+    '<html><body><p>x</p></body></html>\n<script src="/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js">'
+    '</script><div id="after" class="a">y</div>',
+    '<HTML><BODY><p>x</p></BODY></HTML >\n<!-- second --><html><head><meta name="generator" content="WooCommerce 5.9">'
+    '</head><body><div class="a">z</div></body></html>',
+    '<p>x</p></html><html><body><div id="after"><p>y</p></div></body></html>',
+    '<div class="a">x</div></html>   \n  ',
+    # Names that lxml rejects when the tree is built from Python
+    '<html><body><div :x="1">a</div></body></html><p>after</p>',
+    '<html><body><div id="after" :class="{a: 1}" @click="go" class="a"><v-on:x>y</v-on:x></div></body></html><p>z</p>',
+])
+def test_parity_after_html_end(wappalyzer, html):
+    selectors = ['*', 'html', 'body', 'p', 'div.a', '#after', 'div > p', 'script[src]', 'meta']
+    assert differences(wappalyzer, 'https://example.com', {}, html, selectors) == []
+    assert (wappalyzer.analyze(webpage_class('lxml')('https://example.com', html, {}))
+            == wappalyzer.analyze(webpage_class('bs4')('https://example.com', html, {})))
+
+
+def test_parse_after_html_end_failing(wappalyzer, monkeypatch):
+    html = '<html><body><div class="a">x</div></body></html><p id="after">y</p>'
+
+    def fail(self, tag, attrib):
+        raise ValueError("failed")
+
+    monkeypatch.setattr(_lxml._DocumentTarget, 'start', fail)
+    # The content after </html> is dropped, the rest of the page is still analyzed
+    webpage = webpage_class('lxml')('https://example.com', html, {})
+    assert [tag.attributes for tag in webpage.select('div.a')] == [{'class': ['a']}]
+    assert wappalyzer.analyze(webpage) == []
@@ -0,0 +1,87 @@
+import json
+import re
+
+import pytest
+
+from Wappalyzer import _prefilter
+from Wappalyzer._prefilter import LiteralMatcher, normalize, required_literals
+from Wappalyzer.get_data import GetData
+
+from conftest import unescape
+
+
+@pytest.fixture(params=['trie', 'ahocorasick'])
+def matcher_class(request, monkeypatch):
+    if request.param == 'trie':
+        monkeypatch.setattr(_prefilter, 'ahocorasick', None)
+    else:
+        monkeypatch.setattr(_prefilter, 'ahocorasick', pytest.importorskip('ahocorasick'))
+    return LiteralMatcher
+
+
+def assert_found(matcher_class, expression, text):
+    """
+    The literals of the expression are found in a text it matches.
+    """
+    assert re.search(expression, text, re.I), (expression, text)
+    literals = required_literals(expression)
+    if literals is not None:
+        assert literals & matcher_class(literals).search(normalize(text)), (expression, text, literals)
+
+
+@pytest.mark.parametrize('expression, text, literals', [
+    # case folding
+    (r'jquery\.js', 'JQuery.JS', {'jquery.js'}),
+    (r'WordPress', '<meta content="wordpress">', {'wordpress'}),
+    (r'wix', 'WİX', {'wix'}),
+    (r'cloudflare', 'CLOUDFLARE', {'cloudflare'}),
+    # alternation branches, each one contributes its literals
+    (r'wp-(?:content|includes)/', '/WP-INCLUDES/x.js', {'content', 'includes'}),
+    (r'(?:shopify|bigcommerce)\.com', 'cdn.BigCommerce.com', {'shopify', 'bigcommerce'}),
+    (r'magento|mage/cookies', 'static/mage/cookies.js', {'mage'}),
+    # a branch without literals makes the whole alternation unusable
+    (r'(?:bigcommerce|x)\.js', 'X.js', {'.js'}),
+    # optional groups and repeats that can match nothing don't contribute
+    (r'jquery(?:\.min)?\.js', 'jquery.js', {'jquery'}),
+    (r'jquery(?:\.min)?\.js', 'jquery.min.js', {'jquery'}),
+    (r'woocommerce(?:-[a-z]+)*/assets', 'WooCommerce/assets', {'woocommerce'}),
+    (r'(?:abcdef)?prestashop', 'prestashop', {'prestashop'}),
+    (r'cdn(?:\.production\.min)?\.js', 'CDN.js', {'cdn'}),
+    (r'app(?:-bundle-version)*?\.js', 'app.js', {'app'}),
+    (r'(?:magento-storefront){0,2}mage', 'mage', {'mage'}),
+    (r'(?:ab)+squarespace', 'ababSquarespace', {'squarespace'}),
+    # nothing long enough to filter on
+    (r'\d+\.\d+', '1.2', None),
+    (r'a.b', 'axb', None),
+])
+def test_required_literals(matcher_class, expression, text, literals):
+    assert required_literals(expression) == literals
+    assert_found(matcher_class, expression, text)
+
+
+def test_fingerprint_patterns(matcher_class):
+    technologies = json.loads(GetData().technologies_file().read_text(encoding='utf-8'))['technologies']
+    checked = 0
+    for technology in technologies.values():
+        for field in ('url', 'html', 'scriptSrc'):
+            patterns = technology.get(field, [])
+            for pattern in [patterns] if isinstance(patterns, str) else patterns:
+                expression = pattern.split('\\;')[0]
+                for text in (unescape(pattern), unescape(pattern).upper()):
+                    try:
+                        if not re.search(expression, text, re.I):
+                            continue
+                    except re.error:
+                        continue
+                    assert_found(matcher_class, expression, text)
+                    checked += 1
+    assert checked > 100
+
+
+def test_overlapping_literals(matcher_class):
+    literals = ['abc', 'bcd', 'abcdef', 'cde', 'xyz']
+    matcher = matcher_class(literals)
+    assert matcher.search('--abcdef--') == {'abc', 'bcd', 'abcdef', 'cde'}
+    assert matcher.search('abcd') == {'abc', 'bcd'}
+    assert matcher.search('nothing') == set()
+    assert matcher_class([]).search('abc') == frozenset()
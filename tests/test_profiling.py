@@ -0,0 +1,94 @@
+import json
+import pickle
+import threading
+
+import pytest
+
+from Wappalyzer import Wappalyzer, WebPage, wappalyzer
+from Wappalyzer.profiling import Profiler, _ProfiledRegex
+
+
+def test_report():
+    profiler = Profiler()
+    profiler.record(('Shop', 'html', 'a'), 0.5, True)
+    profiler.record(('Shop', 'html', 'b'), 0.25, False)
+    profiler.record(('Shop', 'scriptSrc', 'c'), 1.0, False)
+    report = profiler.report()
+    assert report['technologies'] == [
+        {'technology': 'Shop', 'calls': 3, 'matches': 1, 'total_time': 1.75, 'max_time': 1.0}]
+    assert [(f['field'], f['calls']) for f in report['fields']] == [('scriptSrc', 1), ('html', 2)]
+    assert [p['pattern'] for p in report['patterns']] == ['c', 'a', 'b']
+
+
+def test_report_while_recording():
+    profiler = Profiler()
+    stop = threading.Event()
+
+    def record(thread):
+        index = 0
+        while not stop.is_set():
+            profiler.record(('Tech %d' % thread, 'html', str(index % 50)), 0.001, False)
+            index += 1
+
+    threads = [threading.Thread(target=record, args=(thread,)) for thread in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(200):
+            report = profiler.report()
+            # The totals agree: the copy isn't modified while it's formatted
+            calls = sum(p['calls'] for p in report['patterns'])
+            assert sum(t['calls'] for t in report['technologies']) == calls
+            assert sum(f['calls'] for f in report['fields']) == calls
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+@pytest.fixture
+def shop(tmp_path):
+    technologies_file = tmp_path / 'technologies.json'
+    technologies_file.write_text(json.dumps({
+        'categories': {'6': {'name': 'eCommerce'}},
+        'technologies': {
+            'Shop': {'cats': [6], 'scriptSrc': 'shop\\.js', 'headers': {'X-Shop': 'yes'}},
+            'Other': {'cats': [6], 'html': 'other-html', 'meta': {'generator': 'Other'}},
+        }}))
+    return Wappalyzer(technologies_file=technologies_file)
+
+
+def test_install_records_analyses(shop):
+    regexes = {pattern: pattern.regex for technology in shop.technologies.values()
+               for _, _, pattern in technology.patterns()}
+    profiler = Profiler()
+    shop.set_profiler(profiler)
+    assert all(isinstance(pattern._regex, _ProfiledRegex) for pattern in regexes)
+    page = WebPage('https://example.com', '<script src="/shop.js"></script><p>other-html</p>', {'X-Shop': 'no'})
+    assert shop.detect(page) == {'Shop', 'Other'}
+    stats = {(p['technology'], p['field'], p['pattern']): (p['calls'], p['matches'])
+             for p in profiler.report()['patterns']}
+    assert stats[('Shop', 'scriptSrc', 'shop\\.js')] == (1, 1)
+    assert stats[('Shop', 'headers', 'x-shop: yes')] == (1, 0)
+    assert stats[('Other', 'html', 'other-html')] == (1, 1)
+    assert all(p['total_time'] >= 0 for p in profiler.report()['patterns'])
+
+    shop.set_profiler(None)
+    assert all(pattern._regex is regex for pattern, regex in regexes.items())
+    assert not profiler._installed
+    shop.detect(page)
+    assert sum(p['calls'] for p in profiler.report()['patterns']) == len(stats)
+
+
+def test_not_installed_in_worker_processes(shop, caplog):
+    shop.set_profiler(Profiler())
+    executor = shop.new_process_executor(1)
+    executor.shutdown()
+    assert "doesn't record the analyses of worker processes" in caplog.text
+    try:
+        # As the initializer of a worker spawned with a copy of the Wappalyzer
+        wappalyzer._init_worker(pickle.loads(pickle.dumps(shop)))
+        assert wappalyzer._worker_wappalyzer.profiler is None
+        assert shop.profiler is not None
+    finally:
+        wappalyzer._worker_wappalyzer = None
@@ -0,0 +1,139 @@
+import gc
+import json
+import threading
+
+from Wappalyzer import WebPage, _bs4, fingerprint
+from Wappalyzer.get_data import GetData
+from Wappalyzer.profiling import Profiler, _ProfiledRegex
+from Wappalyzer.reloading import ReloadingWappalyzer
+
+VERSIONS = 5
+
+# Matched by the header patterns of all the versions
+PAGE = WebPage('https://example.com', '<p>', {'X-Reloaded': ' '.join(f'version-{v}' for v in range(VERSIONS))})
+# Matched by the dom selector of the first version
+DOM_PAGE = WebPage('https://example.com', '<div id="reloaded-0"></div>', {})
+
+
+def write_version(path, version):
+    technologies = json.loads(GetData().technologies_file().read_text(encoding='utf-8'))
+    technologies['technologies'][f'Reloaded {version}'] = {
+        'cats': [6], 'headers': {'X-Reloaded': f'version-{version}'}, 'dom': f'#reloaded-{version}'}
+    path.write_text(json.dumps(technologies), encoding='utf-8')
+
+
+def patterns(wappalyzer):
+    return [pattern for technology in wappalyzer.technologies.values() for _, _, pattern in technology.patterns()]
+
+
+def reloaded(detected):
+    return [tech_name for tech_name in detected if tech_name.startswith('Reloaded')]
+
+
+def test_reloads_dont_accumulate(tmp_path):
+    technologies_file = tmp_path / 'technologies.json'
+    write_version(technologies_file, 0)
+    profiler = Profiler()
+    wappalyzer = ReloadingWappalyzer(technologies_file, profiler=profiler)
+    try:
+        first = patterns(wappalyzer.current)
+        for version in range(1, 4):
+            write_version(technologies_file, version)
+            assert wappalyzer.reload().result()
+        current = wappalyzer.current
+    finally:
+        wappalyzer.close()
+    gc.collect()
+
+    assert 'version-0' not in fingerprint._regexes
+    assert 'version-3' in fingerprint._regexes
+    assert len(profiler._installed) == len(patterns(current))
+    assert all(isinstance(pattern._regex, _ProfiledRegex) for pattern in patterns(current))
+    assert not any(isinstance(pattern._regex, _ProfiledRegex) for pattern in first)
+
+
+def test_previous_version_released_once_unused(tmp_path):
+    technologies_file = tmp_path / 'technologies.json'
+    write_version(technologies_file, 0)
+    wappalyzer = ReloadingWappalyzer(technologies_file, profiler=Profiler())
+    try:
+        # An analysis in progress on the first version
+        previous = wappalyzer.current
+        assert reloaded(previous.detect(DOM_PAGE)) == ['Reloaded 0']
+        previous_patterns = patterns(previous)
+        write_version(technologies_file, 1)
+        assert wappalyzer.reload().result()
+        assert reloaded(wappalyzer.detect(PAGE)) == ['Reloaded 1']
+        # Compiles the selectors of the current version
+        assert reloaded(wappalyzer.detect(WebPage('https://example.com', '<p>', {}))) == []
+
+        # It keeps its caches and profiler while it runs
+        assert reloaded(previous.detect(DOM_PAGE)) == ['Reloaded 0']
+        assert 'version-0' in fingerprint._regexes and '#reloaded-0' in _bs4._compiled_selectors
+        assert all(isinstance(pattern._regex, _ProfiledRegex) for pattern in previous_patterns)
+
+        del previous
+        gc.collect()
+        assert 'version-0' not in fingerprint._regexes and '#reloaded-0' not in _bs4._compiled_selectors
+        assert 'version-1' in fingerprint._regexes and '#reloaded-1' in _bs4._compiled_selectors
+        assert not any(isinstance(pattern._regex, _ProfiledRegex) for pattern in previous_patterns)
+    finally:
+        wappalyzer.close()
+
+
+def test_analyses_during_reloads(tmp_path):
+    technologies_file = tmp_path / 'technologies.json'
+    write_version(technologies_file, 0)
+    wappalyzer = ReloadingWappalyzer(technologies_file)
+    stop = threading.Event()
+    errors = []
+    seen = []
+
+    def analyze():
+        versions = []
+        try:
+            # Until the last version is seen
+            while not (stop.is_set() and versions[-1:] == [VERSIONS - 1]):
+                # Each analysis sees the fingerprints of a single version, never older than the previous one
+                found = reloaded(wappalyzer.detect(PAGE))
+                assert len(found) == 1, found
+                versions.append(int(found[0].split()[1]))
+                assert versions == sorted(versions)
+        except Exception as err:
+            errors.append(err)
+        seen.append(versions)
+
+    threads = [threading.Thread(target=analyze) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for version in range(1, VERSIONS):
+            write_version(technologies_file, version)
+            assert wappalyzer.reload().result()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        wappalyzer.close()
+    assert not errors
+    assert len(seen) == len(threads)
+    assert len({version for versions in seen for version in versions}) > 1
+
+
+def test_failed_reload(tmp_path, caplog):
+    technologies_file = tmp_path / 'technologies.json'
+    write_version(technologies_file, 0)
+    wappalyzer = ReloadingWappalyzer(technologies_file)
+    try:
+        current, version = wappalyzer.current, wappalyzer.version
+        technologies_file.write_text('{"technologies": ', encoding='utf-8')
+        assert not wappalyzer.reload().result()
+        assert 'Could not reload' in caplog.text
+        assert wappalyzer.current is current and wappalyzer.version == version
+        assert reloaded(wappalyzer.detect(PAGE)) == ['Reloaded 0']
+
+        write_version(technologies_file, 1)
+        assert wappalyzer.reload().result()
+        assert reloaded(wappalyzer.detect(PAGE)) == ['Reloaded 1']
+    finally:
+        wappalyzer.close()
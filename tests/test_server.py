@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from Wappalyzer import Wappalyzer
+from Wappalyzer.server import ScanServer
+
+SHOP = {'url': 'https://example.com',
+        'html': '<script src="/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js"></script>'}
+EMPTY = {'url': 'https://example.com', 'html': '<p>'}
+
+
+@pytest.fixture(scope="module")
+def wappalyzer():
+    return Wappalyzer()
+
+
+def request(server, method, path, **kwargs):
+    async def send():
+        async with TestClient(TestServer(server.app())) as client:
+            response = await client.request(method, path, **kwargs)
+            return response.status, response.headers, await response.json()
+    return asyncio.run(send())
+
+
+def test_single_page(wappalyzer):
+    assert request(ScanServer(wappalyzer), 'POST', '/analyze', json=SHOP)[::2] == (200, {'categories': ['eCommerce']})
+
+
+def test_batch_in_order(wappalyzer):
+    server = ScanServer(wappalyzer)
+    status, _, results = request(server, 'POST', '/analyze', json=[SHOP, EMPTY, {'html': 1}, SHOP])
+    assert status == 200
+    assert results[0] == results[3] == {'categories': ['eCommerce']}
+    assert results[1] == {'categories': []}
+    assert 'error' in results[2]
+    assert server.analyzed == 4 and server.pending == 0
+
+
+@pytest.mark.parametrize('page', [
+    {'html': '<p>'},
+    dict(EMPTY, headers={'X-Powered-By': 1}),
+    dict(EMPTY, headers=['Server']),
+    dict(EMPTY, categories=['Unknown']),
+    dict(EMPTY, categories=[1]),
+])
+def test_invalid_page(wappalyzer, page):
+    server = ScanServer(wappalyzer)
+    status, _, result = request(server, 'POST', '/analyze', json=page)
+    assert status == 400 and 'error' in result
+    status, _, results = request(server, 'POST', '/analyze', json=[page, SHOP])
+    assert status == 200 and 'error' in results[0] and results[1] == {'categories': ['eCommerce']}
+
+
+def test_page_failing_analysis(wappalyzer, monkeypatch):
+    server = ScanServer(wappalyzer)
+
+    async def analyze_async(page, **kwargs):
+        if page[1] == EMPTY['html']:
+            raise TypeError("failed")
+        return await Wappalyzer.analyze_async(wappalyzer, page, **kwargs)
+
+    monkeypatch.setattr(wappalyzer, 'analyze_async', analyze_async)
+    status, _, results = request(server, 'POST', '/analyze', json=[SHOP, EMPTY, SHOP])
+    assert status == 200
+    assert results[0] == results[2] == {'categories': ['eCommerce']}
+    assert 'failed' in results[1]['error']
+    assert server.pending == 0
+
+
+def test_invalid_json(wappalyzer):
+    assert request(ScanServer(wappalyzer), 'POST', '/analyze', data=b'{x')[0] == 400
+
+
+def test_backpressure(wappalyzer):
+    server = ScanServer(wappalyzer, max_queue=4)
+    server.pending = 3
+    status, headers, _ = request(server, 'POST', '/analyze', json=[EMPTY, EMPTY])
+    assert status == 503 and headers['Retry-After'] == '1'
+    server.pending = 0
+    assert request(server, 'POST', '/analyze', json=[EMPTY] * 4)[0] == 200
+
+
+def test_batch_larger_than_queue(wappalyzer):
+    status, _, _ = request(ScanServer(wappalyzer, max_queue=4), 'POST', '/analyze', json=[EMPTY] * 5)
+    assert status == 413
+
+
+def test_status(wappalyzer):
+    status, _, result = request(ScanServer(wappalyzer), 'GET', '/status')
+    assert status == 200
+    assert result['version'] == wappalyzer.version and result['pending'] == 0
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from Wappalyzer import Wappalyzer, _snapshot, get_data
+from Wappalyzer.fingerprint import METADATA_FIELDS, implied_closures
+from Wappalyzer.get_data import GetData
+
+
+@pytest.fixture
+def technologies_file(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    technologies_file = tmp_path / 'technologies.json'
+    shutil.copy(GetData().technologies_file(), technologies_file)
+    return technologies_file
+
+
+def test_snapshot_holds_implied_technologies(technologies_file, monkeypatch):
+    first = Wappalyzer(technologies_file=technologies_file)
+    snapshot_file = _snapshot.snapshot_file(technologies_file)
+    assert snapshot_file.parent == technologies_file.parent / 'cache' / 'python-Wappalyzer'
+    assert snapshot_file.exists()
+    assert not technologies_file.with_suffix('.snapshot').exists()
+
+    def fail(technologies):
+        raise AssertionError("implied_closures() called when loading a snapshot")
+
+    monkeypatch.setattr(get_data, 'implied_closures', fail)
+    second = Wappalyzer(technologies_file=technologies_file)
+    assert second._implied_technologies == implied_closures(second.technologies)
+    assert second._implied_technologies == first._implied_technologies
+    assert any(second._implied_technologies.values())
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason="POSIX permissions")
+def test_snapshots_writable_by_others_are_ignored(technologies_file):
+    Wappalyzer(technologies_file=technologies_file)
+    snapshot_file = _snapshot.snapshot_file(technologies_file)
+    source_digest = _snapshot.digest(technologies_file.read_bytes())
+    assert _snapshot.load(snapshot_file, source_digest) is not None
+    snapshot_file.chmod(0o666)
+    assert _snapshot.load(snapshot_file, source_digest) is None
+    snapshot_file.parent.chmod(0o777)
+    assert _snapshot.snapshot_file(technologies_file) is None
+    # Still works without snapshots
+    assert Wappalyzer(technologies_file=technologies_file).technologies
+
+
+def test_metadata_with_snapshot(technologies_file):
+    technologies = json.loads(technologies_file.read_text(encoding='utf-8'))['technologies']
+    first = Wappalyzer(technologies_file=technologies_file)
+    assert _snapshot.snapshot_file(technologies_file).exists()
+    second = Wappalyzer(technologies_file=technologies_file)
+    # The metadata are not kept with the fingerprints, yet available once loaded from the snapshot
+    assert not any(hasattr(fp, field) for fp in second.technologies.values() for field in METADATA_FIELDS)
+    for name, attrs in technologies.items():
+        expected = {field: attrs[field] for field in METADATA_FIELDS if field in attrs}
+        assert first.technology_metadata(name) == second.technology_metadata(name) == expected
+    assert any({'website', 'description', 'cpe'} <= set(second.technology_metadata(name)) for name in technologies)
+
+
+def test_least_recently_used_snapshots_removed(technologies_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(_snapshot, 'MAX_SNAPSHOTS', 2)
+    copies = [tmp_path / f'technologies-{index}.json' for index in range(4)]
+    for copy in copies:
+        shutil.copy(technologies_file, copy)
+
+    def snapshots():
+        return {path for path in (_snapshot.snapshot_file(copy) for copy in copies) if path.exists()}
+
+    for index, copy in enumerate(copies[:3]):
+        Wappalyzer(technologies_file=copy)
+        os.utime(_snapshot.snapshot_file(copy), (index, index))
+    assert snapshots() == {_snapshot.snapshot_file(copy) for copy in copies[1:3]}
+    # Loading a snapshot marks it as used
+    Wappalyzer(technologies_file=copies[1])
+    Wappalyzer(technologies_file=copies[3])
+    assert snapshots() == {_snapshot.snapshot_file(copy) for copy in (copies[1], copies[3])}
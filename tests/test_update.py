@@ -0,0 +1,132 @@
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Set, Tuple
+
+import pytest
+
+from Wappalyzer import get_data
+from Wappalyzer.get_data import GetData, UPDATE_INTERVAL
+from Wappalyzer.store_data import SHARDS, StoreData
+
+LAST_MODIFIED = 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+
+class Mirror:
+    """
+    Local stand-in of the repository the technologies are downloaded from.
+    """
+    def __init__(self) -> None:
+        self.files = {'/categories.json': {'6': {'name': 'Ecommerce', 'priority': 1}}}
+        for shard in SHARDS:
+            self.files[f'/technologies/{shard}.json'] = {}
+        self.files['/technologies/w.json'] = {'WooCommerce': {'cats': [6], 'scriptSrc': 'woocommerce'}}
+        self.failing: Set[str] = set()
+        # Validator sent with the files: 'ETag' or 'Last-Modified'
+        self.validator = 'ETag'
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+
+    def __enter__(self) -> 'Mirror':
+        mirror = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                mirror.requests.append((self.path, dict(self.headers)))
+                etag = '"%d"' % hash(json.dumps(mirror.files.get(self.path)))
+                if self.path in mirror.failing or self.path not in mirror.files:
+                    self.send_response(500)
+                    self.end_headers()
+                elif self.headers.get('If-None-Match') == etag or self.headers.get('If-Modified-Since') == LAST_MODIFIED:
+                    self.send_response(304)
+                    self.end_headers()
+                else:
+                    body = json.dumps(mirror.files[self.path]).encode('utf-8')
+                    self.send_response(200)
+                    self.send_header(mirror.validator, etag if mirror.validator == 'ETag' else LAST_MODIFIED)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def conditional_requests(self, header='If-None-Match'):
+        return [path for path, headers in self.requests if header in headers]
+
+
+@pytest.fixture
+def mirror(monkeypatch):
+    with Mirror() as mirror:
+        monkeypatch.setattr(get_data, 'StoreData', functools.partial(StoreData, base_url=mirror.url))
+        yield mirror
+
+
+@pytest.fixture
+def technologies_file(tmp_path):
+    path = tmp_path / 'technologies.json'
+    path.write_text(json.dumps({'categories': {}, 'technologies': {}}))
+    return path
+
+
+def test_update(mirror, technologies_file):
+    obj = GetData(technologies_file).latest(force_update=True)
+    assert list(obj['technologies']) == ['WooCommerce']
+    assert json.loads(technologies_file.read_text())['technologies'] == obj['technologies']
+    assert len(mirror.requests) == 1 + len(SHARDS)
+    assert mirror.conditional_requests() == []
+
+
+def test_unchanged_files_are_not_downloaded_again(mirror, technologies_file, tmp_path):
+    store = StoreData(base_url=mirror.url, cache_file=tmp_path / 'cache.json')
+    first = store.get_latest_tech_data()
+    mirror.requests.clear()
+    mirror.files['/technologies/w.json'] = {'WooCommerce': {'cats': [6], 'scriptSrc': 'woocommerce', 'html': 'wc'}}
+    second = store.get_latest_tech_data()
+    # Every file is requested conditionally, only the changed one is downloaded
+    assert len(mirror.conditional_requests()) == 1 + len(SHARDS)
+    assert second['technologies']['WooCommerce']['html'] == 'wc'
+    assert first['categories'] == second['categories']
+
+
+def test_last_modified(mirror, tmp_path):
+    mirror.validator = 'Last-Modified'
+    store = StoreData(base_url=mirror.url, cache_file=tmp_path / 'cache.json')
+    first = store.get_latest_tech_data()
+    mirror.requests.clear()
+    assert store.get_latest_tech_data() == first
+    assert len(mirror.conditional_requests('If-Modified-Since')) == 1 + len(SHARDS)
+
+
+def test_update_is_skipped_within_the_interval(mirror, technologies_file):
+    GetData(technologies_file).latest(force_update=True)
+    mirror.requests.clear()
+    GetData(technologies_file).latest(force_update=True)
+    assert mirror.requests == []
+    # Once the interval elapsed, the files are checked again
+    cache_file = GetData(technologies_file).cache_file()
+    cache = json.loads(cache_file.read_text())
+    cache['checked'] = time.time() - UPDATE_INTERVAL - 1
+    cache_file.write_text(json.dumps(cache))
+    GetData(technologies_file).latest(force_update=True)
+    assert len(mirror.conditional_requests()) == 1 + len(SHARDS)
+
+
+def test_failed_shard_keeps_the_current_files(mirror, technologies_file):
+    before = technologies_file.read_bytes()
+    mirror.failing.add('/technologies/m.json')
+    obj = GetData(technologies_file).latest(force_update=True)
+    assert obj == json.loads(before)
+    assert technologies_file.read_bytes() == before
+    assert not GetData(technologies_file).cache_file().exists()
+    assert [path.name for path in technologies_file.parent.iterdir()] == ['technologies.json']
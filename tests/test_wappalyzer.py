@@ -0,0 +1,280 @@
+import json
+import multiprocessing
+from typing import Dict, Iterable, List
+
+import pytest
+
+from Wappalyzer import Wappalyzer, WebPage
+from Wappalyzer.cache import MatchMemo, MemoryCache
+from Wappalyzer.constants import CATEGORIES
+from Wappalyzer.features import PageFeatures, html_hash
+from Wappalyzer.get_data import GetData
+from Wappalyzer.profiling import Profiler
+
+from conftest import unescape
+
+
+class StructuralTag:
+    def __init__(self, name: str, attributes: Dict[str, str], inner_html: str) -> None:
+        self.name = name
+        self.attributes = attributes
+        self.inner_html = inner_html
+
+
+class StructuralPage:
+    """
+    Implements the IWebPage protocol without inheriting from it: no select_all().
+    """
+    def __init__(self, url: str, tags: Dict[str, List[StructuralTag]]) -> None:
+        self.url = url
+        self.html = ''
+        self.headers: Dict[str, str] = {}
+        self.scripts: List[str] = []
+        self.meta: Dict[str, str] = {}
+        self.tags = tags
+
+    def select(self, selector: str) -> Iterable[StructuralTag]:
+        return self.tags.get(selector, [])
+
+
+def dom_technology(wappalyzer: Wappalyzer):
+    for technology in wappalyzer.technologies.values():
+        for selector in technology.dom:
+            if selector.exists and wappalyzer._category_ids[technology.name]:
+                return technology.name, selector.selector
+    raise AssertionError("No fingerprint with an existence selector")
+
+
+def test_page_without_select_all():
+    wappalyzer = Wappalyzer()
+    tech_name, selector = dom_technology(wappalyzer)
+    page = StructuralPage('https://example.com', {selector: [StructuralTag('div', {}, '')]})
+    assert tech_name in wappalyzer.detect(page)
+    assert wappalyzer.analyze(page)
+    assert tech_name in wappalyzer.analyze_detailed(page)
+    assert wappalyzer.detect(StructuralPage('https://example.com', {})) == set()
+
+
+def test_custom_pages_are_not_cached():
+    wappalyzer = Wappalyzer(cache=MemoryCache())
+    tech_name, selector = dom_technology(wappalyzer)
+    with_tag = StructuralPage('https://example.com', {selector: [StructuralTag('div', {}, '')]})
+    without_tag = StructuralPage('https://example.com', {})
+    assert wappalyzer.analyze(with_tag)
+    assert wappalyzer.analyze(without_tag) == []
+    assert wappalyzer.analyze(with_tag)
+    assert len(wappalyzer.cache) == 0
+
+
+def test_analyze_webpage():
+    wappalyzer = Wappalyzer()
+    html = '<script src="/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js"></script>'
+    assert wappalyzer.analyze(WebPage('https://example.com', html, {})) == ['eCommerce']
+    assert wappalyzer.analyze(WebPage('https://example.com', '<p>', {})) == []
+
+
+def uncompiled_patterns(wappalyzer=None):
+    from Wappalyzer import wappalyzer as module
+    wappalyzer = wappalyzer or module._worker_wappalyzer
+    return sum(pattern._regex is None for technology in wappalyzer.technologies.values()
+               for _, _, pattern in technology.patterns())
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="fork start method")
+def test_process_executor_compiles_once():
+    wappalyzer = Wappalyzer()
+    assert uncompiled_patterns(wappalyzer) > 0
+    with wappalyzer.new_process_executor(1, mp_context=multiprocessing.get_context('fork')) as executor:
+        assert uncompiled_patterns(wappalyzer) == 0
+        # Forked workers inherit the compiled regexes
+        assert executor.submit(uncompiled_patterns).result() == 0
+
+
+def test_spawned_workers():
+    wappalyzer = Wappalyzer()
+    html = '<script src="/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js"></script>'
+    pages = [('https://example.com', html, {}), ('https://example.com', '<p>', {})] * 2
+    results = wappalyzer.analyze_many(pages, workers=2, chunksize=1, mp_context=multiprocessing.get_context('spawn'))
+    assert list(results) == [(0, ['eCommerce']), (1, []), (2, ['eCommerce']), (3, [])]
+
+
+def test_decided_page_doesnt_build_the_soup():
+    wappalyzer = Wappalyzer()
+    html = '<script src="/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js"></script>'
+    page = WebPage('https://example.com', html, {})
+    assert wappalyzer.analyze(page) == ['eCommerce']
+    assert '_parsed_html' not in page.__dict__
+    page = WebPage('https://example.com', '<p>', {})
+    assert wappalyzer.analyze(page) == []
+    assert '_parsed_html' in page.__dict__
+
+
+def fingerprint_pages():
+    """
+    One page per technology, made of the texts of its fingerprint patterns.
+    """
+    technologies = json.loads(GetData().technologies_file().read_text(encoding='utf-8'))['technologies']
+
+    def texts(patterns):
+        return [unescape(p) for p in ([patterns] if isinstance(patterns, str) else patterns)]
+
+    for name, technology in sorted(technologies.items()):
+        html = ['<html><head>']
+        html.extend('<script src="%s"></script>' % text.replace('"', '') for text in texts(technology.get('scriptSrc', [])))
+        meta = technology.get('meta', {})
+        for meta_name, value in (meta if isinstance(meta, dict) else {'generator': meta}).items():
+            html.append('<meta name="%s" content="%s">' % (meta_name, texts(value)[0].replace('"', '')))
+        html.append('</head><body>')
+        html.extend(texts(technology.get('html', [])))
+        html.append('</body></html>')
+        headers = {header: texts(value)[0] for header, value in technology.get('headers', {}).items()}
+        urls = texts(technology.get('url', []))
+        yield WebPage('https://' + urls[0] if urls else 'https://example.com', '\n'.join(html), headers)
+
+
+def test_categories_same_as_filtered_results():
+    wappalyzer = Wappalyzer()
+    detected = 0
+    for page in fingerprint_pages():
+        # All fingerprints evaluated, no early exit
+        everything = wappalyzer.categories_of(wappalyzer.detect(page))
+        for category in CATEGORIES.values():
+            expected = [category] if category in everything else []
+            assert wappalyzer.analyze(page, categories=[category]) == expected, page.url
+        assert sorted(wappalyzer.analyze(page)) == sorted(everything), page.url
+        detected += bool(everything)
+    assert detected > 10
+
+
+class CountingPage(WebPage):
+    selects = 0
+
+    def select_all(self, selectors):
+        self.selects += 1
+        return super().select_all(selectors)
+
+
+def test_early_exit_skips_html_and_dom():
+    profiler = Profiler()
+    wappalyzer = Wappalyzer(profiler=profiler)
+    html = ('<script src="/wp-content/plugins/woocommerce/assets/js/frontend/cart.min.js"></script>'
+            + '\n'.join(page.html for page in fingerprint_pages()))
+
+    page = CountingPage('https://example.com', html, {})
+    wappalyzer.detect(page)
+    assert page.selects == 1
+    assert any(field == 'html' for _, field, _ in profiler.stats)
+
+    profiler.reset()
+    page = CountingPage('https://example.com', html, {})
+    assert wappalyzer.analyze(page, categories=['eCommerce']) == ['eCommerce']
+    assert page.selects == 0
+    assert profiler.stats
+    assert not any(field in ('html', 'dom') for _, field, _ in profiler.stats)
+
+
+def test_categories_of_implied_technologies(tmp_path):
+    technologies_file = tmp_path / 'technologies.json'
+    technologies_file.write_text(json.dumps({
+        'categories': {'6': {'name': 'eCommerce'}, '1': {'name': 'CMS'}},
+        'technologies': {
+            'Shop': {'cats': [6]},
+            'Plugin': {'cats': [1], 'implies': 'Shop', 'scriptSrc': 'shop-plugin\\.js'},
+            'Other': {'cats': [1], 'scriptSrc': 'other\\.js'},
+        }}))
+    wappalyzer = Wappalyzer(technologies_file=technologies_file)
+    page = WebPage('https://example.com', '<script src="/shop-plugin.js"></script>', {})
+    assert wappalyzer.analyze(page, categories=['eCommerce']) == ['eCommerce']
+    assert wappalyzer.analyze(page) == ['eCommerce']
+    page = WebPage('https://example.com', '<script src="/other.js"></script>', {})
+    assert wappalyzer.analyze(page, categories=['eCommerce']) == []
+
+
+def detailed_wappalyzer(tmp_path):
+    technologies_file = tmp_path / 'technologies.json'
+    technologies_file.write_text(json.dumps({
+        'categories': {'6': {'name': 'eCommerce'}, '1': {'name': 'CMS'}},
+        'technologies': {
+            'Shop': {'cats': [6],
+                     'scriptSrc': 'shop-([\\d.]+)\\.js\\;version:\\1',
+                     'headers': {'X-Shop': '(beta)?shop\\;confidence:40\\;version:\\1?next:stable'}},
+            'Widget': {'cats': [1],
+                       'html': 'widget-box\\;confidence:30',
+                       'meta': {'generator': 'widget\\;confidence:40'},
+                       'implies': ['Framework', 'Library\\;confidence:60', 'Maybe\\;confidence:40']},
+            'Framework': {'cats': [1], 'implies': 'Runtime'},
+            'Library': {'cats': [1]},
+            'Maybe': {'cats': [1]},
+            'Runtime': {'cats': [1]},
+        }}))
+    return Wappalyzer(technologies_file=technologies_file)
+
+
+def test_detailed_versions(tmp_path):
+    wappalyzer = detailed_wappalyzer(tmp_path)
+    html = '<script src="/shop-1.2.js"></script><script src="/shop-1.2.10.js"></script>'
+    result = wappalyzer.analyze_detailed(WebPage('https://example.com', html, {'X-Shop': 'betashop'}))
+    # back references, the longest version first, and the first branch of the ternary
+    assert result['Shop']['versions'] == ['1.2.10', 'next', '1.2']
+    result = wappalyzer.analyze_detailed(WebPage('https://example.com', '<p>', {'X-Shop': 'shop'}))
+    # the second branch of the ternary, when the group didn't match
+    assert result['Shop']['versions'] == ['stable']
+
+
+def test_detailed_confidence(tmp_path):
+    wappalyzer = detailed_wappalyzer(tmp_path)
+    page = WebPage('https://example.com', '<p>', {'X-Shop': 'shop'})
+    assert wappalyzer.analyze_detailed(page)['Shop']['confidence'] == 40
+    # 100 + 40, capped
+    page = WebPage('https://example.com', '<script src="/shop-1.0.js"></script>', {'X-Shop': 'shop'})
+    assert wappalyzer.analyze_detailed(page)['Shop'] == {
+        'versions': ['stable', '1.0'], 'confidence': 100, 'categories': ['eCommerce']}
+    # 30 + 40, each pattern counts once however many times it matches
+    html = '<meta name="generator" content="Widget"><div class="widget-box"></div><div class="widget-box"></div>'
+    result = wappalyzer.analyze_detailed(WebPage('https://example.com', html, {}))
+    assert result['Widget']['confidence'] == 70
+
+
+def test_detailed_implied_confidence(tmp_path):
+    wappalyzer = detailed_wappalyzer(tmp_path)
+    html = '<meta name="generator" content="Widget"><div class="widget-box"></div>'
+    result = wappalyzer.analyze_detailed(WebPage('https://example.com', html, {}))
+    # at most the confidence of the implying technology, and at most the one of the implies
+    assert {tech_name: details['confidence'] for tech_name, details in result.items()} == {
+        'Widget': 70, 'Framework': 70, 'Runtime': 70, 'Library': 60}
+    assert result['Library'] == {'versions': [], 'confidence': 60, 'categories': []}
+    # implies below 50 are ignored, as by analyze()
+    assert 'Maybe' not in result
+    html = '<div class="widget-box"></div>'
+    result = wappalyzer.analyze_detailed(WebPage('https://example.com', html, {}))
+    assert result['Library']['confidence'] == 30
+
+
+@pytest.mark.parametrize('memo', [None, MatchMemo()])
+def test_headers_and_meta_index(tmp_path, memo):
+    technologies_file = tmp_path / 'technologies.json'
+    technologies_file.write_text(json.dumps({
+        'categories': {'6': {'name': 'eCommerce'}, '1': {'name': 'CMS'}},
+        'technologies': {
+            'HeaderOnly': {'cats': [6], 'headers': {'X-Powered-By': 'ShopEngine'}},
+            'MetaOnly': {'cats': [1], 'meta': {'Generator': 'ShopCMS'}},
+            'Both': {'cats': [1], 'headers': {'X-Both': 'yes'}, 'meta': {'both': 'yes'}},
+        }}))
+    wappalyzer = Wappalyzer(technologies_file=technologies_file, memo=memo)
+    assert {name: [tech_name for tech_name, _ in entries] for name, entries in wappalyzer._headers_index.items()} == {
+        'x-powered-by': ['HeaderOnly'], 'x-both': ['Both']}
+    assert {name: [tech_name for tech_name, _ in entries] for name, entries in wappalyzer._meta_index.items()} == {
+        'generator': ['MetaOnly'], 'both': ['Both']}
+
+    def detect(headers, meta):
+        return wappalyzer.detect(PageFeatures('https://example.com', headers, [], meta, html_hash('')))
+
+    assert detect({'X-POWERED-BY': 'shopengine 2'}, {}) == {'HeaderOnly'}
+    assert detect({}, {'GENERATOR': 'ShopCMS 1.0'}) == {'MetaOnly'}
+    assert detect({'x-both': 'yes'}, {'Both': 'yes'}) == {'Both'}
+    # The names of the other field don't match
+    assert detect({'Generator': 'ShopCMS'}, {'X-Powered-By': 'ShopEngine'}) == set()
+    assert detect({'X-Powered-By': 'Other'}, {'generator': 'Other'}) == set()
+    html = '<meta name="Generator" content="ShopCMS">'
+    assert wappalyzer.analyze(WebPage('https://example.com', html, {'x-powered-by': 'ShopEngine'})) == ['eCommerce']
+    assert wappalyzer.detect(WebPage('https://example.com', html, {})) == {'MetaOnly'}
@@ -1,60 +1,359 @@
-import re
-from typing import Dict, Mapping, Set, Iterable, List
+import os
+import hashlib
+import logging
+from typing import TYPE_CHECKING, AbstractSet, Any, AsyncIterator, Callable, Dict, FrozenSet, Iterator, Mapping, Optional, Sequence, Set, Iterable, List, Tuple, Union
 
-from ._common import IWebPage
+from ._common import BaseWebPage, IWebPage, ITag, backend_name, read_response_async, webpage_class
+from ._fetch import MAX_BYTES, decode
+from ._prefilter import LiteralMatcher, normalize
+from .cache import IResultCache, MatchMemo
+from .limits import HtmlScan, MatchLimits
 from .constants import CATEGORIES
-from .fingerprint import Fingerprint, Technology, Category
+from .features import PageFeatures
+from .fingerprint import Fingerprint, Technology, Category, Pattern
 from .get_data import GetData
 
+# Only imported by analyze_many() and the async methods
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future, ProcessPoolExecutor
+    from multiprocessing.context import BaseContext
+    from .profiling import Profiler
+
+logger = logging.getLogger(name="python-Wappalyzer")
+
+# A page to analyze: a WebPage, or the (url, html, headers) to create one from.
+PageLike = Union[IWebPage, Tuple[str, str, Mapping[str, str]]]
+
+# The fields of the fingerprints whose patterns are matched against pages.
+FIELDS = frozenset(('url', 'headers', 'scriptSrc', 'meta', 'html', 'dom'))
+# The fields evaluated for all fingerprints by _detect(), before the html and dom.
+_CHEAP_FIELDS = frozenset(('url', 'scriptSrc'))
+
+# A pattern matching a page: the technology name, the pattern key, its confidence and the version found.
+Evidence = Tuple[str, str, int, Optional[str]]
+
+# The Wappalyzer instance of a analyze_many() worker process.
+_worker_wappalyzer: Optional['Wappalyzer'] = None
+
+def _init_worker(wappalyzer: 'Wappalyzer') -> None:
+    global _worker_wappalyzer
+    if wappalyzer.profiler is not None:
+        # Its records would stay in the worker, see new_process_executor
+        wappalyzer.set_profiler(None)
+    _worker_wappalyzer = wappalyzer
+
+def _analyze_chunk(chunk: List[Tuple[int, PageLike]]) -> List[Tuple[int, List[str]]]:
+    assert _worker_wappalyzer is not None
+    return [(index, _worker_wappalyzer._analyze_page(page)) for index, page in chunk]
+
+def _call_in_worker(method: str, *args: Any) -> Any:
+    if _worker_wappalyzer is None:
+        raise RuntimeError("Process executors must be created with Wappalyzer.new_process_executor()")
+    return getattr(_worker_wappalyzer, method)(*args)
+
 
 class Wappalyzer:
+    """
+    Detects the categories of the technologies used by web pages.
+
+    The fingerprints and the indexes built from them are not modified after the creation 
+    of the instance, and each analysis keeps its state in local variables, so a single 
+    instance can be shared by all the threads and request handlers of a service. 
+    The cache, memo, limits and profiler are thread-safe.
+
+    The one exception is `set_profiler`: it instruments the patterns of the instance in place, 
+    so the analyses running while it's called only record part of their regex searches. 
+    Give the profiler to the constructor, or set it before sharing the instance.
+    """
+
+    def __init__(self, force_update: bool = False, cache: Optional[IResultCache] = None,
+                 profiler: Optional['Profiler'] = None, limits: Optional[MatchLimits] = None,
+                 technologies_file: Optional[Union[str, 'os.PathLike[str]']] = None,
+                 memo: Optional[MatchMemo] = None):
+        """
+        :param force_update: Download the latest technologies file, see `GetData.latest`.
+        :param cache: (optional) Cache of the results of analyze(), see `Wappalyzer.cache`.
+        :param profiler: (optional) Profiler recording the regex searches of each pattern, 
+            see `Wappalyzer.profiling`.
+        :param limits: (optional) Bounds on the time spent matching the html of each page, 
+            see `Wappalyzer.limits`.
+        :param technologies_file: (optional) The technologies file to load, defaults to the one of the package.
+        :param memo: (optional) Memo of the technologies matched by each script source, header 
+            and meta value, to only match the values repeated across pages once, see `Wappalyzer.cache.MatchMemo`.
+            The profiler only records the searches of the values not memoized yet.
+        """
+        self._data = GetData(technologies_file)
+        categories, technologies, implied_technologies, version = self._data.latest_fingerprints(force_update)
+
+        self.categories: Mapping[str, Category] = categories
+        self.technologies: Mapping[str, Fingerprint] = technologies
+        # Hash of the technologies file, changes when it's updated
+        self.version: str = version
+        self.cache: Optional[IResultCache] = cache
+        self.profiler: Optional['Profiler'] = None
+        self.limits: Optional[MatchLimits] = limits
+        self.memo: Optional[MatchMemo] = memo
+        # Metadata of the technologies, read on request, see technology_metadata()
+        self._metadata: Optional[Mapping[str, Dict[str, Any]]] = None
+
+        # Technologies implied by each technology, transitively
+        self._implied_technologies: Mapping[str, FrozenSet[str]] = implied_technologies
+        # Ids of the categories of each technology, that are in CATEGORIES
+        self._category_ids: Mapping[str, FrozenSet[int]] = {
+            k: frozenset(cat for cat in v.cats if cat in CATEGORIES) for k, v in self.technologies.items()}
+        # Ids of the categories each technology detects, its own and those of the technologies it implies
+        self._implied_category_ids: Mapping[str, FrozenSet[int]] = {
+            k: self._category_ids[k].union(*(self._category_ids.get(tech, ()) for tech in implied))
+            for k, implied in self._implied_technologies.items()}
+        # Technologies that can detect each category, see analyze(categories=...)
+        self._technologies_by_category: Mapping[int, FrozenSet[str]] = {
+            category_id: frozenset(k for k, ids in self._implied_category_ids.items() if category_id in ids)
+            for category_id in CATEGORIES}
+
+        # One automaton for the required literals of all url, scriptSrc and html patterns
+        self._literal_matcher = LiteralMatcher(
+            literal for technology in self.technologies.values()
+            for patterns in (technology.url, technology.scriptSrc, technology.html)
+            for pattern in patterns if pattern.literals
+            for literal in pattern.literals)
+
+        # Lowercase header and meta names to the fingerprints that have patterns for them
+        self._headers_index = self._index_by_name('headers')
+        self._meta_index = self._index_by_name('meta')
+
+        # The scriptSrc patterns of each fingerprint having some, see _find_by_scripts()
+        self._script_patterns: List[Tuple[str, Sequence[Pattern]]] = [
+            (tech_name, technology.scriptSrc) for tech_name, technology in self.technologies.items()
+            if technology.scriptSrc]
+
+        # All url patterns, their index in this list identifies them in cache keys
+        self._url_patterns: List[Pattern] = [pattern for technology in self.technologies.values()
+                                             for pattern in technology.url]
+
+        if profiler is not None:
+            self.set_profiler(profiler)
+
+    def compile(self) -> None:
+        """
+        Compile the regexes of all the patterns now, instead of on their first use.
+        """
+        for technology in self.technologies.values():
+            for _, _, pattern in technology.patterns():
+                pattern.regex
+
+    def set_profiler(self, profiler: Optional['Profiler']) -> None:
+        """
+        Install a profiler, or remove the current one with None. 
+
+        The patterns of this instance are modified in place, see the note on thread safety of `Wappalyzer`.
+        """
+        if self.profiler is not None:
+            # The profiler may be installed on other Wappalyzers too, e.g. by ReloadingWappalyzer
+            self.profiler.uninstall(self.technologies)
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.install(self.technologies)
+
+    def technology_metadata(self, tech_name: str) -> Dict[str, Any]:
+        """
+        Returns the metadata of a technology, e.g. its ``website``, ``description`` or ``cpe``.
+
+        They aren't needed to detect technologies, so they are not kept with the fingerprints:
+        the technologies file is read again on the first call.
+
+        :raises KeyError: If the technology is unknown.
+        """
+        if self._metadata is None:
+            self._metadata = self._data.metadata()
+        return dict(self._metadata[tech_name])
+
+    def _index_by_name(self, field: str) -> Mapping[str, List[Tuple[str, Sequence[Pattern]]]]:
+        """
+        Maps each name of a headers-like field to the (technology name, patterns) pairs checking it.
+        """
+        index: Dict[str, List[Tuple[str, Sequence[Pattern]]]] = {}
+        for tech_name, technology in self.technologies.items():
+            for name, patterns in getattr(technology, field).items():
+                index.setdefault(name, []).append((tech_name, patterns))
+        return index
+
+    def _find_by_name(self, webpage: IWebPage, candidates: Optional[AbstractSet[str]] = None) -> Set[str]:
+        """
+        Find the technologies detected by the headers and meta of the page,
+        looking up only the fingerprints that care about the names present in the page.
 
-    def __init__(self, force_update: bool = False):
-        data = GetData().latest(force_update)
-        categories = data['categories']
-        technologies = data['technologies']
+        :param candidates: (optional) Only look up these technologies.
+        """
+        detected: Set[str] = set()
+        for field, index, values in (('headers', self._headers_index, webpage.headers),
+                                     ('meta', self._meta_index, webpage.meta)):
+            for name, content in values.items():
+                entries = index.get(name.lower(), ())
+                if self.memo is not None and entries:
+                    detected.update(self._memoized((field, name.lower(), content),
+                                                   lambda: self._match_value(entries, content)))
+                    continue
+                for tech_name, patterns in entries:
+                    if tech_name in detected or (candidates is not None and tech_name not in candidates):
+                        continue
+                    for pattern in patterns:
+                        if pattern.regex.search(content):
+                            detected.add(tech_name)
+                            break
+        if candidates is not None and self.memo is not None:
+            detected.intersection_update(candidates)
+        return detected
 
-        self.categories: Mapping[str, Category] = {k: Category(**v) for k, v in categories.items()}
-        self.technologies: Mapping[str, Fingerprint] = {k: Fingerprint(name=k, **v) for k, v in technologies.items()}
-        self.detected_technologies: Dict[str, Dict[str, Technology]] = {}
+    @staticmethod
+    def _match_value(entries: Iterable[Tuple[str, Sequence[Pattern]]], content: str) -> FrozenSet[str]:
+        """
+        Returns the technologies of the (technology name, patterns) entries matching the header or meta value.
+        """
+        return frozenset(tech_name for tech_name, patterns in entries
+                         if any(pattern.regex.search(content) for pattern in patterns))
 
-        self._confidence_regexp = re.compile(r"(.+)\\;confidence:(\d+)")
+    def _find_by_scripts(self, webpage: IWebPage, candidates: Optional[AbstractSet[str]] = None) -> Set[str]:
+        """
+        Find the technologies detected by the script sources of the page, 
+        each script source being matched once against the patterns of all fingerprints.
 
-    def _has_technology(self, tech_fingerprint: Fingerprint, webpage: IWebPage) -> bool:
+        :param candidates: (optional) Only return these technologies.
+        """
+        detected: Set[str] = set()
+        for script in webpage.scripts:
+            detected.update(self._memoized(('scriptSrc', script), lambda: self._match_script(script)))
+        if candidates is not None:
+            detected.intersection_update(candidates)
+        return detected
+
+    def _match_script(self, script: str) -> FrozenSet[str]:
+        found = self._literal_matcher.search(normalize(script))
+        return frozenset(tech_name for tech_name, patterns in self._script_patterns
+                         if any(pattern.is_candidate(found) and pattern.regex.search(script) for pattern in patterns))
+
+    @staticmethod
+    def _match_value_detailed(field: str, name: str, entries: Iterable[Tuple[str, Sequence[Pattern]]],
+                              content: str) -> FrozenSet[Evidence]:
+        """
+        Same as _match_value(), returns the evidence of every pattern matching the header or meta value.
+        """
+        return frozenset((tech_name, f'{field} {name}: {pattern.string}', pattern.confidence, pattern.resolve_version(match))
+                         for tech_name, patterns in entries for pattern in patterns
+                         for match in (pattern.regex.search(content),) if match)
+
+    def _match_script_detailed(self, script: str) -> FrozenSet[Evidence]:
+        """
+        Same as _match_script(), returns the evidence of every pattern matching the script source.
+        """
+        found = self._literal_matcher.search(normalize(script))
+        return frozenset((tech_name, f'scriptSrc {pattern.string}', pattern.confidence, pattern.resolve_version(match))
+                         for tech_name, patterns in self._script_patterns for pattern in patterns
+                         if pattern.is_candidate(found)
+                         for match in (pattern.regex.search(script),) if match)
+
+    def _memoized(self, key: Tuple[str, ...], match: Callable[[], FrozenSet[Any]]) -> FrozenSet[Any]:
+        """
+        Returns the technologies, or the evidence, matched by a value, from the memo if it has them.
+        """
+        if self.memo is None:
+            return match()
+        # The memo can be shared by Wappalyzers of other versions of the fingerprints
+        key = (self.version,) + key
+        matched = self.memo.get(key)
+        if matched is None:
+            matched = match()
+            self.memo.set(key, matched)
+        return matched
+
+    def _find_literals(self, webpage: IWebPage, html_scan: Optional[HtmlScan] = None,
+                       check_scripts: bool = True) -> Mapping[str, AbstractSet[str]]:
+        """
+        Find the prefilter literals present in the url, script sources and html of the page,
+        in a single pass over each of them.
+        The script sources are searched one by one instead when they are looked up
+        with _find_by_scripts(), see _match_script().
+        """
+        search = self._literal_matcher.search
+        found = {'url': search(normalize(webpage.url)),
+                 'html': search(normalize(html_scan.html if html_scan else webpage.html))}
+        if check_scripts:
+            found['scriptSrc'] = search(normalize('\n'.join(webpage.scripts)))
+        return found
+
+    def _has_technology(self, tech_fingerprint: Fingerprint, webpage: IWebPage,
+                        literals: Optional[Mapping[str, AbstractSet[str]]] = None,
+                        html_scan: Optional[HtmlScan] = None,
+                        fields: AbstractSet[str] = FIELDS) -> bool:
+        """
+        Whether the patterns of the fingerprint match the page.
+
+        :param fields: (optional) Only evaluate the patterns of these fields, see `FIELDS`.
+        """
+        # patterns whose required literals are not in the page can't match, see _find_literals()
+        found = literals or {}
         # analyze url patterns
-        for pattern in tech_fingerprint.url:
-            if pattern.regex.search(webpage.url):
+        for pattern in tech_fingerprint.url if 'url' in fields else ():
+            if pattern.is_candidate(found.get('url')) and pattern.regex.search(webpage.url):
                 return True
         # analyze headers patterns
-        for name, patterns in list(tech_fingerprint.headers.items()):
+        for name, patterns in list(tech_fingerprint.headers.items()) if 'headers' in fields else ():
             if name in webpage.headers:
                 content = webpage.headers[name]
                 for pattern in patterns:
                     if pattern.regex.search(content):
                         return True
         # analyze scripts src patterns
-        for pattern in tech_fingerprint.scriptSrc:
+        for pattern in tech_fingerprint.scriptSrc if 'scriptSrc' in fields else ():
+            if not pattern.is_candidate(found.get('scriptSrc')):
+                continue
             for script in webpage.scripts:
                 if pattern.regex.search(script):
                     return True
         # analyze meta patterns
-        for name, patterns in list(tech_fingerprint.meta.items()):
+        for name, patterns in list(tech_fingerprint.meta.items()) if 'meta' in fields else ():
             if name in webpage.meta:
                 content = webpage.meta[name]
                 for pattern in patterns:
                     if pattern.regex.search(content):
                         return True
         # analyze html patterns
+        if 'html' in fields and self._has_html(tech_fingerprint, webpage, literals, html_scan):
+            return True
+        # analyze dom patterns
+        return 'dom' in fields and self._has_dom(tech_fingerprint, webpage)
+
+    def _has_html(self, tech_fingerprint: Fingerprint, webpage: IWebPage,
+                  literals: Optional[Mapping[str, AbstractSet[str]]] = None,
+                  html_scan: Optional[HtmlScan] = None) -> bool:
+        """
+        Whether the html patterns of the fingerprint match the page, within the limits of the html_scan if any.
+        """
+        found = literals or {}
         for pattern in tech_fingerprint.html:
-            if pattern.regex.search(webpage.html):
+            if not pattern.is_candidate(found.get('html')):
+                continue
+            if html_scan is not None:
+                if html_scan.search(tech_fingerprint.name, pattern):
+                    return True
+            elif pattern.regex.search(webpage.html):
                 return True
-        # analyze dom patterns
+        return False
+
+    def _has_dom(self, tech_fingerprint: Fingerprint, webpage: IWebPage,
+                 matches: Optional[Mapping[str, Iterable[ITag]]] = None) -> bool:
+        """
+        Whether the DOM patterns of the fingerprint match the page.
+
+        :param matches: The tags matching each selector, as returned by `IWebPage.select_all`. 
+            If not passed, the selectors are queried one by one.
+        """
         # css selector, list of css selectors, or dict from css selector to dict with some of keys:
         #           - "exists": "": only check if the selector matches somthing, equivalent to the list form.
         #           - "text": "regex": check if the .innerText property of the element that matches the css selector matches the regex (with version extraction).
         #           - "attributes": {dict from attr name to regex}: check if the attribute value of the element that matches the css selector matches the regex (with version extraction).
         for selector in tech_fingerprint.dom:
-            for item in webpage.select(selector.selector):
+            items = matches.get(selector.selector, ()) if matches is not None else webpage.select(selector.selector)
+            for item in items:
                 if selector.exists:
                     return True
                 if selector.text:
@@ -70,52 +369,556 @@ class Wappalyzer:
                                     return True
         return False
 
+    @staticmethod
+    def _select_all(webpage: IWebPage, selectors: Iterable[str]) -> Mapping[str, Iterable[ITag]]:
+        """
+        Returns the tags matching each selector, with `IWebPage.select_all` if the page has it.
+        Pages implementing the protocol without inheriting from it may only have select().
+        """
+        select_all = getattr(webpage, 'select_all', None)
+        if select_all is None:
+            return {selector: list(webpage.select(selector)) for selector in selectors}
+        return select_all(selectors)
+
     def _get_implied_technologies(self, detected_technologies: Iterable[str]) -> Iterable[str]:
+        implied_technologies: Set[str] = set()
+        for tech in detected_technologies:
+            implied_technologies.update(self._implied_technologies.get(tech, ()))
+        return implied_technologies
+
+    def _cache_key(self, url: str, html: str, headers: Mapping[str, str],
+                   category_ids: Optional[AbstractSet[int]] = None,
+                   page: Optional[IWebPage] = None) -> str:
+        """
+        Hash everything the result of the analysis depends on: the version of the fingerprints,
+        the html window, the categories requested, the url patterns matching the url, 
+        the headers having fingerprints and the html.
+        Identical pages served from different urls get the same key.
+
+        :param page: (optional) The page, if already created. For `PageFeatures` snapshots, 
+            that may have no html, the scripts and meta are hashed too. See `_is_cacheable`.
+        """
+        found = self._literal_matcher.search(normalize(url))
+        url_patterns = [index for index, pattern in enumerate(self._url_patterns)
+                        if pattern.is_candidate(found) and pattern.regex.search(url)]
+        # same as CaseInsensitiveDict: the last value of a name wins
+        _headers = {name.lower(): value for name, value in headers.items()}
+        relevant_headers = sorted((name, value) for name, value in _headers.items() if name in self._headers_index)
+        key = hashlib.blake2b(digest_size=16)
+        html_window = (self.limits.html_window, self.limits.max_html_window) if self.limits is not None else None
+        requested = sorted(category_ids) if category_ids is not None else None
+        # The backends may still parse some pages differently
+        key.update(repr((self.version, backend_name(page), html_window, requested, url_patterns, relevant_headers)
+                        ).encode('utf-8', 'surrogatepass'))
+        if isinstance(page, PageFeatures):
+            key.update(repr((page.scripts, sorted(page.meta.items()))).encode('utf-8', 'surrogatepass'))
+        key.update(b'\0')
+        key.update(html.encode('utf-8', 'surrogatepass'))
+        return key.hexdigest()
+
+    @staticmethod
+    def _is_cacheable(page: Optional[IWebPage]) -> bool:
+        """
+        Whether the result of the page can be cached: its DOM must be the one of its html.
+        Other IWebPage implementations can select anything, that the cache key doesn't cover.
+        """
+        return page is None or isinstance(page, (BaseWebPage, PageFeatures))
+
+    def _analyze_cached(self, url: str, html: str, headers: Mapping[str, str],
+                        webpage: Callable[[], IWebPage],
+                        category_ids: Optional[FrozenSet[int]] = None,
+                        page: Optional[IWebPage] = None) -> List[str]:
+        """
+        Analyze the page created by `webpage()`, unless its result is in the cache.
+
+        :param page: (optional) The page, if already created, see _cache_key().
+        """
+        if self.cache is None or not self._is_cacheable(page):
+            return self._analyze(webpage(), category_ids=category_ids)
+        key = self._cache_key(url, html, headers, category_ids, page)
+        result = self.cache.get(key)
+        if result is None:
+            page = webpage()
+            html_scan = HtmlScan(self.limits, page) if self.limits is not None else None
+            result = self._analyze(page, html_scan, category_ids)
+            # Don't cache results missing skipped checks
+            if html_scan is None or not html_scan.skipped:
+                self.cache.set(key, result)
+        return list(result)
+
+    def analyze(self, webpage: IWebPage, categories: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Returns the names of the categories of the technologies detected in the page.
+
+        If the Wappalyzer has a cache, the result of an identical page is returned from the cache.
+        Only the results of WebPage objects and `PageFeatures` snapshots are cached.
+
+        :param categories: (optional) Names of the categories to look for, e.g. ``['eCommerce']``.
+            Only the technologies that can detect them, directly or through the technologies they imply,
+            are evaluated, and the analysis stops as soon as all of them are detected.
+            The categories detected among them are returned.
+        """
+        return self._analyze_cached(webpage.url, webpage.html, webpage.headers, lambda: webpage,
+                                    self._resolve_categories(categories), webpage)
+
+    @staticmethod
+    def _resolve_categories(categories: Optional[Iterable[str]]) -> Optional[FrozenSet[int]]:
+        """
+        Returns the ids of the named categories, None if no categories are requested.
+        """
+        if categories is None:
+            return None
+        if isinstance(categories, str):
+            categories = [categories]
+        ids = {name: category_id for category_id, name in CATEGORIES.items()}
+        unknown = [name for name in categories if name not in ids]
+        if unknown:
+            raise ValueError(f"Unknown categories {unknown}, expected some of {list(ids)}")
+        return frozenset(ids[name] for name in categories)
+
+    def _analyze(self, webpage: IWebPage, html_scan: Optional[HtmlScan] = None,
+                 category_ids: Optional[FrozenSet[int]] = None) -> List[str]:
+        if html_scan is None and self.limits is not None:
+            html_scan = HtmlScan(self.limits, webpage)
+
+        # The ids of the categories not detected yet, and the technologies that can detect them.
+        # Only the categories of CATEGORIES are returned, so without requested categories the
+        # analysis stops once all of them are detected too, e.g. without building the DOM tree.
+        requested = category_ids if category_ids is not None else CATEGORIES.keys()
+        pending: Set[int] = set(requested)
+        candidates: AbstractSet[str] = frozenset().union(*(self._technologies_by_category.get(category_id, ())
+                                                           for category_id in requested))
 
-        def __get_implied_technologies(technologies: Iterable[str]) -> Iterable[str]:
-            _implied_technologies = set()
-            for tech in technologies:
-                try:
-                    for implie in self.technologies[tech].implies:
-                        # If we have no doubts just add technology
-                        if 'confidence' not in implie:
-                            _implied_technologies.add(implie)
-
-                        # Case when we have "confidence" (some doubts)
-                        else:
-                            try:
-                                # Use more strict regexp (cause we have already checked the entry of "confidence")
-                                # Also, better way to compile regexp one time, instead of every time
-                                app_name, confidence = self._confidence_regexp.search(implie).groups()  # type: ignore
-                                if int(confidence) >= 50:
-                                    _implied_technologies.add(app_name)
-                            except (ValueError, AttributeError):
-                                pass
-                except KeyError:
-                    pass
-            return _implied_technologies
-
-        implied_technologies = __get_implied_technologies(detected_technologies)
-        all_implied_technologies: Set[str] = set()
-
-        # Descend recursively until we've found all implied technologies
-        while not all_implied_technologies.issuperset(implied_technologies):
-            all_implied_technologies.update(implied_technologies)
-            implied_technologies = __get_implied_technologies(all_implied_technologies)
-
-        return all_implied_technologies
-
-    def analyze(self, webpage: IWebPage) -> List[str]:
-        detected_technologies = set()
+        detected_technologies = self._detect(webpage, html_scan, candidates, pending)
+        return self._result(detected_technologies, html_scan, category_ids)
 
+    def _detect(self, webpage: IWebPage, html_scan: Optional[HtmlScan] = None,
+                candidates: Optional[AbstractSet[str]] = None,
+                pending: Optional[Set[int]] = None) -> Set[str]:
+        """
+        Returns the technologies detected in the page, without the implied ones.
+
+        :param candidates: (optional) Only evaluate these technologies.
+        :param pending: (optional) Ids of the categories looked for, the evaluation stops once
+            they are all detected. Emptied as they are detected.
+        """
+        detected_technologies: Set[str] = set()
+
+        def useful(tech_name: str) -> bool:
+            # whether detecting the technology can still change the result
+            return pending is None or not pending.isdisjoint(self._implied_category_ids.get(tech_name, ()))
+
+        def detect(tech_name: str) -> bool:
+            # returns True once all requested categories are detected
+            detected_technologies.add(tech_name)
+            if pending is None:
+                return False
+            pending.difference_update(self._implied_category_ids.get(tech_name, ()))
+            return not pending
+
+        # cheap checks first, so that an early exit saves the html and dom ones
+        for tech_name in self._find_by_name(webpage, candidates):
+            if detect(tech_name):
+                return detected_technologies
+        # with a memo, the script sources are matched once for all fingerprints
+        if self.memo is not None:
+            for tech_name in self._find_by_scripts(webpage, candidates):
+                if tech_name not in detected_technologies and detect(tech_name):
+                    return detected_technologies
+        literals = self._find_literals(webpage, html_scan, check_scripts=self.memo is None)
+        # the headers and meta were looked up with _find_by_name(), and the script sources with
+        # _find_by_scripts() if there is a memo. The html and dom are evaluated below, only if needed.
+        fields = _CHEAP_FIELDS if self.memo is None else _CHEAP_FIELDS - {'scriptSrc'}
+
+        # fingerprints not detected by their url and scripts
+        remaining = []
         for tech_name, technology in list(self.technologies.items()):
-            if self._has_technology(technology, webpage):
-                detected_technologies.add(tech_name)
+            if tech_name in detected_technologies or (candidates is not None and tech_name not in candidates):
+                continue
+            if not useful(tech_name):
+                continue
+            if self._has_technology(technology, webpage, literals, html_scan, fields):
+                if detect(tech_name):
+                    return detected_technologies
+            else:
+                remaining.append(technology)
+
+        # fingerprints not detected by other means, that have dom patterns
+        dom_fingerprints = []
+
+        for technology in remaining:
+            if not useful(technology.name):
+                continue
+            if self._has_html(technology, webpage, literals, html_scan):
+                if detect(technology.name):
+                    return detected_technologies
+            elif technology.dom:
+                dom_fingerprints.append(technology)
+
+        # evaluate all remaining selectors in a single walk of the DOM,
+        # this builds the tree of the page unless it was decided by the previous checks
+        dom_fingerprints = [technology for technology in dom_fingerprints if useful(technology.name)]
+        if dom_fingerprints:
+            matches = self._select_all(webpage, dict.fromkeys(
+                selector.selector for technology in dom_fingerprints for selector in technology.dom))
+            for technology in dom_fingerprints:
+                if self._has_dom(technology, webpage, matches):
+                    if detect(technology.name):
+                        break
+        return detected_technologies
+
+    def detect(self, webpage: IWebPage, technologies: Optional[Iterable[str]] = None,
+               previous: Optional[Iterable[str]] = None) -> Set[str]:
+        """
+        Returns the names of the technologies detected in the page, without the implied ones.
+        See `categories_of` to get their categories. Results are not cached.
+
+        To update the results of an earlier analysis after the fingerprints of some technologies 
+        changed, e.g. from `Wappalyzer.features` snapshots of the pages:
+
+        >>> changed = GetData.changed_technologies(old_technologies, new_technologies)
+        >>> detected = wappalyzer.detect(features, technologies=changed, previous=detected)
+
+        :param technologies: (optional) Only evaluate the fingerprints of these technologies.
+        :param previous: (optional) Technologies detected in the page by an earlier analysis. 
+            Those not in `technologies`, that still have a fingerprint, are detected again without being evaluated.
+        """
+        candidates = frozenset(technologies) if technologies is not None else None
+        html_scan = HtmlScan(self.limits, webpage) if self.limits is not None else None
+        detected_technologies = self._detect(webpage, html_scan, candidates)
+        if html_scan is not None:
+            html_scan.log_skipped()
+        if previous is not None and candidates is not None:
+            detected_technologies.update(tech_name for tech_name in previous
+                                         if tech_name not in candidates and tech_name in self.technologies)
+        return detected_technologies
+
+    def _detect_detailed(self, webpage: IWebPage, html_scan: Optional[HtmlScan] = None) -> Dict[str, Technology]:
+        """
+        Returns the technologies detected in the page, without the implied ones, with the evidence 
+        of all their matching patterns. The version of each match is resolved from its match object.
+        """
+        detected: Dict[str, Technology] = {}
+
+        def record(evidence: Iterable[Evidence]) -> None:
+            for tech_name, key, confidence, version in evidence:
+                technology = detected.get(tech_name)
+                if technology is None:
+                    technology = detected[tech_name] = Technology(tech_name)
+                technology.add_match(key, confidence, version)
+
+        def add(tech_name: str, key: str, pattern: Pattern, match: Any) -> None:
+            record(((tech_name, key, pattern.confidence, pattern.resolve_version(match)),))
+
+        # the headers, meta and script sources, memoized like in _find_by_name() and _find_by_scripts()
+        for field, index, values in (('headers', self._headers_index, webpage.headers),
+                                     ('meta', self._meta_index, webpage.meta)):
+            for name, content in values.items():
+                entries = index.get(name.lower(), ())
+                if entries:
+                    record(self._memoized(('detailed', field, name.lower(), content),
+                                          lambda: self._match_value_detailed(field, name.lower(), entries, content)))
+        for script in webpage.scripts:
+            record(self._memoized(('detailed', 'scriptSrc', script), lambda: self._match_script_detailed(script)))
+
+        literals = self._find_literals(webpage, html_scan, check_scripts=False)
+        for tech_name, technology in self.technologies.items():
+            for pattern in technology.url:
+                if pattern.is_candidate(literals['url']):
+                    match = pattern.regex.search(webpage.url)
+                    if match:
+                        add(tech_name, f'url {pattern.string}', pattern, match)
+            for pattern in technology.html:
+                if not pattern.is_candidate(literals['html']):
+                    continue
+                match = (html_scan.search(tech_name, pattern) if html_scan is not None
+                         else pattern.regex.search(webpage.html))
+                if match:
+                    add(tech_name, f'html {pattern.string}', pattern, match)
+
+        # all selectors in a single walk of the DOM, see _has_dom()
+        dom_fingerprints = [technology for technology in self.technologies.values() if technology.dom]
+        if not dom_fingerprints:
+            return detected
+        matches = self._select_all(webpage, dict.fromkeys(
+            selector.selector for technology in dom_fingerprints for selector in technology.dom))
+        for technology in dom_fingerprints:
+            for selector in technology.dom:
+                for item in matches.get(selector.selector, ()):
+                    if selector.exists:
+                        record(((technology.name, f'dom {selector.selector}', 100, None),))
+                    for pattern in selector.text or ():
+                        match = pattern.regex.search(item.inner_html)
+                        if match:
+                            add(technology.name, f'dom {selector.selector} text: {pattern.string}', pattern, match)
+                    for attrname, patterns in (selector.attributes or {}).items():
+                        _content = item.attributes.get(attrname)
+                        if not isinstance(_content, str):
+                            continue
+                        for pattern in patterns:
+                            match = pattern.regex.search(_content)
+                            if match:
+                                add(technology.name, f'dom {selector.selector} [{attrname}]: {pattern.string}',
+                                    pattern, match)
+        return detected
+
+    def analyze_detailed(self, webpage: IWebPage) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the technologies detected in the page and the technologies they imply, 
+        with their versions, confidence and categories.
+
+        >>> wappalyzer.analyze_detailed(webpage)
+        {'WooCommerce': {'versions': ['5.9.1'], 'confidence': 100, 'categories': ['eCommerce']}, 
+         'WordPress': {'versions': [], 'confidence': 100, 'categories': []}}
+
+        All the patterns of the fingerprints are evaluated in a single scan of the page:
+        the confidence of a technology is the sum of the confidence of its matching patterns, 
+        at most 100, and its versions are resolved from the match objects, the longest first. 
+        Implied technologies get the confidence of the technology implying them, 
+        at most the one of the implies. Results are not cached.
+        """
+        html_scan = HtmlScan(self.limits, webpage) if self.limits is not None else None
+        detected = self._detect_detailed(webpage, html_scan)
+        if html_scan is not None:
+            html_scan.log_skipped()
+
+        confidences = {tech_name: min(100, technology.confidenceTotal) for tech_name, technology in detected.items()}
+        # same implies as `fingerprint.implied_closures`, the highest confidence over all the paths wins
+        todo = list(confidences.items())
+        while todo:
+            tech_name, confidence = todo.pop()
+            technology = self.technologies.get(tech_name)
+            for implied, implied_confidence in technology.implies if technology is not None else ():
+                if implied_confidence < 50:
+                    continue
+                implied_confidence = min(confidence, implied_confidence)
+                if confidences.get(implied, -1) < implied_confidence:
+                    confidences[implied] = implied_confidence
+                    todo.append((implied, implied_confidence))
+
+        return {tech_name: {'versions': sorted(detected[tech_name].versions, key=len, reverse=True)
+                                        if tech_name in detected else [],
+                            'confidence': confidence,
+                            'categories': [CATEGORIES[x] for x in sorted(self._category_ids.get(tech_name, ()))]}
+                for tech_name, confidence in confidences.items()}
+
+    def categories_of(self, technologies: Iterable[str]) -> List[str]:
+        """
+        Returns the names of the categories of the technologies and of the technologies they imply.
+        """
+        return self._result(set(technologies), None)
+
+    def _result(self, detected_technologies: Set[str], html_scan: Optional[HtmlScan],
+                category_ids: Optional[FrozenSet[int]] = None) -> List[str]:
+        """
+        Returns the names of the categories of the detected technologies and the technologies they imply,
+        restricted to the requested categories if any.
+        """
         detected_technologies.update(self._get_implied_technologies(detected_technologies))
+        if html_scan is not None:
+            html_scan.log_skipped()
 
-        detected_category_ids = set()
+        detected_category_ids: Set[int] = set()
         for tech_name in detected_technologies:
-            if tech_name in self.technologies:
-                detected_category_ids.update(self.technologies[tech_name].cats)
+            detected_category_ids.update(self._category_ids.get(tech_name, ()))
+        if category_ids is not None:
+            detected_category_ids &= category_ids
+
+        return [CATEGORIES[x] for x in detected_category_ids]
+
+
+    def _analyze_page(self, page: PageLike, category_ids: Optional[FrozenSet[int]] = None) -> List[str]:
+        if isinstance(page, tuple):
+            WebPage = webpage_class()
+            url, html, headers = page
+            # Don't even parse the page if its result is cached
+            return self._analyze_cached(url, html, headers, lambda: WebPage(url, html, headers), category_ids)
+        return self._analyze_cached(page.url, page.html, page.headers, lambda: page, category_ids, page)
+
+    async def analyze_async(self, page: PageLike, categories: Optional[Iterable[str]] = None,
+                            executor: Optional['Executor'] = None) -> List[str]:
+        """
+        Same as analyze, but parses and analyzes the page in an executor, 
+        so that the event loop stays responsive.
+
+        >>> executor = wappalyzer.new_process_executor(workers=4)
+        >>> categories = await wappalyzer.analyze_async((url, html, headers), executor=executor)
+
+        :param page: A WebPage, or the ``(url, html, headers)`` to create one from in the executor.
+        :param categories: (optional) Names of the categories to look for, see analyze.
+        :param executor: (optional) A thread pool, or a process pool created with `new_process_executor`. 
+            Defaults to the default executor of the event loop.
+        """
+        return await self._run_in_executor(executor, '_analyze_page', page, self._resolve_categories(categories))
+
+    def _analyze_body(self, url: str, body: bytes, content_type: Optional[str], headers: Mapping[str, str],
+                      category_ids: Optional[FrozenSet[int]] = None) -> List[str]:
+        """
+        Analyze a body read by `read_response_async`, decoded here rather than in the event loop.
+        """
+        return self._analyze_page((url, decode(body, content_type), headers), category_ids)
+
+    async def _run_in_executor(self, executor: Optional['Executor'], method: str, *args: Any) -> Any:
+        """
+        Call the method in the executor, on the copy of this Wappalyzer of the workers 
+        if it's a process pool created with `new_process_executor`.
+        """
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+
+        loop = asyncio.get_running_loop()
+        if isinstance(executor, ProcessPoolExecutor):
+            return await loop.run_in_executor(executor, _call_in_worker, method, *args)
+        return await loop.run_in_executor(executor, getattr(self, method), *args)
+
+    def new_process_executor(self, workers: Optional[int] = None,
+                             mp_context: Optional['BaseContext'] = None) -> 'ProcessPoolExecutor':
+        """
+        Returns a pool of worker processes that hold a copy of this Wappalyzer, 
+        to pass to the async methods, e.g. `analyze_async`.
+
+        The caller is responsible for shutting the executor down.
+
+        :param workers: Number of processes, defaults to the number of CPUs.
+        :param mp_context: (optional) The multiprocessing context the workers are started with, 
+            defaults to the one of `multiprocessing.get_context()`. With ``get_context('fork')``, 
+            workers inherit the compiled fingerprints instead of unpickling and compiling them again, 
+            but forking is unsafe on macOS and in processes running threads.
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        if self.profiler is not None:
+            logger.warning("The profiler doesn't record the analyses of worker processes, "
+                           "use a thread pool or analyze the pages in this process to profile them")
+        # Regexes are compiled on first use: compile them once here, forked workers inherit them
+        self.compile()
+        # Forked workers inherit the initargs, the other start methods pickle them
+        return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                   mp_context=mp_context or multiprocessing.get_context(),
+                                   initializer=_init_worker, initargs=(self,))
+
+    def analyze_many(self, pages: Iterable[PageLike], workers: Optional[int] = None,
+                     ordered: bool = True, chunksize: int = 16,
+                     max_pending: Optional[int] = None,
+                     mp_context: Optional['BaseContext'] = None) -> Iterator[Tuple[int, List[str]]]:
+        """
+        Analyze many pages with a pool of worker processes, yielding ``(index, categories)`` 
+        tuples as results come back, where index is the position of the page in `pages`.
+
+        >>> pages = (('https://example.com', html, headers) for html, headers in responses)
+        >>> for index, categories in wappalyzer.analyze_many(pages, workers=8):
+        ...     print(index, categories)
+
+        Pages are consumed lazily, at most `max_pending` chunks are submitted and not yet 
+        yielded at any time, so memory stays bounded whatever the number of pages.
+
+        :param pages: WebPage objects, or ``(url, html, headers)`` tuples to parse in the workers.
+        :param workers: Number of processes, defaults to the number of CPUs. 
+            With 1, pages are analyzed in this process.
+        :param ordered: Yield results in the order of `pages`. Otherwise yield them as soon as they're ready.
+        :param chunksize: Number of pages sent to a worker at once.
+        :param max_pending: Maximum number of chunks in flight, defaults to twice the number of workers.
+        :param mp_context: (optional) The multiprocessing context the workers are started with, 
+            see `new_process_executor`.
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            for index, page in enumerate(pages):
+                yield index, self._analyze_page(page)
+            return
+
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        max_pending = max_pending or workers * 2
+
+        def chunks() -> Iterator[List[Tuple[int, PageLike]]]:
+            chunk: List[Tuple[int, PageLike]] = []
+            for item in enumerate(pages):
+                chunk.append(item)
+                if len(chunk) >= chunksize:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+        with self.new_process_executor(workers, mp_context) as executor:
+            pending: List['Future[List[Tuple[int, List[str]]]]'] = []
+            todo = chunks()
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    chunk = next(todo, None)
+                    if chunk is None:
+                        exhausted = True
+                    else:
+                        pending.append(executor.submit(_analyze_chunk, chunk))
+                if not pending:
+                    break
+                if ordered:
+                    done = [pending.pop(0)]
+                else:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    done = [future for future in pending if future in finished]
+                    pending = [future for future in pending if future not in finished]
+                for future in done:
+                    yield from future.result()
+
+    async def analyze_urls_async(self, urls: Iterable[str], concurrency: int = 50,
+                                 per_host_limit: int = 4, timeout: float = 30,
+                                 verify: bool = True, executor: Optional['Executor'] = None,
+                                 max_bytes: Optional[int] = MAX_BYTES,
+                                 **kwargs: Any) -> AsyncIterator[Tuple[str, Union[List[str], Exception]]]:
+        """
+        Fetch and analyze many URLs with one pooled `aiohttp` session, 
+        yielding ``(url, categories)`` tuples as the analyses complete.
+
+        If fetching or analyzing a URL fails, the exception is yielded in place of the categories.
+
+        >>> async for url, categories in wappalyzer.analyze_urls_async(urls, concurrency=100):
+        ...     print(url, categories)
+
+        URLs are consumed lazily, at most `concurrency` of them are in progress at any time.
+
+        :param urls: URLs to scan.
+        :param concurrency: Maximum number of URLs fetched and analyzed at once, and of open connections.
+        :param per_host_limit: Maximum number of simultaneous connections to the same host.
+        :param timeout: Total timeout of each request, in seconds.
+        :param verify: (optional) Boolean, it controls whether we verify the SSL certificate validity. 
+        :param executor: (optional) Executor the pages are parsed and analyzed in, see `analyze_async`.
+        :param max_bytes: (optional) Maximum number of bytes of each body read, None for no limit.
+        :param \\*\\*kwargs: Any other arguments are passed to the `aiohttp.ClientSession.get` method as well. 
+        """
+        import asyncio
+        import aiohttp
+
+        async def scan(url: str, session: aiohttp.ClientSession) -> Tuple[str, Union[List[str], Exception]]:
+            try:
+                async with session.get(url, **kwargs) as response:
+                    response_url, body, content_type, headers = await read_response_async(response, max_bytes)
+                # Decoded, parsed and analyzed in a single trip to the executor, parsed only if the result isn't cached
+                return url, await self._run_in_executor(executor, '_analyze_body',
+                                                        response_url, body, content_type, headers)
+            except Exception as err:
+                logger.debug(f"Error while scanning {url}: {err!r}")
+                return url, err
 
-        return list(map(lambda x: CATEGORIES[x], filter(lambda x: x in CATEGORIES, detected_category_ids)))
+        connector = aiohttp.TCPConnector(ssl=verify, limit=concurrency, limit_per_host=per_host_limit)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            pending: Set['asyncio.Task[Tuple[str, Union[List[str], Exception]]]'] = set()
+            todo = iter(urls)
+            try:
+                for url in todo:
+                    pending.add(asyncio.ensure_future(scan(url, session)))
+                    if len(pending) >= concurrency:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            yield task.result()
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+            finally:
+                # The consumer stopped early, or was cancelled
+                for task in pending:
+                    task.cancel()